@@ -0,0 +1,135 @@
+"""
+Throughput benchmark of the production server runner (`openeo_driver.server`) against the dummy backend.
+
+Starts the server with a number of configurations (worker class, workers, threads),
+hits a couple of endpoints with concurrent clients and reports requests per second and latency percentiles.
+
+Usage:
+
+    python benchmarks/server_throughput.py [--duration 10] [--clients 16]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+# Server configurations to compare: (name, server command line options)
+CONFIGURATIONS = [
+    ("sync 1x1", ["--worker-class", "sync", "--workers", "1"]),
+    ("sync 3x1", ["--worker-class", "sync", "--workers", "3"]),
+    ("gthread 1x4", ["--worker-class", "gthread", "--workers", "1", "--threads", "4"]),
+    ("gthread 3x4", ["--worker-class", "gthread", "--workers", "3", "--threads", "4"]),
+    ("gevent 3x100", ["--worker-class", "gevent", "--workers", "3", "--threads", "100"]),
+]
+
+PROCESS_GRAPH = {
+    "process": {"process_graph": {
+        "lc": {"process_id": "load_collection", "arguments": {"id": "S2_FOOBAR"}},
+        "sr": {"process_id": "save_result", "arguments": {"data": {"from_node": "lc"}, "format": "GTiff"},
+               "result": True},
+    }}
+}
+
+# Endpoints to benchmark: (name, method, path, json)
+ENDPOINTS = [
+    ("capabilities", "GET", "/openeo/1.0.0/", None),
+    ("collections", "GET", "/openeo/1.0.0/collections", None),
+    ("result", "POST", "/openeo/1.0.0/result", PROCESS_GRAPH),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(options: list, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DRIVER_IMPLEMENTATION_PACKAGE="openeo_driver.dummy.dummy_backend")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "openeo_driver.server", "--bind", "127.0.0.1:{p}".format(p=port)] + options,
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = "http://127.0.0.1:{p}/openeo/1.0.0/health".format(p=port)
+    end = time.time() + 60
+    while time.time() < end:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return proc
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("Server did not start")
+
+
+def run_load(base_url: str, method: str, path: str, json: dict, clients: int, duration: float) -> dict:
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    end = time.time() + duration
+
+    def client():
+        session = requests.Session()
+        local = []
+        while time.time() < end:
+            start = time.time()
+            try:
+                resp = session.request(method, base_url + path, json=json)
+                resp.content
+                ok = resp.status_code == 200
+            except requests.ConnectionError:
+                # E.g. connection closed by worker that is recycled (`--max-requests`)
+                ok = False
+            local.append(time.time() - start)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        "errors": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=16)
+    args = parser.parse_args()
+
+    print("| configuration | endpoint | req/s | p50 (ms) | p99 (ms) | errors |")
+    print("|---|---|---:|---:|---:|---:|")
+    for name, options in CONFIGURATIONS:
+        port = free_port()
+        proc = start_server(options, port)
+        try:
+            base_url = "http://127.0.0.1:{p}".format(p=port)
+            for endpoint, method, path, json in ENDPOINTS:
+                run_load(base_url, method, path, json, clients=args.clients, duration=1)  # warm up
+                r = run_load(base_url, method, path, json, clients=args.clients, duration=args.duration)
+                print("| {n} | {e} | {rps:.0f} | {p50:.1f} | {p99:.1f} | {errors} |".format(n=name, e=endpoint, **r))
+                sys.stdout.flush()
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark of `DelayedVector.bounds` on a large GeoJSON FeatureCollection:
+the streaming coordinates scan versus the previous implementation
+(load the whole document, build shapely geometries and a GeoSeries to get `total_bounds`).
+
+Each method runs in a separate process, to measure its peak memory (max RSS).
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def generate(path: Path, features: int, vertices: int, seed: int = 42):
+    """Generate FeatureCollection of random (convex) polygons, written incrementally."""
+    rnd = random.Random(seed)
+    with path.open("w") as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for i in range(features):
+            x, y = rnd.uniform(2.5, 6.5), rnd.uniform(49.5, 51.5)
+            ring = [[round(x + 0.001 * (j % 3), 6), round(y + 0.001 * (j // 3), 6)] for j in range(vertices)]
+            ring.append(ring[0])
+            feature = {
+                "type": "Feature", "properties": {"id": i, "crop": "maize"},
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            }
+            f.write(("," if i else "") + json.dumps(feature) + "\n")
+        f.write("]}\n")
+
+
+def bounds_geopandas(path: str):
+    import geopandas as gpd
+    from shapely.geometry import shape
+    with open(path, "r") as f:
+        geojson = json.load(f)
+    geometries = [shape(feature["geometry"]) for feature in geojson["features"]]
+    return tuple(gpd.GeoSeries(geometries).total_bounds)
+
+
+def bounds_streaming(path: str):
+    from openeo_driver.delayed_vector import DelayedVector
+    return DelayedVector(path).bounds
+
+
+METHODS = {"geopandas": bounds_geopandas, "streaming": bounds_streaming}
+
+
+def run_method(method: str, path: str):
+    # Baseline memory after imports, to isolate memory use of bounds computation.
+    import geopandas, shapely.geometry, openeo_driver.delayed_vector  # noqa
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    bounds = METHODS[method](path)
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"bounds": [float(b) for b in bounds], "time": elapsed, "peak_mb": peak / 1024,
+                      "delta_mb": (peak - baseline) / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--features", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--vertices", type=int, default=20)
+    parser.add_argument("--method", choices=sorted(METHODS), help="(internal) run single method")
+    parser.add_argument("--path")
+    args = parser.parse_args()
+
+    if args.method:
+        return run_method(args.method, args.path)
+
+    print("| features | file size (MB) | method | time (s) | peak RSS (MB) | RSS increase (MB) |")
+    print("|---:|---:|---|---:|---:|---:|")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for features in args.features:
+            path = Path(tmp_dir) / "parcels_{f}.geojson".format(f=features)
+            generate(path, features=features, vertices=args.vertices)
+            size = path.stat().st_size / 1024 / 1024
+            results = {}
+            for method in sorted(METHODS):
+                out = subprocess.check_output(
+                    [sys.executable, __file__, "--method", method, "--path", str(path)]
+                )
+                results[method] = r = json.loads(out.decode("utf-8").strip().split("\n")[-1])
+                print("| {f} | {s:.0f} | {m} | {t:.2f} | {p:.0f} | {d:.0f} |".format(
+                    f=features, s=size, m=method, t=r["time"], p=r["peak_mb"], d=r["delta_mb"]
+                ))
+            assert results["geopandas"]["bounds"] == results["streaming"]["bounds"]
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
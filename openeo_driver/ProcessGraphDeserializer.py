@@ -12,7 +12,8 @@ from shapely.geometry import shape, mapping
 from openeo import ImageCollection
 from openeo.capabilities import ComparableVersion
 from openeo.metadata import MetadataException
-from openeo_driver.backend import get_backend_implementation
+from openeo_driver import metrics
+from openeo_driver.backend import LazyBackendImplementation
 from openeo_driver.delayed_vector import DelayedVector
 from openeo_driver.errors import ProcessArgumentInvalidException, ProcessUnsupportedException, \
     ProcessArgumentRequiredException, ProcessParameterMissingException
@@ -83,7 +84,7 @@ def get_process_registry(api_version: ComparableVersion) -> ProcessRegistry:
         return process_registry_040
 
 
-backend_implementation = get_backend_implementation()
+backend_implementation = LazyBackendImplementation()
 
 def evaluate(processGraph: dict, viewingParameters=None) -> ImageCollection:
     """
@@ -106,7 +107,8 @@ def evaluate(processGraph: dict, viewingParameters=None) -> ImageCollection:
 def convert_node(processGraph: dict, viewingParameters=None):
     if isinstance(processGraph, dict):
         if 'process_id' in processGraph:
-            return apply_process(processGraph['process_id'], processGraph.get('arguments', {}), viewingParameters)
+            with metrics.time_process(processGraph['process_id']):
+                return apply_process(processGraph['process_id'], processGraph.get('arguments', {}), viewingParameters)
         elif 'node' in processGraph:
             return convert_node(processGraph['node'], viewingParameters)
         elif 'callback' in processGraph or 'process_graph' in processGraph:
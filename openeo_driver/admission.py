@@ -0,0 +1,155 @@
+"""
+Admission control for (expensive) processing requests:
+per-user rate limiting (token buckets) and per-user/global concurrency limits.
+"""
+from collections import Counter
+import logging
+import threading
+import time
+from typing import Callable, Dict
+
+_log = logging.getLogger(__name__)
+
+
+class AdmissionDenied(Exception):
+    """Request was not admitted (e.g. rate or concurrency limit hit)."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: tokens are refilled at `rate` per second,
+    up to `capacity` (which is the allowed burst size).
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._last = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def take(self) -> float:
+        """Take a token: returns 0 on success, otherwise the time (in seconds) until a token is available."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity
+
+
+class AdmissionController:
+    """
+    Thread-safe admission controller, keyed on user (id).
+
+    - `rate_per_user`/`burst_per_user`: token bucket rate limit per user (requests per second, burst size)
+    - `max_concurrent_per_user`: maximum number of in-flight requests per user
+    - `max_concurrent`: maximum number of in-flight requests in total
+    - `queue_timeout`: time (in seconds) a request may wait for a free concurrency slot before being rejected
+
+    Limits that are `None` are not enforced.
+    """
+
+    # Bucket count above which full (idle) buckets are dropped.
+    _MAX_IDLE_BUCKETS = 1000
+
+    def __init__(
+            self, max_concurrent: int = None, max_concurrent_per_user: int = None,
+            rate_per_user: float = None, burst_per_user: float = None, queue_timeout: float = 0,
+            retry_after: float = 1, clock: Callable[[], float] = time.monotonic
+    ):
+        self._max_concurrent = max_concurrent
+        self._max_concurrent_per_user = max_concurrent_per_user
+        self._rate_per_user = rate_per_user
+        self._burst_per_user = burst_per_user or max(1.0, rate_per_user or 0)
+        self._queue_timeout = queue_timeout
+        self._retry_after = retry_after
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._in_flight = Counter()
+        self._total = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = Counter()
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'AdmissionController':
+        """Build from config dict (with constructor arguments as keys)"""
+        return cls(**config)
+
+    def _has_slot(self, key: str) -> bool:
+        return (
+                (self._max_concurrent is None or self._total < self._max_concurrent)
+                and (self._max_concurrent_per_user is None or self._in_flight[key] < self._max_concurrent_per_user)
+        )
+
+    def _take_token(self, key: str) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._MAX_IDLE_BUCKETS:
+                self._buckets = {k: b for (k, b) in self._buckets.items() if not b.full}
+            bucket = self._buckets[key] = TokenBucket(
+                rate=self._rate_per_user, capacity=self._burst_per_user, clock=self._clock
+            )
+        return bucket.take()
+
+    def admit(self, key: str):
+        """
+        Admit a request for given user (key), or raise `AdmissionDenied`.
+        Each admitted request must be followed by a `release` call.
+        """
+        with self._condition:
+            if self._rate_per_user:
+                wait = self._take_token(key)
+                if wait > 0:
+                    self._rejected["rate"] += 1
+                    raise AdmissionDenied("Request rate limit exceeded.", retry_after=wait)
+            if not self._has_slot(key):
+                deadline = time.monotonic() + self._queue_timeout
+                self._waiting += 1
+                try:
+                    while not self._has_slot(key):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._rejected["concurrency"] += 1
+                            raise AdmissionDenied("Too many concurrent requests.", retry_after=self._retry_after)
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_flight[key] += 1
+            self._total += 1
+            self._admitted += 1
+
+    def release(self, key: str):
+        """Release the concurrency slot of an admitted request."""
+        with self._condition:
+            self._in_flight[key] -= 1
+            if self._in_flight[key] <= 0:
+                del self._in_flight[key]
+            self._total -= 1
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        """Current admission statistics (e.g. for monitoring)."""
+        with self._condition:
+            return {
+                "in_flight": self._total,
+                "in_flight_users": len(self._in_flight),
+                "queue_depth": self._waiting,
+                "admitted": self._admitted,
+                "rejected": dict(self._rejected),
+            }
@@ -14,12 +14,16 @@ import importlib
 import logging
 import os
 from pathlib import Path
-from typing import List, Union, NamedTuple, Dict
+import threading
+import time
+from typing import List, Union, NamedTuple, Dict, Iterable, Tuple, Optional
 
 from openeo import ImageCollection
 from openeo.error_summary import ErrorSummary
 from openeo.internal.process_graph_visitor import ProcessGraphVisitor
-from openeo_driver.errors import CollectionNotFoundException, ServiceUnsupportedException
+from openeo_driver.collection_index import CollectionIndex
+from openeo_driver.errors import CollectionNotFoundException, ServiceUnsupportedException, JobNotFoundException
+from openeo_driver.job_events import JobEventBus
 from openeo_driver.utils import read_json, date_to_rfc3339, parse_rfc3339
 
 logger = logging.getLogger(__name__)
@@ -132,18 +136,27 @@ class CollectionCatalog(MicroService):
 
     def __init__(self, all_metadata: List[dict]):
         self._catalog = {layer["id"]: dict(layer) for layer in all_metadata}
+        # Counter to bump on each change of the catalog content (e.g. to invalidate downstream caches).
+        self._version = 0
+        # Lazily built search index, as (catalog version, catalog snapshot, index) tuple
+        self._index = None
+
+    @property
+    def version(self) -> int:
+        """Version of the catalog content: changes whenever the catalog metadata changes."""
+        return self._version
 
     @classmethod
     def from_json_file(cls, filename: Union[str, Path] = "layercatalog.json", *args, **kwargs):
         """Factory to read catalog from a JSON file"""
         return cls(read_json(filename), *args, **kwargs)
 
-    def get_all_metadata(self) -> List[dict]:
+    def get_all_metadata(self, limit: int = None, offset: int = 0) -> List[dict]:
         """
-        Basic metadata for all datasets
+        Basic metadata for all datasets (optionally paginated)
         https://openeo.org/documentation/1.0/developers/api/reference.html#operation/list-collections
         """
-        return list(self._catalog.values())
+        return _paginate(list(self._catalog.values()), limit=limit, offset=offset)
 
     def _get(self, collection_id: str) -> dict:
         try:
@@ -158,10 +171,175 @@ class CollectionCatalog(MicroService):
         """
         return self._get(collection_id=collection_id)
 
+    def search(
+            self, bbox: Tuple[float, float, float, float] = None,
+            interval: Tuple[datetime, datetime] = None,
+            keywords: List[str] = None, limit: int = None, offset: int = 0
+    ) -> List[dict]:
+        """
+        Basic metadata of datasets matching all given (STAC-style) filters (optionally paginated):
+        intersecting with bounding box (west, south, east, north),
+        overlapping with time interval (start, end) and containing all given keywords/band names.
+        """
+        catalog, index = self._get_index()
+        collection_ids = index.query(bbox=bbox, interval=interval, terms=keywords)
+        return [catalog[cid] for cid in _paginate(collection_ids, limit=limit, offset=offset)]
+
+    def _get_index(self) -> Tuple[Dict[str, dict], CollectionIndex]:
+        """Get search index (and the catalog snapshot it was built from), rebuilt when catalog changed."""
+        version = self.version
+        if self._index is None or self._index[0] != version:
+            catalog = self._catalog
+            self._index = (version, catalog, CollectionIndex(list(catalog.values())))
+        return self._index[1], self._index[2]
+
+    def _update_catalog(self, updated: Dict[str, dict] = None, removed: Iterable[str] = ()) -> bool:
+        """
+        Atomically swap in new/changed collection metadata entries and drop removed ones.
+        Bumps the catalog version if something actually changed.
+
+        :return: whether the catalog content changed
+        """
+        updated = updated or {}
+        removed = [cid for cid in removed if cid in self._catalog and cid not in updated]
+        updated = {cid: m for (cid, m) in updated.items() if self._catalog.get(cid) != m}
+        if not updated and not removed:
+            return False
+        catalog = dict(self._catalog)
+        catalog.update(updated)
+        for collection_id in removed:
+            del catalog[collection_id]
+        # Swap in one go: concurrent readers see either the old or the new catalog, never a mix.
+        self._catalog = catalog
+        self._version += 1
+        logger.info("Updated catalog to version {v}: updated {u!r}, removed {r!r}".format(
+            v=self._version, u=sorted(updated.keys()), r=sorted(removed)
+        ))
+        return True
+
     def load_collection(self, collection_id: str, viewing_parameters: dict) -> ImageCollection:
         raise NotImplementedError
 
 
+class ReloadableCollectionCatalog(CollectionCatalog):
+    """
+    Collection catalog that keeps itself in sync with its source, which is either
+    a JSON file (containing a list of collection metadata dicts, like `layercatalog.json`)
+    or a directory of JSON files (each containing the metadata dict of a single collection).
+
+    Source changes are detected by polling file modification times (at most once per `check_interval` seconds).
+    Reloading happens in a background thread, so requests never wait for it:
+    they are served from the current catalog until the changed entries are swapped in.
+    """
+
+    def __init__(self, source: Union[str, Path], check_interval: float = 10):
+        self._source = Path(source)
+        # Minimum time (in seconds) between checks for source changes (`None` to disable automatic checks).
+        self._check_interval = check_interval
+        self._last_check = 0
+        # Modification stamps of the source files, and the collection ids defined in each file.
+        self._stamps = {}
+        self._ids_per_file = {}
+        self._reload_lock = threading.Lock()
+        super().__init__(all_metadata=[])
+        self.reload()
+
+    def _source_files(self) -> List[Path]:
+        if self._source.is_dir():
+            return sorted(self._source.glob("*.json"))
+        return [self._source]
+
+    @staticmethod
+    def _stamp(path: Path) -> tuple:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> bool:
+        """
+        Reload changed source files (synchronously).
+
+        :return: whether the catalog content changed
+        """
+        with self._reload_lock:
+            return self._reload()
+
+    def _reload(self) -> bool:
+        self._last_check = time.time()
+        stamps = {}
+        for path in self._source_files():
+            try:
+                stamps[path] = self._stamp(path)
+            except FileNotFoundError:
+                # File disappeared while scanning: handle as deleted.
+                pass
+        ids_per_file = dict(self._ids_per_file)
+        updated = {}
+        removed = set()
+        for path, stamp in stamps.items():
+            if self._stamps.get(path) == stamp:
+                continue
+            try:
+                data = read_json(path)
+                layers = data if isinstance(data, list) else [data]
+                layer_ids = [layer["id"] for layer in layers]
+            except Exception:
+                # E.g. file is still being written: keep current entries and retry on next check.
+                logger.warning("Failed to load catalog file {p!r}".format(p=str(path)), exc_info=True)
+                stamps[path] = self._stamps.get(path)
+                continue
+            removed.update(set(ids_per_file.get(path, [])).difference(layer_ids))
+            updated.update((layer["id"], dict(layer)) for layer in layers)
+            ids_per_file[path] = layer_ids
+        for path in set(self._stamps).difference(stamps):
+            removed.update(ids_per_file.pop(path, []))
+        self._stamps = stamps
+        self._ids_per_file = ids_per_file
+        return self._update_catalog(updated=updated, removed=removed)
+
+    def _check_for_updates(self):
+        """Trigger a background reload if the check interval has passed (without blocking the caller)."""
+        if self._check_interval is None or time.time() - self._last_check < self._check_interval:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            # Reload already in progress
+            return
+        self._last_check = time.time()
+
+        def reload():
+            try:
+                self._reload()
+            except Exception:
+                logger.exception("Failed to reload catalog from {s!r}".format(s=str(self._source)))
+            finally:
+                self._reload_lock.release()
+
+        threading.Thread(target=reload, name="catalog-reload", daemon=True).start()
+
+    @property
+    def version(self) -> int:
+        # Downstream caches (e.g. of collection metadata documents) only look at the version:
+        # also check for updates here, otherwise cached documents would never be refreshed.
+        self._check_for_updates()
+        return self._version
+
+    def get_all_metadata(self, limit: int = None, offset: int = 0) -> List[dict]:
+        self._check_for_updates()
+        return super().get_all_metadata(limit=limit, offset=offset)
+
+    def _get(self, collection_id: str) -> dict:
+        self._check_for_updates()
+        return super()._get(collection_id=collection_id)
+
+    def search(self, *args, **kwargs) -> List[dict]:
+        self._check_for_updates()
+        return super().search(*args, **kwargs)
+
+
+def _paginate(items: list, limit: int = None, offset: int = 0) -> list:
+    """Get page of at most `limit` items (all if `None`), starting at `offset`."""
+    return items[offset:None if limit is None else offset + limit]
+
+
 class CollectionIncompleteMetadataWarning(UserWarning):
     pass
 
@@ -185,6 +363,7 @@ class BatchJobMetadata(NamedTuple):
     description: str = None
     progress: float = None
     updated: datetime = None
+    api_version: str = None
     plan = None
     costs = None
     budget = None
@@ -197,12 +376,42 @@ class BatchJobMetadata(NamedTuple):
         return d
 
 
+# openEO log levels, from most to least severe.
+LOG_LEVELS = ["error", "warning", "info", "debug"]
+
+
+def log_level_at_least(level: str, minimum: str) -> bool:
+    """Check if log level is at least as severe as given minimum level (unknown levels pass)."""
+    if level not in LOG_LEVELS:
+        return True
+    return LOG_LEVELS.index(level) <= LOG_LEVELS.index(minimum)
+
+
 class BatchJobs(MicroService):
     """
     Base contract/implementation for Batch Jobs "microservice"
     https://openeo.org/documentation/1.0/developers/api/reference.html#operation/stop-job
     """
 
+    # Whether `notify_job_change` is called on all job status/progress changes (enables the job event endpoints).
+    # Note that the event bus is in-process: with multiple worker processes, each of them has to be notified.
+    supports_job_events = False
+
+    @property
+    def job_events(self) -> JobEventBus:
+        """Event bus of job changes (see `notify_job_change`)."""
+        if "_job_events" not in self.__dict__:
+            self.__dict__.setdefault("_job_events", JobEventBus())
+        return self.__dict__["_job_events"]
+
+    def notify_job_change(self, job_id: str, user_id: str, status: str, progress: float = None):
+        """Hook to be called by implementations when the status (or progress) of a job changes."""
+        self.job_events.publish(user_id=user_id, job_id=job_id, status=status, progress=progress)
+
+    def post_fork(self):
+        """Hook to (re)initialize per-process resources (e.g. threads) in a forked worker process."""
+        pass
+
     def create_job(self, user_id: str, process: dict, api_version: str, job_options: dict = None) -> BatchJobMetadata:
         raise NotImplementedError
 
@@ -214,10 +423,28 @@ class BatchJobs(MicroService):
         """
         raise NotImplementedError
 
-    def get_user_jobs(self, user_id: str) -> List[BatchJobMetadata]:
+    def get_jobs_info(self, job_ids: List[str], user_id: str) -> List[BatchJobMetadata]:
+        """
+        Get details about multiple batch jobs of a user (in order of `job_ids`), skipping unknown job ids.
+
+        This default implementation calls `get_job_info` for each job:
+        implementations should override it to fetch all jobs at once (e.g. in a single query).
+        """
+        jobs = []
+        for job_id in job_ids:
+            try:
+                jobs.append(self.get_job_info(job_id=job_id, user_id=user_id))
+            except JobNotFoundException:
+                pass
+        return jobs
+
+    def get_user_jobs(self, user_id: str, limit: int = None, offset: int = 0) -> List[BatchJobMetadata]:
         """
         Get details about all batch jobs of a user
         https://openeo.org/documentation/1.0/developers/api/reference.html#operation/list-jobs
+
+        Pagination: return at most `limit` jobs (no limit if `None`), skipping the first `offset` ones.
+        Implementations should use a stable order (e.g. on creation time) for consistent paging.
         """
         raise NotImplementedError
 
@@ -245,6 +472,25 @@ class BatchJobs(MicroService):
         """
         raise NotImplementedError
 
+    def get_log_page(
+            self, job_id: str, user_id: str, offset: Optional[str] = None, limit: Optional[int] = None,
+            level: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Get a page of log entries: at most `limit` entries (with at least severity `level`)
+        after the entry with id `offset` (an opaque cursor).
+        Returns the entries and the offset for the next page (None if there are no more entries).
+
+        This default implementation filters the full `get_log_entries` listing:
+        backends with large logs should override it with something more efficient.
+        """
+        entries = self.get_log_entries(job_id=job_id, user_id=user_id, offset=offset)
+        if level:
+            entries = [e for e in entries if log_level_at_least(e.get("level"), level)]
+        if limit is not None and len(entries) > limit:
+            return entries[:limit], entries[limit - 1]["id"]
+        return entries, None
+
     def cancel_job(self, job_id: str, user_id: str):
         """
         https://openeo.org/documentation/1.0/developers/api/reference.html#operation/stop-job
@@ -270,6 +516,14 @@ class OpenEoBackendImplementation:
     def health_check(self) -> str:
         return "OK"
 
+    def post_fork(self):
+        """
+        Hook to (re)initialize per-process resources (e.g. connection pools)
+        in a forked worker process (when the backend is preloaded before forking).
+        Implementations overriding this should call the parent implementation.
+        """
+        self.batch_jobs.post_fork()
+
     def file_formats(self) -> dict:
         """
         https://openeo.org/documentation/1.0/developers/api/reference.html#operation/list-file-types
@@ -289,14 +543,28 @@ class OpenEoBackendImplementation:
 
 
 _backend_implementation = None
+_backend_implementation_lock = threading.Lock()
 
 
 def get_backend_implementation() -> OpenEoBackendImplementation:
     global _backend_implementation
-    if _backend_implementation is None:
-        # TODO: #36 avoid non-standard importing through env var DRIVER_IMPLEMENTATION_PACKAGE
-        _driver_implementation_package = os.getenv('DRIVER_IMPLEMENTATION_PACKAGE', "openeo_driver.dummy.dummy_backend")
-        logger.info('Using driver implementation package {d}'.format(d=_driver_implementation_package))
-        module = importlib.import_module(_driver_implementation_package)
-        _backend_implementation = module.get_openeo_backend_implementation()
-    return _backend_implementation
+    with _backend_implementation_lock:
+        if _backend_implementation is None:
+            # TODO: #36 avoid non-standard importing through env var DRIVER_IMPLEMENTATION_PACKAGE
+            _driver_implementation_package = os.getenv(
+                'DRIVER_IMPLEMENTATION_PACKAGE', "openeo_driver.dummy.dummy_backend"
+            )
+            logger.info('Using driver implementation package {d}'.format(d=_driver_implementation_package))
+            module = importlib.import_module(_driver_implementation_package)
+            _backend_implementation = module.get_openeo_backend_implementation()
+        return _backend_implementation
+
+
+class LazyBackendImplementation:
+    """
+    Proxy for the backend implementation (see `get_backend_implementation`),
+    that defers loading and construction of the backend to first use.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_backend_implementation(), name)
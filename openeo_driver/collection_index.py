@@ -0,0 +1,275 @@
+"""
+In-memory search index over collection metadata
+(spatial extent, temporal extent, keywords and band names),
+to support STAC-style collection filtering without scanning all metadata documents on each query.
+"""
+import bisect
+from collections import defaultdict
+import datetime
+import logging
+import math
+import re
+from typing import List, Iterable, Tuple, Union, Optional, Set
+
+from openeo.util import deep_get
+
+_log = logging.getLogger(__name__)
+
+# Bounding box tuple: (west, south, east, north)
+BBox = Tuple[float, float, float, float]
+
+_WORLD = (-180.0, -90.0, 180.0, 90.0)
+
+_DATETIME_REGEX = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[Tt ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?(?:([Zz])|([+-])(\d{2}):?(\d{2}))?)?$"
+)
+
+
+def parse_datetime(value: Union[str, datetime.date, None], default: datetime.datetime = None) -> datetime.datetime:
+    """
+    Parse a (RFC 3339 style) date or date-time string to a naive (UTC) datetime object.
+    Time zone offsets are converted to UTC, fractional seconds are ignored.
+    Open ends (`None`, empty string or "..") are replaced with given default.
+    """
+    if value is None or value in ("", ".."):
+        return default
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            return _to_naive_utc(value.replace(tzinfo=None), value.utcoffset())
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    match = _DATETIME_REGEX.match(value.strip())
+    if not match:
+        raise ValueError("Invalid date/time {v!r}".format(v=value))
+    year, month, day, hour, minute, second, _, sign, offset_hours, offset_minutes = match.groups()
+    result = datetime.datetime(*(int(g) for g in [year, month, day, hour, minute, second] if g is not None))
+    if sign:
+        offset = datetime.timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+        result = _to_naive_utc(result, offset if sign == "+" else -offset)
+    return result
+
+
+def _to_naive_utc(value: datetime.datetime, offset: datetime.timedelta) -> datetime.datetime:
+    """Convert naive local datetime with given UTC offset to naive UTC datetime (clamped to representable range)."""
+    try:
+        return value - offset
+    except OverflowError:
+        return datetime.datetime.min if offset > datetime.timedelta(0) else datetime.datetime.max
+
+
+def parse_interval(value: str) -> Tuple[datetime.datetime, datetime.datetime]:
+    """
+    Parse a STAC API style `datetime` filter: single instant, or closed/open interval
+    (e.g. "2019-01-01", "2019-01-01/2019-02-01", "../2019-02-01", "2019-01-01/..").
+    """
+    if "/" in value:
+        start, end = value.split("/", 1)
+    else:
+        start = end = value
+    return parse_datetime(start, default=datetime.datetime.min), parse_datetime(end, default=datetime.datetime.max)
+
+
+def get_spatial_extents(metadata: dict) -> List[BBox]:
+    """
+    Get spatial extent bounding boxes from collection metadata
+    (supports API 0.4 style `[w, s, e, n]` and 1.0 style `{"bbox": [[w, s, e, n], ...]}`).
+    """
+    extent = deep_get(metadata, "extent", "spatial", default=None)
+    if isinstance(extent, dict):
+        bboxes = extent.get("bbox") or []
+    elif isinstance(extent, (list, tuple)) and len(extent) > 0 and not isinstance(extent[0], (list, tuple)):
+        bboxes = [extent]
+    else:
+        bboxes = extent or []
+    return [tuple(float(c) for c in bbox[:4]) for bbox in bboxes if bbox and len(bbox) >= 4]
+
+
+def get_temporal_extents(metadata: dict) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Get temporal extent intervals from collection metadata
+    (supports API 0.4 style `[start, end]` and 1.0 style `{"interval": [[start, end], ...]}`).
+    """
+    extent = deep_get(metadata, "extent", "temporal", default=None)
+    if isinstance(extent, dict):
+        intervals = extent.get("interval") or []
+    elif isinstance(extent, (list, tuple)) and len(extent) > 0 and not isinstance(extent[0], (list, tuple)):
+        intervals = [extent]
+    else:
+        intervals = extent or []
+    return [
+        (
+            parse_datetime(interval[0], default=datetime.datetime.min),
+            parse_datetime(interval[1], default=datetime.datetime.max)
+        )
+        for interval in intervals if interval and len(interval) >= 2
+    ]
+
+
+def get_terms(metadata: dict) -> Set[str]:
+    """Get (lower case) search terms from collection metadata: keywords and band names."""
+    terms = set(metadata.get("keywords") or [])
+    for bands in [
+        deep_get(metadata, "summaries", "eo:bands", default=None),
+        deep_get(metadata, "properties", "eo:bands", default=None),
+    ]:
+        for band in bands or []:
+            if isinstance(band, dict):
+                terms.update(band[k] for k in ["name", "common_name"] if band.get(k))
+    for dimension in (metadata.get("cube:dimensions") or {}).values():
+        if isinstance(dimension, dict) and dimension.get("type") == "bands":
+            terms.update(dimension.get("values") or [])
+    return set(str(t).lower() for t in terms)
+
+
+class SpatialGridIndex:
+    """
+    Spatial index of (lon/lat) bounding boxes, based on a regular grid:
+    each bounding box is registered in each grid cell it overlaps with.
+    Bounding boxes that cross the antimeridian (west > east) are split in two.
+    """
+
+    def __init__(self, cell_size: float = 10.0):
+        self._cell_size = cell_size
+        self._cells = defaultdict(set)
+        self._bboxes = defaultdict(list)
+
+    def _normalize(self, bbox: BBox) -> List[BBox]:
+        west, south, east, north = bbox
+        south, north = max(south, -90.0), min(north, 90.0)
+        if west > east:
+            return [(max(west, -180.0), south, 180.0, north), (-180.0, south, min(east, 180.0), north)]
+        return [(max(west, -180.0), south, min(east, 180.0), north)]
+
+    def _cells_for(self, bbox: BBox) -> Iterable[Tuple[int, int]]:
+        west, south, east, north = bbox
+        size = self._cell_size
+        for i in range(int(math.floor(west / size)), int(math.floor(east / size)) + 1):
+            for j in range(int(math.floor(south / size)), int(math.floor(north / size)) + 1):
+                yield i, j
+
+    def insert(self, key: str, bbox: BBox):
+        for part in self._normalize(bbox):
+            self._bboxes[key].append(part)
+            for cell in self._cells_for(part):
+                self._cells[cell].add(key)
+
+    def query(self, bbox: BBox) -> Set[str]:
+        """Get keys of all bounding boxes that intersect with given bounding box."""
+        result = set()
+        for west, south, east, north in self._normalize(bbox):
+            candidates = set()
+            for cell in self._cells_for((west, south, east, north)):
+                candidates.update(self._cells.get(cell, ()))
+            result.update(
+                key for key in candidates
+                if any(
+                    w <= east and west <= e and s <= north and south <= n
+                    for (w, s, e, n) in self._bboxes[key]
+                )
+            )
+        return result
+
+
+class IntervalIndex:
+    """
+    Static interval tree of (closed) time intervals:
+    a balanced binary tree over the intervals sorted on start, where each node holds the maximum interval end
+    of its subtree. A query only visits the subtrees that contain overlapping intervals (O(log n + k)).
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[str, datetime.datetime, datetime.datetime]]):
+        intervals = sorted(intervals, key=lambda i: i[1])
+        self._starts = [start for (_, start, _) in intervals]
+        self._intervals = intervals
+        self._max_end = [None] * (4 * len(intervals))
+        if intervals:
+            self._build(0, 0, len(intervals))
+
+    def _build(self, node: int, lo: int, hi: int) -> datetime.datetime:
+        """Fill in maximum interval end of subtree `node`, covering sorted intervals `lo` to `hi` (exclusive)."""
+        if hi - lo == 1:
+            max_end = self._intervals[lo][2]
+        else:
+            mid = (lo + hi) // 2
+            max_end = max(self._build(2 * node + 1, lo, mid), self._build(2 * node + 2, mid, hi))
+        self._max_end[node] = max_end
+        return max_end
+
+    def query(self, start: datetime.datetime, end: datetime.datetime) -> Set[str]:
+        """Get keys of all intervals that overlap with given interval."""
+        # Only intervals that start before the end of the query interval are candidates.
+        count = bisect.bisect_right(self._starts, end)
+        result = set()
+        if count:
+            self._collect(0, 0, len(self._intervals), count, start, result)
+        return result
+
+    def _collect(self, node: int, lo: int, hi: int, count: int, start: datetime.datetime, result: Set[str]):
+        if lo >= count or self._max_end[node] < start:
+            return
+        if hi - lo == 1:
+            result.add(self._intervals[lo][0])
+            return
+        mid = (lo + hi) // 2
+        self._collect(2 * node + 1, lo, mid, count, start, result)
+        self._collect(2 * node + 2, mid, hi, count, start, result)
+
+
+class CollectionIndex:
+    """
+    Search index over a list of collection metadata dictionaries.
+
+    Collections without (valid) spatial or temporal extent are considered unbounded
+    in that respect (they are not excluded by a bbox or datetime filter).
+    """
+
+    def __init__(self, all_metadata: List[dict]):
+        self._order = {}
+        self._spatial = SpatialGridIndex()
+        self._spatial_unbounded = set()
+        self._terms = defaultdict(set)
+        intervals = []
+        for metadata in all_metadata:
+            collection_id = metadata["id"]
+            self._order[collection_id] = len(self._order)
+            try:
+                bboxes = get_spatial_extents(metadata)
+            except (TypeError, ValueError):
+                _log.warning("Collection {c!r}: invalid spatial extent".format(c=collection_id))
+                bboxes = []
+            for bbox in bboxes or [_WORLD]:
+                self._spatial.insert(collection_id, bbox)
+            try:
+                collection_intervals = get_temporal_extents(metadata)
+            except (TypeError, ValueError):
+                _log.warning("Collection {c!r}: invalid temporal extent".format(c=collection_id))
+                collection_intervals = []
+            for start, end in collection_intervals or [(datetime.datetime.min, datetime.datetime.max)]:
+                intervals.append((collection_id, start, end))
+            for term in get_terms(metadata):
+                self._terms[term].add(collection_id)
+        self._temporal = IntervalIndex(intervals)
+
+    def query(
+            self, bbox: Optional[BBox] = None,
+            interval: Optional[Tuple[datetime.datetime, datetime.datetime]] = None,
+            terms: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        """
+        Get ids of collections that match all given criteria (in original order):
+        intersection with bounding box, overlap with time interval and all search terms (keywords/band names).
+        """
+        result = None
+        if bbox is not None:
+            result = self._spatial.query(bbox)
+        if interval is not None:
+            matches = self._temporal.query(*interval)
+            result = matches if result is None else result.intersection(matches)
+        for term in terms or []:
+            matches = self._terms.get(term.lower(), set())
+            result = matches if result is None else result.intersection(matches)
+        if result is None:
+            result = self._order.keys()
+        return sorted(result, key=self._order.__getitem__)
@@ -0,0 +1,111 @@
+"""
+Content-negotiated compression (gzip, and brotli if the optional `brotli` package is available)
+of HTTP response bodies, with a cache of compressed bodies of (static) documents.
+"""
+from collections import OrderedDict
+import gzip
+import threading
+from typing import List, Optional
+
+from flask import Response
+from werkzeug.datastructures import Accept
+
+from openeo_driver import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response mimetypes worth compressing (file downloads like GeoTIFF/zip are already compressed).
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/geo+json", "application/xml",
+    "text/html", "text/plain", "text/csv", "text/xml",
+}
+
+# Compression levels: fast for ad-hoc responses, better for cached documents (compressed only once).
+GZIP_LEVEL = 6
+GZIP_LEVEL_CACHED = 9
+BROTLI_QUALITY = 4
+BROTLI_QUALITY_CACHED = 9
+
+
+def supported_encodings() -> List[str]:
+    """Supported content encodings, in order of preference."""
+    return (["br"] if brotli else []) + ["gzip"]
+
+
+def compress(data: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL_CACHED if cached else GZIP_LEVEL)
+    elif encoding == "br" and brotli:
+        return brotli.compress(data, quality=BROTLI_QUALITY_CACHED if cached else BROTLI_QUALITY)
+    raise ValueError(encoding)
+
+
+class CompressionCache:
+    """
+    Thread-safe LRU cache of compressed response bodies, keyed on (strong) ETag and encoding,
+    limited to a total size of `max_size` bytes.
+    """
+
+    def __init__(self, max_size: int = 32 * 1024 * 1024):
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, etag: str, encoding: str, data: bytes) -> bytes:
+        """Get compressed version of `data` (identified by `etag`), compressing it on cache miss."""
+        key = (etag, encoding)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache_lookup("compression", hit=compressed is not None)
+        if compressed is None:
+            compressed = compress(data, encoding, cached=True)
+            with self._lock:
+                if key not in self._entries and len(compressed) <= self._max_size:
+                    self._entries[key] = compressed
+                    self._size += len(compressed)
+                    while self._size > self._max_size:
+                        _, evicted = self._entries.popitem(last=False)
+                        self._size -= len(evicted)
+        return compressed
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def compress_response(
+        response: Response, accept_encodings: Accept, min_size: int = 1024, cache: Optional[CompressionCache] = None
+) -> Response:
+    """
+    Compress response body in place, according to the client's `Accept-Encoding`.
+    Skips file (passthrough), streamed, non-200, already encoded, small or non-compressible responses.
+    The compressed bodies of responses with a strong ETag are cached (if a cache is given).
+    """
+    if (
+            response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+    etag, weak = response.get_etag()
+    if etag and not weak and cache is not None:
+        compressed = cache.get(etag=etag, encoding=encoding, data=data)
+    else:
+        compressed = compress(data, encoding)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        # Compressed representation is only semantically equivalent to the original one.
+        response.set_etag(etag, weak=True)
+    return response
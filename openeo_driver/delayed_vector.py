@@ -1,13 +1,191 @@
-import fiona
-import geopandas as gpd
-from shapely.geometry import shape
+from collections import OrderedDict
+import threading
+
+from shapely.geometry import box, shape
 from shapely.geometry.base import BaseGeometry
+from shapely.prepared import prep
+from shapely.strtree import STRtree
 from urllib.parse import urlparse
 import requests
-from datetime import datetime, timedelta
+import io
+import itertools
 import os
 import json
-from typing import Iterable, List, Dict
+import re
+import warnings
+from typing import Iterable, Iterator, List, Dict, Hashable, Optional, TextIO, Tuple, Union
+
+from openeo_driver import metrics
+from openeo_driver.download_cache import DownloadCache
+
+
+class VectorCache:
+    """
+    Thread-safe, process-wide LRU cache of parsed vector geometries.
+
+    Entries are keyed on source (file path or URL) and hold a validator of the source version
+    (modification time and size of a file, ETag or Last-Modified of a URL).
+    Memory use is bounded on the total size (in bytes) of the cached source files.
+    """
+
+    def __init__(self, max_size: int = 256 * 1024 * 1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, validator: Hashable = None) -> Optional[Tuple[Hashable, List[BaseGeometry]]]:
+        """
+        Get (validator, geometries) entry of given source (if the validator matches, when given)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and validator is not None and entry[0] != validator:
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache_lookup("vector", hit=entry is not None)
+        return entry[:2] if entry else None
+
+    def put(self, key: Hashable, validator: Hashable, geometries: List[BaseGeometry], size: int):
+        if size > self.max_size:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[2]
+            self._entries[key] = (validator, geometries, size)
+            self._size += size
+            while self._size > self.max_size:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _update_bounds(bounds: list, coordinates: list):
+    """Update [minx, miny, maxx, maxy] list in-place with given (nested) GeoJSON coordinates."""
+    if not coordinates:
+        return
+    first = coordinates[0]
+    if isinstance(first, (int, float)):
+        positions = [coordinates]
+    elif isinstance(first, list) and first and isinstance(first[0], (int, float)):
+        positions = coordinates
+    else:
+        for c in coordinates:
+            _update_bounds(bounds, c)
+        return
+    xs = [p[0] for p in positions]
+    ys = [p[1] for p in positions]
+    bounds[0] = min(bounds[0], min(xs))
+    bounds[1] = min(bounds[1], min(ys))
+    bounds[2] = max(bounds[2], max(xs))
+    bounds[3] = max(bounds[3], max(ys))
+
+
+def _update_geometry_bounds(bounds: list, geometry: Optional[dict]):
+    """Update [minx, miny, maxx, maxy] list in-place with the coordinates of a GeoJSON geometry dict."""
+    if not geometry:
+        return
+    if geometry.get("type") == "GeometryCollection":
+        for g in geometry.get("geometries", []):
+            _update_geometry_bounds(bounds, g)
+    else:
+        _update_bounds(bounds, geometry.get("coordinates"))
+
+
+class _JsonStreamReader:
+    """Minimal incremental reader of JSON values (e.g. the items of a huge array) from a text stream."""
+
+    _WHITESPACE = re.compile(r"\s*")
+
+    def __init__(self, f: TextIO, chunk_size: int = 1024 * 1024):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer, self._pos, self._eof = "", 0, False
+
+    def _fill(self) -> bool:
+        """Read next chunk (dropping the consumed part of the buffer)."""
+        chunk = "" if self._eof else self._f.read(self._chunk_size)
+        self._eof = not chunk
+        self._buffer, self._pos = self._buffer[self._pos:] + chunk, 0
+        return not self._eof
+
+    def peek(self) -> str:
+        """Next non-whitespace character (empty string at end of stream)."""
+        while True:
+            self._pos = self._WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError("Invalid JSON: expected {c!r} at {p!r}".format(c=char, p=self._buffer[self._pos:][:32]))
+        self._pos += 1
+
+    def value(self):
+        """Decode next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # Value at end of buffer could be truncated (e.g. a number).
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._fill()
+
+
+def _iter_geojson_features(f: TextIO, chunk_size: int = 1024 * 1024) -> Iterator[Tuple[dict, Optional[dict]]]:
+    """
+    Incrementally parse a GeoJSON text stream (FeatureCollection, Feature, GeometryCollection or geometry)
+    and yield (geometry, properties) tuples of (GeoJSON) dicts.
+    Items of "features" and "geometries" arrays are decoded one at a time,
+    so memory use is bounded by the chunk size and the largest single feature.
+    """
+    reader = _JsonStreamReader(f, chunk_size=chunk_size)
+    reader.expect("{")
+    members = {}
+    streamed = False
+    while reader.peek() != "}":
+        if members or streamed:
+            reader.expect(",")
+        key = reader.value()
+        reader.expect(":")
+        if key in ["features", "geometries"] and reader.peek() == "[":
+            streamed = True
+            reader.expect("[")
+            first = True
+            while reader.peek() != "]":
+                if not first:
+                    reader.expect(",")
+                first = False
+                item = reader.value()
+                if key == "features":
+                    yield item["geometry"], item.get("properties")
+                else:
+                    yield item, None
+            reader.expect("]")
+        else:
+            members[key] = reader.value()
+    reader.expect("}")
+    if not streamed:
+        if members.get("type") == "Feature":
+            yield members["geometry"], members.get("properties")
+        else:
+            yield members, None
 
 
 class DelayedVector:
@@ -20,51 +198,202 @@ class DelayedVector:
         DelayedVector.path contains the path.
         DelayedVector.geometries loads the vector file into memory so don't do that if it contains a lot of geometries
         (use path instead); DelayedVector.bounds should be safe to use.
+
+        Loaded geometries and bounds are memoized per instance,
+        and geometries are also cached process-wide (in `DelayedVector.cache`) per source version.
+        Remote shapefiles are downloaded to an on-disk cache (`DelayedVector.download_cache`).
+        DelayedVector.query/intersecting select geometries through a (lazily built) spatial index.
     """
+
+    cache = VectorCache()
+    download_cache = DownloadCache()
+
     def __init__(self, path: str):
         # TODO: support pathlib too?
         self.path = path
         self._downloaded_shapefile = None
+        self._geometries = None
+        self._bounds = None
+        self._spatial_index = None
 
     @property
-    def geometries(self) -> Iterable[BaseGeometry]:
-        if self.path.startswith("http"):
-            if DelayedVector._is_shapefile(self.path):
-                local_shp_file = self._download_shapefile(self.path)
-                geometries = DelayedVector._read_shapefile_geometries(local_shp_file)
-            else:  # it's GeoJSON
-                geojson = requests.get(self.path).json()
-                geometries = DelayedVector._read_geojson_geometries(geojson)
-        else:  # it's a file on disk
-            if self.path.endswith(".shp"):
-                geometries = DelayedVector._read_shapefile_geometries(self.path)
-            else:  # it's GeoJSON
-                with open(self.path, 'r') as f:
-                    geojson = json.load(f)
-                    geometries = DelayedVector._read_geojson_geometries(geojson)
-
-        return geometries
+    def geometries(self) -> List[BaseGeometry]:
+        if self._geometries is None:
+            if self.path.startswith("http") and not DelayedVector._is_shapefile(self.path):
+                self._geometries = self._load_remote_geojson_geometries(self.path)
+            else:
+                local_path = self._download_shapefile(self.path) if self.path.startswith("http") else self.path
+                self._geometries = self._load_local_geometries(local_path)
+        return self._geometries
 
     @property
     def bounds(self) -> (float, float, float, float):
-        # FIXME: code duplication
-        if self.path.startswith("http"):
-            if DelayedVector._is_shapefile(self.path):
-                local_shp_file = self._download_shapefile(self.path)
-                bounds = DelayedVector._read_shapefile_bounds(local_shp_file)
-            else:  # it's GeoJSON
-                geojson = requests.get(self.path).json()
-                # FIXME: can be cached
-                bounds = DelayedVector._read_geojson_bounds(geojson)
-        else:  # it's a file on disk
-            if self.path.endswith(".shp"):
-                bounds = DelayedVector._read_shapefile_bounds(self.path)
-            else:  # it's GeoJSON
-                with open(self.path, 'r') as f:
-                    geojson = json.load(f)
-                    bounds = DelayedVector._read_geojson_bounds(geojson)
-
-        return bounds
+        if self._bounds is None:
+            if self._geometries is not None:
+                self._bounds = DelayedVector._total_bounds(self._geometries)
+            elif DelayedVector._is_shapefile(self.path):
+                # Shapefile header has the bounds: no need to load geometries.
+                local_path = self._download_shapefile(self.path) if self.path.startswith("http") else self.path
+                self._bounds = tuple(DelayedVector._read_shapefile_bounds(local_path))
+            elif not self.path.startswith("http"):
+                key, validator = DelayedVector._local_cache_key(self.path)
+                entry = self.cache.get(key, validator=validator)
+                if entry:
+                    self._bounds = DelayedVector._total_bounds(entry[1])
+                else:
+                    # Stream the file instead of loading all geometries.
+                    self._bounds = DelayedVector._read_geojson_bounds(self.path)
+            else:
+                self._bounds = DelayedVector._total_bounds(self.geometries)
+        return self._bounds
+
+    def iter_geometries(
+            self, with_properties: bool = False
+    ) -> Iterator[Union[BaseGeometry, Tuple[BaseGeometry, Optional[dict]]]]:
+        """
+        Iterate lazily over the geometries (or (geometry, properties) tuples),
+        without loading the whole vector file in memory.
+        """
+        if not with_properties:
+            geometries = self._geometries
+            if geometries is None and not self.path.startswith("http"):
+                entry = self.cache.get(*DelayedVector._local_cache_key(self.path))
+                geometries = entry[1] if entry else None
+            if geometries is not None:
+                yield from geometries
+                return
+
+        records = self._iter_records()
+        yield from (records if with_properties else (geometry for geometry, _ in records))
+
+    def iter_geometry_batches(
+            self, batch_size: int, with_properties: bool = False
+    ) -> Iterator[List[Union[BaseGeometry, Tuple[BaseGeometry, Optional[dict]]]]]:
+        """Iterate lazily over lists of (at most) `batch_size` geometries (or (geometry, properties) tuples)."""
+        items = self.iter_geometries(with_properties=with_properties)
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    @property
+    def spatial_index(self) -> STRtree:
+        """STRtree spatial index of the geometries (built lazily, on first use)."""
+        if self._spatial_index is None:
+            with warnings.catch_warnings():
+                # Shapely 1.8 warns about the (index based) STRtree API of shapely 2.
+                warnings.simplefilter("ignore")
+                self._spatial_index = STRtree(self.geometries)
+        return self._spatial_index
+
+    def _query_indices(self, geometry: BaseGeometry) -> List[int]:
+        """Indices of geometries whose bounding box intersects the bounding box of given geometry."""
+        if not self.geometries:
+            return []
+        tree = self.spatial_index
+        if hasattr(tree, "query_items"):
+            # Shapely 1.8: `query` returns geometries, `query_items` their indices.
+            indices = tree.query_items(geometry)
+        else:
+            result = tree.query(geometry)
+            if len(result) and isinstance(result[0], BaseGeometry):
+                # Shapely < 1.8: only geometries.
+                index_by_id = {id(g): i for i, g in enumerate(self.geometries)}
+                indices = [index_by_id[id(g)] for g in result]
+            else:
+                # Shapely 2: array of indices.
+                indices = result
+        return sorted(int(i) for i in indices)
+
+    def query(self, bbox: Union[Tuple[float, float, float, float], BaseGeometry]) -> List[BaseGeometry]:
+        """
+        Geometries whose bounding box intersects given bounding box (minx, miny, maxx, maxy)
+        or the bounding box of given geometry (in original order).
+        """
+        if not isinstance(bbox, BaseGeometry):
+            bbox = box(*bbox)
+        geometries = self.geometries
+        return [geometries[i] for i in self._query_indices(bbox)]
+
+    def intersecting(self, geometry: BaseGeometry) -> List[BaseGeometry]:
+        """Geometries that intersect given geometry (in original order)."""
+        prepared = prep(geometry)
+        return [g for g in self.query(geometry) if prepared.intersects(g)]
+
+    def _iter_records(self) -> Iterator[Tuple[BaseGeometry, Optional[dict]]]:
+        if self.path.startswith("http") and not DelayedVector._is_shapefile(self.path):
+            with requests.get(self.path, stream=True) as resp:
+                resp.raise_for_status()
+                resp.raw.decode_content = True
+                for geometry, properties in _iter_geojson_features(io.TextIOWrapper(resp.raw, encoding="utf-8")):
+                    yield shape(geometry), properties
+        else:
+            local_path = self._download_shapefile(self.path) if self.path.startswith("http") else self.path
+            if local_path.endswith(".shp"):
+                yield from DelayedVector._iter_shapefile_records(local_path)
+            else:
+                with open(local_path, "r") as f:
+                    for geometry, properties in _iter_geojson_features(f):
+                        yield shape(geometry), properties
+
+    @staticmethod
+    def _local_cache_key(path: str) -> Tuple[str, Tuple[int, int]]:
+        file_stat = os.stat(path)
+        return os.path.abspath(path), (file_stat.st_mtime_ns, file_stat.st_size)
+
+    def _load_local_geometries(self, path: str) -> List[BaseGeometry]:
+        key, validator = DelayedVector._local_cache_key(path)
+        entry = self.cache.get(key, validator=validator)
+        if entry:
+            return entry[1]
+        if path.endswith(".shp"):
+            geometries = DelayedVector._read_shapefile_geometries(path)
+        else:  # it's GeoJSON
+            with open(path, 'r') as f:
+                geometries = [shape(geometry) for geometry, _ in _iter_geojson_features(f)]
+        self.cache.put(key, validator=validator, geometries=geometries, size=validator[1])
+        return geometries
+
+    def _load_remote_geojson_geometries(self, url: str) -> List[BaseGeometry]:
+        # Revalidate cached geometries with a conditional request.
+        entry = self.cache.get(url)
+        headers = {}
+        if entry:
+            validator_header, value = entry[0]
+            headers["If-None-Match" if validator_header == "ETag" else "If-Modified-Since"] = value
+        resp = requests.get(url, headers=headers)
+        if entry and resp.status_code == 304:
+            return entry[1]
+        resp.raise_for_status()
+        geometries = list(DelayedVector._read_geojson_geometries(resp.json()))
+        for validator_header in ["ETag", "Last-Modified"]:
+            if validator_header in resp.headers:
+                validator = (validator_header, resp.headers[validator_header])
+                self.cache.put(url, validator=validator, geometries=geometries, size=len(resp.content))
+                break
+        return geometries
+
+    @staticmethod
+    def _total_bounds(geometries: Iterable[BaseGeometry]) -> (float, float, float, float):
+        bounds = [g.bounds for g in geometries if not g.is_empty]
+        if not bounds:
+            return (float("nan"),) * 4
+        return (
+            min(b[0] for b in bounds), min(b[1] for b in bounds),
+            max(b[2] for b in bounds), max(b[3] for b in bounds),
+        )
+
+    @staticmethod
+    def _read_geojson_bounds(path: str) -> (float, float, float, float):
+        bounds = [float("inf"), float("inf"), float("-inf"), float("-inf")]
+        with open(path, "r") as f:
+            # Stream features one by one: only the coordinates of geometries (not properties) are taken into account.
+            for geometry, _ in _iter_geojson_features(f):
+                _update_geometry_bounds(bounds, geometry)
+        if bounds[0] > bounds[2]:
+            return (float("nan"),) * 4
+        return tuple(bounds)
 
     @staticmethod
     def _is_shapefile(path: str) -> bool:
@@ -78,45 +407,30 @@ class DelayedVector:
         if self._downloaded_shapefile:
             return self._downloaded_shapefile
 
-        def expiring_download_directory():
-            now = datetime.now()
-            now_hourly_truncated = now - timedelta(minutes=now.minute, seconds=now.second, microseconds=now.microsecond)
-            hourly_id = hash(shp_url + str(now_hourly_truncated))
-            return "/data/projects/OpenEO/download_%s" % hourly_id
-
-        def save_as(src_url: str, dest_path: str):
-            with open(dest_path, 'wb') as f:
-                f.write(requests.get(src_url).content)
-
-        download_directory = expiring_download_directory()
-        shp_file = download_directory + "/" + DelayedVector._filename(shp_url)
-
-        try:
-            os.mkdir(download_directory)
-
-            shx_file = shp_file.replace(".shp", ".shx")
-            dbf_file = shp_file.replace(".shp", ".dbf")
-
-            shx_url = shp_url.replace(".shp", ".shx")
-            dbf_url = shp_url.replace(".shp", ".dbf")
-
-            save_as(shp_url, shp_file)
-            save_as(shx_url, shx_file)
-            save_as(dbf_url, dbf_file)
-        except FileExistsError:
-            pass
-
-        self._downloaded_shapefile = shp_file
+        # Shapefile components must be side by side and of the same version: download them as a group,
+        # revalidated through the .shp file.
+        parsed = urlparse(shp_url)
+        urls = [shp_url] + [
+            parsed._replace(path=parsed.path[:-len(".shp")] + ext).geturl() for ext in [".shx", ".dbf"]
+        ]
+        self._downloaded_shapefile = str(self.download_cache.get_files(urls)[0])
         return self._downloaded_shapefile
 
     @staticmethod
     def _read_shapefile_geometries(shp_path: str) -> List[BaseGeometry]:
-        # FIXME: returned as a list for safety but possible to return as an iterable?
+        return [geometry for geometry, _ in DelayedVector._iter_shapefile_records(shp_path)]
+
+    @staticmethod
+    def _iter_shapefile_records(shp_path: str) -> Iterator[Tuple[BaseGeometry, dict]]:
+        # Note: fiona (and geopandas) are heavy to import: only import them when necessary.
+        import fiona
         with fiona.open(shp_path) as collection:
-            return [shape(record['geometry']) for record in collection]
+            for record in collection:
+                yield shape(record['geometry']), dict(record['properties'])
 
     @staticmethod
     def _read_shapefile_bounds(shp_path: str) -> List[BaseGeometry]:
+        import fiona
         with fiona.open(shp_path) as collection:
             return collection.bounds
 
@@ -141,15 +455,3 @@ class DelayedVector:
             geometries = [geometry]
 
         return geometries
-
-    @staticmethod
-    def _read_geojson_bounds(geojson: Dict) -> (float, float, float, float):
-        if geojson['type'] == 'FeatureCollection':
-            bounds = gpd.GeoSeries(shape(f["geometry"]) for f in geojson["features"]).total_bounds
-        elif geojson['type'] == 'GeometryCollection':
-            bounds = gpd.GeoSeries(shape(g) for g in geojson['geometries']).total_bounds
-        else:
-            geometry = shape(geojson)
-            bounds = geometry.bounds
-
-        return tuple(bounds)
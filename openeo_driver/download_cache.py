@@ -0,0 +1,251 @@
+"""
+On-disk cache of downloaded (vector) files, shared between worker processes.
+
+Entries are directories named after the SHA-256 hash of their (primary) URL.
+Note that entries are keyed on URL, not on content: the same file under different URLs is downloaded twice,
+and a URL with changed content is detected through revalidation (not by hashing the content).
+This avoids downloading (and hashing) a file before knowing whether it is already cached.
+
+A group of files that belong together (e.g. the .shp, .shx and .dbf files of a shapefile) shares an entry
+and is handled as a whole: only the primary URL is revalidated (with ETag/Last-Modified conditional requests,
+after `revalidate_after` seconds) and when it changed, all files are downloaded again to a new version directory.
+A version directory is complete before the entry's metadata file is (atomically) switched to it,
+so files of different versions are never mixed, and a partial download is never visible.
+The superseded version is kept (until the next change) for readers that are still using it.
+Revalidation of an entry is serialized between processes with a lock file.
+
+Least recently used entries are evicted when the cache exceeds `max_size` bytes
+or when they have not been used for `max_age` seconds.
+
+The defaults can be overridden with environment variables
+`OPENEO_DOWNLOAD_CACHE_DIR`, `OPENEO_DOWNLOAD_CACHE_MAX_SIZE` (bytes), `OPENEO_DOWNLOAD_CACHE_MAX_AGE` (seconds)
+and `OPENEO_DOWNLOAD_CACHE_REVALIDATE_AFTER` (seconds).
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import time
+from typing import List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+
+from openeo_driver import metrics
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows: no locking between processes.
+    fcntl = None
+
+_log = logging.getLogger(__name__)
+
+_META_FILENAME = "meta.json"
+_LOCK_FILENAME = ".lock"
+_TEMP_PREFIX = ".tmp-"
+
+
+def _env(name: str, default: str) -> str:
+    return os.environ.get("OPENEO_DOWNLOAD_CACHE_" + name.upper(), default)
+
+
+def _filename(url: str) -> str:
+    return urlparse(url).path.split("/")[-1] or "download"
+
+
+class DownloadCache:
+    """On-disk, multi-process safe cache of downloaded files (see module docstring)."""
+
+    def __init__(
+            self, root: Union[str, Path] = None, max_size: int = None, max_age: float = None,
+            revalidate_after: float = None, chunk_size: int = 1024 * 1024
+    ):
+        self.root = Path(root or _env("dir", os.path.join(tempfile.gettempdir(), "openeo-download-cache")))
+        self.max_size = int(max_size if max_size is not None else _env("max_size", 10 * 1024 ** 3))
+        self.max_age = float(max_age if max_age is not None else _env("max_age", 7 * 24 * 3600))
+        self.revalidate_after = float(
+            revalidate_after if revalidate_after is not None else _env("revalidate_after", 3600)
+        )
+        self.chunk_size = chunk_size
+
+    def entry_path(self, url: str) -> Path:
+        """Directory of the cache entry for given (primary) URL."""
+        return self.root / hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def get(self, url: str) -> Path:
+        """Get local path of downloaded file, downloading or revalidating it when necessary."""
+        return self.get_files([url])[0]
+
+    def get_files(self, urls: List[str]) -> List[Path]:
+        """
+        Get local paths of a group of files that belong together (side by side, from the same version),
+        downloading or revalidating them when necessary.
+
+        :param urls: URLs to download: the first one is the primary URL, which determines the cache entry
+            and which is used for revalidation of the whole group
+        """
+        entry = self.entry_path(urls[0])
+        meta_path = entry / _META_FILENAME
+        meta = self._read_meta(meta_path, urls=urls)
+        if not self._is_fresh(meta):
+            entry.mkdir(parents=True, exist_ok=True)
+            with self._lock(entry):
+                # Another process might have revalidated the entry while waiting for the lock.
+                meta = self._read_meta(meta_path, urls=urls)
+                if not self._is_fresh(meta):
+                    meta = self._revalidate(urls, entry=entry, meta=meta)
+                else:
+                    metrics.record_cache_lookup("download", hit=True)
+        else:
+            metrics.record_cache_lookup("download", hit=True)
+        # Mark entry as recently used.
+        os.utime(str(entry))
+        return [entry / meta["version"] / _filename(url) for url in urls]
+
+    def _is_fresh(self, meta: Optional[dict]) -> bool:
+        return bool(meta) and time.time() - meta.get("checked", 0) < self.revalidate_after
+
+    @contextlib.contextmanager
+    def _lock(self, entry: Path):
+        """Exclusive lock (between processes) on given cache entry."""
+        if fcntl is None:
+            yield
+            return
+        with (entry / _LOCK_FILENAME).open("a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _revalidate(self, urls: List[str], entry: Path, meta: Optional[dict]) -> dict:
+        """Revalidate (or download) group of files: returns (new) metadata of the entry."""
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            with requests.get(urls[0], headers=headers, stream=True) as resp:
+                if meta is not None and resp.status_code == 304:
+                    metrics.record_cache_lookup("download", hit=True)
+                    meta["checked"] = time.time()
+                    self._write_atomic(entry / _META_FILENAME, [json.dumps(meta).encode("utf-8")])
+                    return meta
+                resp.raise_for_status()
+                metrics.record_cache_lookup("download", hit=False)
+                version = self._download_version(urls, entry=entry, primary=resp)
+                new_meta = {
+                    "urls": urls, "version": version, "checked": time.time(),
+                    "etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified"),
+                }
+        except requests.RequestException as e:
+            if not meta:
+                raise
+            _log.warning("Failed to revalidate {u!r}, using cached version: {e!r}".format(u=urls[0], e=e))
+            return meta
+        self._write_atomic(entry / _META_FILENAME, [json.dumps(new_meta).encode("utf-8")])
+        self._remove_versions(entry, keep=[version, meta["version"] if meta else None])
+        self.evict(keep=[entry])
+        return new_meta
+
+    def _download_version(self, urls: List[str], entry: Path, primary: requests.Response) -> str:
+        """Download all files of the group to a new version directory (given the response of the primary URL)."""
+        temp_dir = Path(tempfile.mkdtemp(dir=str(entry), prefix=_TEMP_PREFIX))
+        try:
+            for url in urls:
+                path = temp_dir / _filename(url)
+                _log.info("Downloading {u!r} to {p!r}".format(u=url, p=str(path)))
+                if url == urls[0]:
+                    self._write(path, primary.iter_content(chunk_size=self.chunk_size))
+                else:
+                    with requests.get(url, stream=True) as resp:
+                        resp.raise_for_status()
+                        self._write(path, resp.iter_content(chunk_size=self.chunk_size))
+            version = temp_dir.name[len(_TEMP_PREFIX):]
+            os.rename(str(temp_dir), str(entry / version))
+        except BaseException:
+            shutil.rmtree(str(temp_dir), ignore_errors=True)
+            raise
+        return version
+
+    @staticmethod
+    def _write(path: Path, chunks):
+        with path.open("wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+    @staticmethod
+    def _write_atomic(path: Path, chunks):
+        """Write chunks to temp file in same directory and rename it to given path."""
+        fd, temp_path = tempfile.mkstemp(dir=str(path.parent), prefix=_TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(temp_path, str(path))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @staticmethod
+    def _remove_versions(entry: Path, keep: List[Optional[str]]):
+        """Remove version directories of entry, except the given ones."""
+        for path in entry.iterdir():
+            if path.is_dir() and not path.name.startswith(".") and path.name not in keep:
+                shutil.rmtree(str(path), ignore_errors=True)
+
+    @staticmethod
+    def _read_meta(meta_path: Path, urls: List[str]) -> Optional[dict]:
+        """Read metadata of entry (`None` if missing, invalid or for another group of URLs)."""
+        try:
+            with meta_path.open("r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("urls") != urls or not (meta_path.parent / meta.get("version", "")).is_dir():
+            return None
+        return meta
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """List (last use time, size, path) of all cache entries."""
+        entries = []
+        for entry in self.root.iterdir():
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            try:
+                last_used = entry.stat().st_mtime
+                size = sum(p.stat().st_size for p in entry.glob("**/*") if p.is_file())
+            except OSError:
+                # Concurrently evicted
+                continue
+            entries.append((last_used, size, entry))
+        return sorted(entries)
+
+    def evict(self, keep: List[Path] = ()):
+        """Remove entries that are expired, and least recently used entries above the maximum size."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        for last_used, size, entry in entries:
+            if now - last_used <= self.max_age and total <= self.max_size:
+                break
+            if entry in keep:
+                continue
+            self._remove(entry)
+            total -= size
+
+    def _remove(self, entry: Path):
+        _log.info("Evicting download cache entry {e!r}".format(e=str(entry)))
+        # Rename first, so the entry disappears atomically for other processes.
+        trash = self.root / (_TEMP_PREFIX + entry.name + "-" + str(os.getpid()))
+        try:
+            os.rename(str(entry), str(trash))
+        except OSError:
+            return
+        shutil.rmtree(str(trash), ignore_errors=True)
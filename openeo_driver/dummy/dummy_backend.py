@@ -15,7 +15,8 @@ from openeo.metadata import CollectionMetadata
 from openeo_driver.backend import SecondaryServices, OpenEoBackendImplementation, CollectionCatalog, ServiceMetadata, \
     BatchJobs, BatchJobMetadata
 from openeo_driver.delayed_vector import DelayedVector
-from openeo_driver.errors import JobNotFoundException, JobNotFinishedException
+from openeo_driver.errors import JobNotFinishedException
+from openeo_driver.job_store import JobStore
 
 DEFAULT_DATETIME = datetime(2020, 4, 23, 16, 20, 27)
 
@@ -260,7 +261,8 @@ class DummyCatalog(CollectionCatalog):
 
 
 class DummyBatchJobs(BatchJobs):
-    _job_registry = {}
+    _job_registry = JobStore()
+    supports_job_events = True
 
     def generate_job_id(self):
         return str(uuid.uuid4())
@@ -268,29 +270,29 @@ class DummyBatchJobs(BatchJobs):
     def create_job(self, user_id: str, process: dict, api_version: str, job_options: dict = None) -> BatchJobMetadata:
         job_id = self.generate_job_id()
         job_info = BatchJobMetadata(
-            id=job_id, status="created", process=process, created=utcnow(), job_options=job_options
+            id=job_id, status="created", process=process, created=utcnow(), job_options=job_options,
+            api_version=api_version
         )
-        self._job_registry[(user_id, job_id)] = job_info
+        self._job_registry.add(user_id=user_id, metadata=job_info)
+        self.notify_job_change(job_id=job_id, user_id=user_id, status=job_info.status)
         return job_info
 
     def get_job_info(self, job_id: str, user_id: str) -> BatchJobMetadata:
-        try:
-            return self._job_registry[(user_id, job_id)]
-        except KeyError:
-            raise JobNotFoundException(job_id=job_id)
+        return self._job_registry.get(job_id=job_id, user_id=user_id)
 
-    def get_user_jobs(self, user_id: str) -> List[BatchJobMetadata]:
-        return [v for (k, v) in self._job_registry.items() if k[0] == user_id]
+    def get_jobs_info(self, job_ids: List[str], user_id: str) -> List[BatchJobMetadata]:
+        return self._job_registry.get_many(job_ids=job_ids, user_id=user_id)
+
+    def get_user_jobs(self, user_id: str, limit: int = None, offset: int = 0) -> List[BatchJobMetadata]:
+        return self._job_registry.get_user_jobs(user_id=user_id, limit=limit, offset=offset)
 
     @classmethod
     def _update_status(cls, job_id: str, user_id: str, status: str):
-        try:
-            cls._job_registry[(user_id, job_id)] = cls._job_registry[(user_id, job_id)]._replace(status=status)
-        except KeyError:
-            raise JobNotFoundException(job_id=job_id)
+        cls._job_registry.update(job_id=job_id, user_id=user_id, status=status)
 
     def start_job(self, job_id: str, user_id: str):
         self._update_status(job_id=job_id, user_id=user_id, status="running")
+        self.notify_job_change(job_id=job_id, user_id=user_id, status="running")
 
     def _output_root(self) -> Path:
         return Path("/data/jobs")
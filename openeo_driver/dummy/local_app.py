@@ -77,7 +77,7 @@ if __name__ == '__main__':
         # 'keyfile': 'test.key'
     }
 
-    from openeo_driver.views import app
+    from openeo_driver.views import app, preload_capabilities
     from flask_cors import CORS
 
     CORS(app)
@@ -89,6 +89,7 @@ if __name__ == '__main__':
     app.config['OPENEO_BACKEND_VERSION'] = "local-42"
     app.config['OPENEO_TITLE'] = 'Local Dummy'
     app.config['OPENEO_DESCRIPTION'] = 'Local openEO API using dummy backend'
+    preload_capabilities(app)
     application = StandaloneApplication(app, options)
 
     application.run()
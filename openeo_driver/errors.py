@@ -31,9 +31,18 @@ import textwrap
 from typing import List, Set
 import uuid
 
+import flask
+
 from openeo_driver.specs import SPECS_ROOT
 
 
+def _default_error_id() -> str:
+    """Default error id: id of current request (when available) to correlate errors with request logs."""
+    if flask.has_app_context() and "request_id" in flask.g:
+        return flask.g.request_id
+    return str(uuid.uuid4())
+
+
 class OpenEOApiException(Exception):
     """
     Exception that wraps the fields/data necessary for OpenEO API compliant status/error handling
@@ -61,7 +70,7 @@ class OpenEOApiException(Exception):
         self.code = code or self.code
         # HTTP status code
         self.status_code = status_code or self.status_code
-        self.id = id or str(uuid.uuid4())
+        self.id = id or _default_error_id()
         self.url = url or self.url
 
     def to_dict(self):
@@ -0,0 +1,174 @@
+"""
+Serving of (large) files, e.g. batch job result assets, with support for conditional requests
+(`If-None-Match`, `If-Modified-Since`) and byte ranges (`Range`, single and multipart, with `If-Range`),
+e.g. for partial (cloud optimized GeoTIFF style) reads with GDAL `/vsicurl/`.
+"""
+import datetime
+import mimetypes
+import os
+from pathlib import Path
+import stat
+from typing import Iterator, List, Tuple, Union
+import uuid
+
+from flask import Response, current_app, request
+from werkzeug.exceptions import NotFound
+from werkzeug.http import parse_range_header
+from werkzeug.wsgi import wrap_file
+
+try:
+    from werkzeug.utils import safe_join
+except ImportError:
+    # Werkzeug < 2.0
+    from werkzeug.security import safe_join
+
+CHUNK_SIZE = 64 * 1024
+
+# Maximum number of ranges to serve as multipart response (requests with more ranges get the full file).
+MAX_RANGES = 32
+
+
+def file_etag(file_stat: os.stat_result) -> str:
+    """Cheap (strong) ETag of a file based on inode, size and modification time (without reading the file)."""
+    return "{i:x}-{s:x}-{m:x}".format(i=file_stat.st_ino, s=file_stat.st_size, m=file_stat.st_mtime_ns)
+
+
+def parse_ranges(header: str, length: int) -> Union[List[Tuple[int, int]], None]:
+    """
+    Parse `Range` header to sorted list of non-overlapping (start, stop) byte ranges (stop exclusive)
+    for a resource of given length.
+    Returns None when the header should be ignored (invalid or too many ranges)
+    and an empty list when the ranges are not satisfiable.
+    """
+    parsed = parse_range_header(header)
+    if parsed is None or parsed.units != "bytes":
+        return None
+    ranges = []
+    for start, stop in parsed.ranges:
+        if start < 0:
+            # Suffix range ("bytes=-500": last 500 bytes)
+            start, stop = max(0, length + start), length
+        else:
+            stop = length if stop is None else min(stop, length)
+        if start < stop:
+            ranges.append((start, stop))
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+
+def _read_range(path: Path, start: int, stop: int) -> Iterator[bytes]:
+    with path.open("rb") as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _read_multipart(path: Path, parts: List[Tuple[bytes, int, int]], closing: bytes) -> Iterator[bytes]:
+    for header, start, stop in parts:
+        yield header
+        yield from _read_range(path, start, stop)
+    yield closing
+
+
+def _utc(value: datetime.datetime) -> datetime.datetime:
+    """Make (parsed HTTP) date timezone-aware: naive dates are in UTC (older Werkzeug versions)."""
+    return value.replace(tzinfo=datetime.timezone.utc) if value.tzinfo is None else value
+
+
+def _is_not_modified(etag: str, last_modified: datetime.datetime) -> bool:
+    if "If-None-Match" in request.headers:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return last_modified <= _utc(request.if_modified_since)
+    return False
+
+
+def _if_range_matches(etag: str, last_modified: datetime.datetime) -> bool:
+    """Check `If-Range` precondition (which requires a strong validator match)."""
+    if "If-Range" not in request.headers:
+        return True
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return _utc(if_range.date) == last_modified
+    return False
+
+
+def send_file(path: Union[str, Path], mimetype: str = None) -> Response:
+    """Build (conditional/partial) response to serve given file."""
+    path = Path(path)
+    try:
+        file_stat = path.stat()
+    except OSError:
+        raise NotFound()
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise NotFound()
+    length = file_stat.st_size
+    etag = file_etag(file_stat)
+    last_modified = datetime.datetime.fromtimestamp(int(file_stat.st_mtime), tz=datetime.timezone.utc)
+    mimetype = mimetype or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+    response = current_app.response_class(mimetype=mimetype, direct_passthrough=True)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers["Accept-Ranges"] = "bytes"
+
+    if request.method in ("GET", "HEAD") and _is_not_modified(etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    ranges = None
+    if request.method == "GET" and "Range" in request.headers and _if_range_matches(etag, last_modified):
+        ranges = parse_ranges(request.headers["Range"], length=length)
+
+    if ranges is None:
+        response.response = wrap_file(request.environ, path.open("rb"), buffer_size=CHUNK_SIZE)
+        response.content_length = length
+    elif len(ranges) == 0:
+        response.status_code = 416
+        response.headers["Content-Range"] = "bytes */{l}".format(l=length)
+        response.content_length = 0
+    elif len(ranges) == 1:
+        start, stop = ranges[0]
+        response.status_code = 206
+        response.headers["Content-Range"] = "bytes {s}-{e}/{l}".format(s=start, e=stop - 1, l=length)
+        response.response = _read_range(path, start, stop)
+        response.content_length = stop - start
+    else:
+        boundary = uuid.uuid4().hex
+        parts = [
+            (
+                "{n}--{b}\r\nContent-Type: {m}\r\nContent-Range: bytes {s}-{e}/{l}\r\n\r\n".format(
+                    n="\r\n" if i > 0 else "", b=boundary, m=mimetype, s=start, e=stop - 1, l=length
+                ).encode("ascii"),
+                start, stop
+            )
+            for i, (start, stop) in enumerate(ranges)
+        ]
+        closing = "\r\n--{b}--\r\n".format(b=boundary).encode("ascii")
+        response.status_code = 206
+        response.content_type = "multipart/byteranges; boundary={b}".format(b=boundary)
+        response.response = _read_multipart(path, parts, closing)
+        response.content_length = sum(len(h) + stop - start for (h, start, stop) in parts) + len(closing)
+    return response
+
+
+def send_from_directory(directory: Union[str, Path], filename: str, mimetype: str = None) -> Response:
+    """Like `flask.send_from_directory`, with byte range and conditional request support."""
+    path = safe_join(str(directory), filename)
+    if path is None:
+        raise NotFound()
+    return send_file(path, mimetype=mimetype)
@@ -0,0 +1,69 @@
+"""
+In-process notification of batch job changes (status/progress),
+e.g. to push job status transitions to clients instead of having them poll.
+
+Events only reach subscribers in the process where they are published.
+With multiple worker processes, a back-end has to publish the changes in each process
+(e.g. from a shared message queue or by watching a shared job database),
+otherwise job events are only usable with a single worker process.
+"""
+from collections import deque, namedtuple
+import threading
+import time
+from typing import List, Optional
+
+# Batch job change event, with (per event bus) sequence number.
+JobEvent = namedtuple("JobEvent", ["seq", "user_id", "job_id", "status", "progress", "time"])
+
+
+class JobEventBus:
+    """
+    Thread-safe job event bus: publishers call `publish`,
+    subscribers block in `wait` for events after a given sequence number.
+    A bounded history of recent events allows subscribers to catch up after reconnecting.
+    """
+
+    def __init__(self, history: int = 10000):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=history)
+        self._seq = 0
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, user_id: str, job_id: str, status: str, progress: float = None) -> JobEvent:
+        with self._condition:
+            self._seq += 1
+            event = JobEvent(
+                seq=self._seq, user_id=user_id, job_id=job_id, status=status, progress=progress, time=time.time()
+            )
+            self._events.append(event)
+            self._condition.notify_all()
+        return event
+
+    def _events_after(self, after: int, user_id: str, job_id: Optional[str]) -> List[JobEvent]:
+        events = []
+        for event in reversed(self._events):
+            if event.seq <= after:
+                break
+            if event.user_id == user_id and (job_id is None or event.job_id == job_id):
+                events.append(event)
+        return events[::-1]
+
+    def wait(self, after: int, user_id: str, job_id: str = None, timeout: float = None) -> List[JobEvent]:
+        """
+        Get events (of given user and optionally job) with sequence number higher than `after`,
+        waiting at most `timeout` seconds for new ones (returns empty list on timeout).
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while True:
+                events = self._events_after(after=after, user_id=user_id, job_id=job_id)
+                if events:
+                    return events
+                after = max(after, self._seq)
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
@@ -0,0 +1,99 @@
+"""
+Paginated reading of batch job logs stored as JSON lines files.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import List, Optional, Tuple, Union
+
+from openeo_driver.backend import log_level_at_least
+
+_log = logging.getLogger(__name__)
+
+
+class JsonLinesLogReader:
+    """
+    Paginated reader of a JSON lines log file (one JSON object per line, possibly still being appended to).
+
+    The id of a log entry is its (zero-based) line number.
+    A sparse index (byte offset of every `index_interval`-th line) is built incrementally while reading,
+    so that a page can be served by seeking close to its start, instead of scanning the file from the start.
+    """
+
+    def __init__(self, path: Union[str, Path], index_interval: int = 1000):
+        self._path = Path(path)
+        self._index_interval = index_interval
+        self._lock = threading.Lock()
+        self._reset(inode=None)
+
+    def _reset(self, inode: Optional[int]):
+        self._inode = inode
+        # Byte offsets of lines 0, interval, 2 x interval, ...
+        self._offsets = [0]
+        # Number of (complete) lines and bytes indexed so far.
+        self._lines = 0
+        self._bytes = 0
+
+    def _register(self, line: int, pos: int):
+        """Register start position of given line (while scanning forward)."""
+        if line > self._lines:
+            self._lines, self._bytes = line, pos
+            if line % self._index_interval == 0:
+                self._offsets.append(pos)
+
+    def _seek(self, f, line: int) -> Tuple[int, int]:
+        """Move to start of given line (or end of file, if before): returns (line, byte position)."""
+        block = min(line // self._index_interval, len(self._offsets) - 1)
+        current, pos = block * self._index_interval, self._offsets[block]
+        f.seek(pos)
+        while current < line:
+            raw = f.readline()
+            if not raw.endswith(b"\n"):
+                # End of file (or incomplete line being written)
+                break
+            current, pos = current + 1, pos + len(raw)
+            self._register(current, pos)
+        f.seek(pos)
+        return current, pos
+
+    def read(
+            self, offset: Optional[int] = None, limit: Optional[int] = None, level: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Read log entries after entry `offset` (line number), at most `limit` entries,
+        with at least severity `level`.
+        Returns the entries and the offset for the next page (None if there are no more entries).
+        """
+        start = 0 if offset is None else offset + 1
+        entries = []
+        with self._lock:
+            try:
+                f = self._path.open("rb")
+            except FileNotFoundError:
+                return [], None
+            with f:
+                file_stat = os.fstat(f.fileno())
+                if file_stat.st_ino != self._inode or file_stat.st_size < self._bytes:
+                    # New or truncated file.
+                    self._reset(inode=file_stat.st_ino)
+                line, pos = self._seek(f, start)
+                if line < start:
+                    return [], None
+                while limit is None or len(entries) < limit:
+                    raw = f.readline()
+                    if not raw.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(raw.decode("utf-8")) if raw.strip() else None
+                    except ValueError:
+                        _log.warning("Invalid log entry at {p}:{l}".format(p=self._path, l=line))
+                        entry = None
+                    if entry is not None and (not level or log_level_at_least(entry.get("level"), level)):
+                        entry["id"] = str(line)
+                        entries.append(entry)
+                    line, pos = line + 1, pos + len(raw)
+                    self._register(line, pos)
+                more = len(entries) == limit and f.readline().endswith(b"\n")
+        return entries, (entries[-1]["id"] if more else None)
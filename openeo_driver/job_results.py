@@ -0,0 +1,144 @@
+"""
+Manifest of batch job result assets (file size, media type and checksum), cached per job.
+Cached manifests are revalidated against the size and modification time of the asset files,
+so that a re-run job (e.g. in another worker process) is picked up.
+
+Checksums are expensive for large assets: they are computed once when the job finishes
+and stored in a sidecar file (`CHECKSUMS_FILENAME`, in `sha256sum` format) next to the results,
+see `write_checksums`. They are never computed while handling a request.
+"""
+from collections import namedtuple, OrderedDict
+import hashlib
+import logging
+import mimetypes
+from pathlib import Path
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from openeo_driver import metrics
+from openeo_driver.backend import BatchJobs
+
+_log = logging.getLogger(__name__)
+
+# Metadata of a single job result asset (`size` and `checksum` are None if the file is not available).
+AssetInfo = namedtuple("AssetInfo", ["filename", "path", "size", "media_type", "checksum"])
+
+# Name of checksums sidecar file (in `sha256sum` format) in a job result directory.
+CHECKSUMS_FILENAME = "checksums.sha256"
+
+
+def file_checksum(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 checksum (hex digest) of a file."""
+    sha256 = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def write_checksums(directory: Path, filenames: Iterable[str]) -> Path:
+    """Compute SHA-256 checksums of given files in a directory and write them to its checksums sidecar file."""
+    path = directory / CHECKSUMS_FILENAME
+    with path.open("w") as f:
+        for filename in filenames:
+            f.write("{c}  {f}\n".format(c=file_checksum(directory / filename), f=filename))
+    return path
+
+
+def read_checksums(directory: Path) -> Dict[str, str]:
+    """Read checksums sidecar file of a directory: mapping of filename to checksum (empty if there is none)."""
+    try:
+        with (directory / CHECKSUMS_FILENAME).open("r") as f:
+            return {
+                filename: checksum
+                for checksum, filename in (line.rstrip("\n").split("  ", 1) for line in f if "  " in line)
+            }
+    except OSError:
+        return {}
+
+
+def build_assets_manifest(results: Dict[str, str]) -> Dict[str, AssetInfo]:
+    """
+    Build assets manifest from `BatchJobs.get_results` output (mapping of filename to directory).
+    Checksums are taken from the checksums sidecar files (`None` without sidecar).
+    """
+    manifest = {}
+    sidecars = {}
+    for filename, output_dir in results.items():
+        path = Path(output_dir) / filename
+        try:
+            size = path.stat().st_size
+        except OSError:
+            _log.warning("Job result asset {p!r} is not available".format(p=str(path)))
+            size = None
+        if output_dir not in sidecars:
+            sidecars[output_dir] = read_checksums(Path(output_dir))
+        checksum = sidecars[output_dir].get(filename) if size is not None else None
+        media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        manifest[filename] = AssetInfo(
+            filename=filename, path=path, size=size, media_type=media_type, checksum=checksum
+        )
+    return manifest
+
+
+def _file_stats(manifest: Dict[str, AssetInfo]) -> Optional[Tuple[Tuple[int, int], ...]]:
+    """(size, modification time) of all asset files, or `None` if they don't match the manifest."""
+    stats = []
+    for asset in manifest.values():
+        try:
+            stat = asset.path.stat()
+        except OSError:
+            return None
+        if stat.st_size != asset.size:
+            return None
+        stats.append((stat.st_size, stat.st_mtime_ns))
+    return tuple(stats)
+
+
+class JobResultsCache:
+    """
+    Thread-safe LRU cache of job result manifests, keyed on (user id, job id),
+    so that listing and downloading results does not require a lookup in the backend each time.
+    Only complete manifests (all asset files available) are cached,
+    and they are only served while size and modification time of the asset files are unchanged.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_manifest(self, batch_jobs: BatchJobs, job_id: str, user_id: str) -> Dict[str, AssetInfo]:
+        """Get (cached) manifest of job results."""
+        key = (user_id, job_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and _file_stats(entry[0]) != entry[1]:
+            # Asset files changed or disappeared (e.g. job was restarted).
+            entry = None
+        metrics.record_cache_lookup("job_results", hit=entry is not None)
+        if entry is not None:
+            return entry[0]
+        manifest = build_assets_manifest(batch_jobs.get_results(job_id=job_id, user_id=user_id))
+        stats = _file_stats(manifest)
+        if stats is not None:
+            with self._lock:
+                self._entries[key] = (manifest, stats)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return manifest
+
+    def invalidate(self, job_id: str, user_id: str):
+        """Drop manifest of given job (e.g. when the job is restarted)."""
+        with self._lock:
+            self._entries.pop((user_id, job_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
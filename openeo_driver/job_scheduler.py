@@ -0,0 +1,383 @@
+"""
+Reference (local) execution model for batch jobs:
+a priority queue of submitted jobs and a pool of worker processes
+that evaluate the job's process graph and write the results to a job directory.
+"""
+import heapq
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import shutil
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import uuid
+
+from openeo import ImageCollection
+from openeo_driver.backend import BatchJobs, BatchJobMetadata
+from openeo_driver.errors import JobNotFinishedException, JobNotFoundException, OpenEOApiException
+from openeo_driver.job_logs import JsonLinesLogReader
+from openeo_driver.job_results import CHECKSUMS_FILENAME, write_checksums
+from openeo_driver.job_store import JobStore
+from openeo_driver.save_result import SaveResult, ImageCollectionResult, AggregatePolygonResult, JSONResult, \
+    MultipleFilesResult
+from openeo_driver.utils import replace_nan_values
+
+_log = logging.getLogger(__name__)
+
+# Name of the (JSON lines) log file in the job directory.
+LOG_FILENAME = "log.jsonl"
+
+# Signature of a job runner: `runner(job_dir, process, api_version)`, executed in a worker process.
+JobRunner = Callable[[Path, dict, str], None]
+
+
+def write_log_entry(job_dir: Path, level: str, message: str):
+    """Append log entry to job log (in JSON lines format, entry ids are line numbers, see `JsonLinesLogReader`)"""
+    with (job_dir / LOG_FILENAME).open("a") as f:
+        f.write(json.dumps({"level": level, "message": message, "path": []}) + "\n")
+
+
+def save_job_result(result, job_dir: Path) -> List[Path]:
+    """Save the result of a process graph evaluation as asset file(s) in given job directory."""
+    if isinstance(result, ImageCollection):
+        result = ImageCollectionResult(result, format="GTiff", options={})
+    if isinstance(result, ImageCollectionResult):
+        target = job_dir / "out"
+        filename = Path(result.imagecollection.download(str(target), format=result.format, **result.options))
+        if filename.parent != job_dir:
+            # Backend wrote output somewhere else: copy it into the job directory.
+            shutil.copy(str(filename), str(target))
+            filename = target
+        return [filename]
+    elif isinstance(result, AggregatePolygonResult) and result.format in ("netcdf", "ncdf"):
+        return [Path(result.to_netcdf(destination=str(job_dir / "timeseries.nc")))]
+    elif isinstance(result, MultipleFilesResult):
+        targets = []
+        for path in result.files:
+            target = job_dir / path.name
+            shutil.copy(str(path), str(target))
+            targets.append(target)
+        return targets
+    elif isinstance(result, SaveResult) and not isinstance(result, JSONResult):
+        raise ValueError("Unsupported result type {t}".format(t=type(result)))
+    else:
+        data = result.prepare_for_json() if isinstance(result, JSONResult) else replace_nan_values(result)
+        target = job_dir / "result.json"
+        with target.open("w") as f:
+            json.dump(data, f)
+        return [target]
+
+
+def run_job(job_dir: Path, process: dict, api_version: str):
+    """
+    Default job runner: evaluate the process graph and save the result in the job directory.
+    Runs in a worker process: failure is signalled through the exit code.
+    """
+    # Import here to avoid circular imports
+    from openeo_driver.ProcessGraphDeserializer import evaluate
+    write_log_entry(job_dir, "info", "Starting job (pid {p})".format(p=os.getpid()))
+    try:
+        result = evaluate(process["process_graph"], viewingParameters={"version": api_version or "1.0.0"})
+        assets = save_job_result(result, job_dir)
+        # Compute checksums once, instead of in (each) results listing request.
+        write_checksums(job_dir, [p.name for p in assets])
+    except Exception as e:
+        write_log_entry(job_dir, "error", "{t}: {e!s}".format(t=type(e).__name__, e=e))
+        raise
+    write_log_entry(job_dir, "info", "Finished job: {a!r}".format(a=[p.name for p in assets]))
+
+
+class LocalJobScheduler:
+    """
+    Schedules batch jobs (from a `JobStore`) on a pool of worker processes.
+
+    Jobs are dispatched in order of priority (higher first) and submission time,
+    with at most `max_workers` jobs running in total and `max_jobs_per_user` jobs per user.
+    Each job runs in its own process (in directory `output_root/job_id`), so that it can be canceled.
+
+    Status transitions: "created" -> "queued" -> "running" -> "finished"/"error",
+    and "queued"/"running" -> "canceled".
+    """
+
+    def __init__(
+            self, job_store: JobStore, output_root: Union[str, Path], max_workers: int = 2,
+            max_jobs_per_user: int = 1, runner: JobRunner = run_job, mp_context: str = None
+    ):
+        self._job_store = job_store
+        self._output_root = Path(output_root)
+        self._max_workers = max_workers
+        self._max_jobs_per_user = max_jobs_per_user
+        self._runner = runner
+        self._mp = multiprocessing.get_context(mp_context)
+        # Heap of (-priority, sequence number, user_id, job_id) tuples.
+        self._queue: List[Tuple[int, int, str, str]] = []
+        self._sequence = itertools.count()
+        # Worker processes of running jobs by (user_id, job_id)
+        self._running: Dict[Tuple[str, str], multiprocessing.Process] = {}
+        self._canceled = set()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        # Dispatcher thread is started on first submit, in the process that submits
+        # (threads don't survive a fork, e.g. of an app preloaded in the gunicorn master process).
+        self._dispatcher = None
+        self._dispatcher_pid = None
+        self._dispatcher_lock = threading.Lock()
+
+    def job_dir(self, job_id: str) -> Path:
+        return self._output_root / job_id
+
+    def post_fork(self):
+        """(Re)start dispatcher in a forked worker process (e.g. as part of a gunicorn `post_fork` hook)."""
+        self._ensure_dispatcher()
+
+    def _ensure_dispatcher(self):
+        """
+        Start dispatcher thread if it is not running in the current process
+        (worker processes of running jobs are only known to the process that started them).
+        """
+        with self._dispatcher_lock:
+            if self._dispatcher_pid == os.getpid():
+                return
+            self._condition = threading.Condition()
+            self._running = {}
+            self._canceled = set()
+            self._shutdown = False
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+            self._dispatcher_pid = os.getpid()
+
+    def submit(self, job_id: str, user_id: str, priority: int = 0):
+        """Queue a job for execution (no-op if it is already queued or running)."""
+        self._ensure_dispatcher()
+        with self._condition:
+            job = self._job_store.get(job_id=job_id, user_id=user_id)
+            if job.status in ("queued", "running"):
+                return
+            self._job_store.update(job_id=job_id, user_id=user_id, status="queued", updated=datetime.utcnow())
+            heapq.heappush(self._queue, (-priority, next(self._sequence), user_id, job_id))
+            self._condition.notify_all()
+
+    def cancel(self, job_id: str, user_id: str):
+        """Cancel a queued or running job."""
+        with self._condition:
+            job = self._job_store.get(job_id=job_id, user_id=user_id)
+            key = (user_id, job_id)
+            if key in self._running:
+                # Final status is set when the worker process is reaped.
+                self._canceled.add(key)
+                self._running[key].terminate()
+            elif job.status == "queued":
+                self._queue = [e for e in self._queue if (e[2], e[3]) != key]
+                heapq.heapify(self._queue)
+                self._job_store.update(job_id=job_id, user_id=user_id, status="canceled", updated=datetime.utcnow())
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    @property
+    def running_count(self) -> int:
+        return len(self._running)
+
+    def shutdown(self, cancel_running: bool = False):
+        """Stop dispatching jobs (and optionally cancel the running ones)."""
+        with self._condition:
+            self._shutdown = True
+            if cancel_running:
+                for key, process in self._running.items():
+                    self._canceled.add(key)
+                    process.terminate()
+            self._condition.notify_all()
+        if self._dispatcher and self._dispatcher_pid == os.getpid():
+            self._dispatcher.join()
+
+    def _next_job(self) -> Union[Tuple[str, str], None]:
+        """Pop highest priority job that does not exceed the concurrency caps (call while holding lock)."""
+        if len(self._running) >= self._max_workers:
+            return None
+        per_user = Counter(user_id for (user_id, _) in self._running)
+        for entry in sorted(self._queue):
+            user_id, job_id = entry[2:]
+            if per_user[user_id] < self._max_jobs_per_user:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                return user_id, job_id
+        return None
+
+    def _dispatch_loop(self):
+        with self._condition:
+            while not self._shutdown:
+                key = self._next_job()
+                if key is None:
+                    self._condition.wait()
+                else:
+                    try:
+                        self._start(*key)
+                    except Exception:
+                        # Don't let a single job take down the dispatcher (and all jobs queued after it).
+                        _log.exception("Failed to start job {j!r} of user {u!r}".format(j=key[1], u=key[0]))
+                        self._fail(*key)
+
+    def _fail(self, user_id: str, job_id: str):
+        """Mark job that could not be started as failed (if it still exists)."""
+        try:
+            self._job_store.update(job_id=job_id, user_id=user_id, status="error", updated=datetime.utcnow())
+        except JobNotFoundException:
+            pass
+
+    def _start(self, user_id: str, job_id: str):
+        job = self._job_store.get(job_id=job_id, user_id=user_id)
+        job_dir = self.job_dir(job_id)
+        if job_dir.is_dir():
+            # Re-run: don't mix up results and logs of the previous run with the new ones.
+            shutil.rmtree(str(job_dir))
+        job_dir.mkdir(parents=True)
+        process = self._mp.Process(
+            target=self._runner, name="openeo-job-{j}".format(j=job_id),
+            kwargs={"job_dir": job_dir, "process": job.process, "api_version": job.api_version},
+        )
+        _log.info("Starting job {j!r} of user {u!r}".format(j=job_id, u=user_id))
+        process.start()
+        self._running[user_id, job_id] = process
+        try:
+            self._job_store.update(job_id=job_id, user_id=user_id, status="running", updated=datetime.utcnow())
+        except Exception:
+            # Not reaped otherwise: stop worker process.
+            del self._running[user_id, job_id]
+            process.terminate()
+            process.join()
+            raise
+        threading.Thread(
+            target=self._reap, args=(user_id, job_id, process), name="job-reaper-{j}".format(j=job_id), daemon=True
+        ).start()
+
+    def _reap(self, user_id: str, job_id: str, process: multiprocessing.Process):
+        """Wait for worker process to exit and set final job status."""
+        process.join()
+        with self._condition:
+            key = (user_id, job_id)
+            del self._running[key]
+            if key in self._canceled:
+                self._canceled.discard(key)
+                status = "canceled"
+            elif process.exitcode == 0:
+                status = "finished"
+            else:
+                status = "error"
+            _log.info("Job {j!r} of user {u!r}: exit code {e}, status {s!r}".format(
+                j=job_id, u=user_id, e=process.exitcode, s=status
+            ))
+            self._job_store.update(job_id=job_id, user_id=user_id, status=status, updated=datetime.utcnow())
+            self._condition.notify_all()
+
+
+class LocalBatchJobs(BatchJobs):
+    """
+    `BatchJobs` implementation that runs jobs locally with a `LocalJobScheduler`.
+    Job priority can be set with the "priority" job option (integer, higher runs first).
+    Job state (and job events) are kept per process: use it with a single worker process.
+    """
+
+    supports_job_events = True
+
+    # Maximum number of (least recently used) job log readers to keep.
+    _MAX_LOG_READERS = 100
+
+    def __init__(
+            self, output_root: Union[str, Path], job_store: JobStore = None, max_workers: int = 2,
+            max_jobs_per_user: int = 1, runner: JobRunner = run_job, mp_context: str = None
+    ):
+        self._job_store = job_store if job_store is not None else JobStore()
+        self.scheduler = LocalJobScheduler(
+            job_store=self._job_store, output_root=output_root, max_workers=max_workers,
+            max_jobs_per_user=max_jobs_per_user, runner=runner, mp_context=mp_context,
+        )
+        self._log_readers: Dict[str, JsonLinesLogReader] = OrderedDict()
+        self._log_readers_lock = threading.Lock()
+        self._job_store.add_listener(
+            lambda user_id, job: self.notify_job_change(
+                job_id=job.id, user_id=user_id, status=job.status, progress=job.progress
+            )
+        )
+
+    @staticmethod
+    def _priority(job_options: Optional[dict]) -> int:
+        """Get job priority from job options (raises 400 error on invalid value)."""
+        priority = (job_options or {}).get("priority", 0)
+        try:
+            if isinstance(priority, bool) or int(priority) != float(priority):
+                raise ValueError
+            return int(priority)
+        except (TypeError, ValueError, OverflowError):
+            raise OpenEOApiException(
+                status_code=400, code="ParameterInvalid",
+                message="Invalid job priority {p!r}: should be an integer.".format(p=priority)
+            )
+
+    def create_job(self, user_id: str, process: dict, api_version: str, job_options: dict = None) -> BatchJobMetadata:
+        self._priority(job_options)
+        job_info = BatchJobMetadata(
+            id=str(uuid.uuid4()), status="created", process=process, created=datetime.utcnow(),
+            job_options=job_options, api_version=api_version
+        )
+        return self._job_store.add(user_id=user_id, metadata=job_info)
+
+    def get_job_info(self, job_id: str, user_id: str) -> BatchJobMetadata:
+        return self._job_store.get(job_id=job_id, user_id=user_id)
+
+    def get_jobs_info(self, job_ids: List[str], user_id: str) -> List[BatchJobMetadata]:
+        return self._job_store.get_many(job_ids=job_ids, user_id=user_id)
+
+    def get_user_jobs(self, user_id: str, limit: int = None, offset: int = 0) -> List[BatchJobMetadata]:
+        return self._job_store.get_user_jobs(user_id=user_id, limit=limit, offset=offset)
+
+    def post_fork(self):
+        self.scheduler.post_fork()
+
+    def start_job(self, job_id: str, user_id: str):
+        job_options = self.get_job_info(job_id=job_id, user_id=user_id).job_options
+        self.scheduler.submit(job_id=job_id, user_id=user_id, priority=self._priority(job_options))
+
+    def get_results(self, job_id: str, user_id: str) -> Dict[str, str]:
+        if self.get_job_info(job_id=job_id, user_id=user_id).status != "finished":
+            raise JobNotFinishedException
+        job_dir = self.scheduler.job_dir(job_id)
+        return {
+            p.name: str(job_dir) for p in sorted(job_dir.iterdir())
+            if p.is_file() and p.name not in (LOG_FILENAME, CHECKSUMS_FILENAME)
+        }
+
+    def get_log_entries(self, job_id: str, user_id: str, offset: str) -> List[dict]:
+        return self.get_log_page(job_id=job_id, user_id=user_id, offset=offset)[0]
+
+    def get_log_page(
+            self, job_id: str, user_id: str, offset: Optional[str] = None, limit: Optional[int] = None,
+            level: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        self.get_job_info(job_id=job_id, user_id=user_id)
+        try:
+            offset = int(offset) if offset else None
+        except ValueError:
+            raise OpenEOApiException(
+                status_code=400, code="ParameterInvalid", message="Invalid log offset {o!r}".format(o=offset)
+            )
+        return self._log_reader(job_id).read(offset=offset, limit=limit, level=level)
+
+    def _log_reader(self, job_id: str) -> JsonLinesLogReader:
+        """Get (cached) log reader of a job, keeping at most `_MAX_LOG_READERS` readers."""
+        with self._log_readers_lock:
+            reader = self._log_readers.get(job_id)
+            if reader is None:
+                reader = self._log_readers[job_id] = JsonLinesLogReader(self.scheduler.job_dir(job_id) / LOG_FILENAME)
+            self._log_readers.move_to_end(job_id)
+            while len(self._log_readers) > self._MAX_LOG_READERS:
+                self._log_readers.popitem(last=False)
+            return reader
+
+    def cancel_job(self, job_id: str, user_id: str):
+        self.scheduler.cancel(job_id=job_id, user_id=user_id)
@@ -0,0 +1,238 @@
+"""
+Reusable (thread-safe) batch job stores for `BatchJobs` implementations,
+with per-user index (ordered on creation time) and status index
+for O(1) job lookup and O(k) job listing.
+"""
+import bisect
+from datetime import datetime
+import json
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Tuple, Union
+
+from openeo_driver.backend import BatchJobMetadata
+from openeo_driver.errors import JobNotFoundException
+
+_log = logging.getLogger(__name__)
+
+_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+class JobRecord:
+    """Compact container of a batch job's owner and metadata fields"""
+
+    __slots__ = (
+        "user_id", "job_id", "status", "created", "updated", "process", "job_options",
+        "title", "description", "progress", "api_version",
+    )
+
+    # Metadata fields that can be updated
+    UPDATABLE = {"status", "updated", "process", "job_options", "title", "description", "progress"}
+
+    def __init__(
+            self, user_id: str, job_id: str, status: str, created: datetime, process: dict,
+            updated: datetime = None, job_options: dict = None,
+            title: str = None, description: str = None, progress: float = None, api_version: str = None
+    ):
+        self.user_id = user_id
+        self.job_id = job_id
+        self.status = status
+        self.created = created
+        self.updated = updated
+        self.process = process
+        self.job_options = job_options
+        self.title = title
+        self.description = description
+        self.progress = progress
+        self.api_version = api_version
+
+    @classmethod
+    def from_metadata(cls, user_id: str, metadata: BatchJobMetadata) -> 'JobRecord':
+        return cls(
+            user_id=user_id, job_id=metadata.id, status=metadata.status, created=metadata.created,
+            updated=metadata.updated, process=metadata.process, job_options=metadata.job_options,
+            title=metadata.title, description=metadata.description, progress=metadata.progress,
+            api_version=metadata.api_version,
+        )
+
+    def to_metadata(self) -> BatchJobMetadata:
+        return BatchJobMetadata(
+            id=self.job_id, status=self.status, created=self.created, updated=self.updated,
+            process=self.process, job_options=self.job_options,
+            title=self.title, description=self.description, progress=self.progress,
+            api_version=self.api_version,
+        )
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.user_id, self.job_id
+
+    def to_dict(self) -> dict:
+        """Dump to JSON-able dictionary (e.g. for persistence)."""
+        d = {k: getattr(self, k) for k in self.__slots__}
+        for k in ["created", "updated"]:
+            d[k] = d[k].strftime(_DATETIME_FORMAT) if d[k] else None
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'JobRecord':
+        d = dict(d)
+        for k in ["created", "updated"]:
+            d[k] = datetime.strptime(d[k], _DATETIME_FORMAT) if d.get(k) else None
+        return cls(**d)
+
+
+class JobStore:
+    """
+    Thread-safe in-memory batch job store,
+    with a per-user index (ordered on creation time) and a status index.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Job records by (user_id, job_id) key
+        self._jobs: Dict[Tuple[str, str], JobRecord] = {}
+        # Per user: sorted list of (created, job_id) tuples
+        self._by_user: Dict[str, List[Tuple[datetime, str]]] = {}
+        # Per status: set of (user_id, job_id) keys
+        self._by_status: Dict[str, set] = {}
+        self._listeners: List[Callable[[str, BatchJobMetadata], None]] = []
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def add_listener(self, listener: Callable[[str, BatchJobMetadata], None]):
+        """
+        Register callback to be called with (user_id, metadata) when a job is added
+        or its status/progress changes (e.g. to call `BatchJobs.notify_job_change`).
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, user_id: str, metadata: BatchJobMetadata):
+        for listener in self._listeners:
+            try:
+                listener(user_id, metadata)
+            except Exception:
+                _log.exception("Job store listener {l!r} failed".format(l=listener))
+
+    def _index(self, record: JobRecord):
+        bisect.insort(self._by_user.setdefault(record.user_id, []), (record.created, record.job_id))
+        self._by_status.setdefault(record.status, set()).add(record.key)
+
+    def _unindex(self, record: JobRecord):
+        user_jobs = self._by_user[record.user_id]
+        del user_jobs[bisect.bisect_left(user_jobs, (record.created, record.job_id))]
+        self._by_status[record.status].discard(record.key)
+
+    def _get_record(self, job_id: str, user_id: str) -> JobRecord:
+        try:
+            return self._jobs[user_id, job_id]
+        except KeyError:
+            raise JobNotFoundException(job_id=job_id)
+
+    def add(self, user_id: str, metadata: BatchJobMetadata) -> BatchJobMetadata:
+        """Add (or replace) a job"""
+        record = JobRecord.from_metadata(user_id=user_id, metadata=metadata)
+        with self._lock:
+            if record.key in self._jobs:
+                self._unindex(self._jobs[record.key])
+            self._jobs[record.key] = record
+            self._index(record)
+            self._persist(record)
+        self._notify(user_id, metadata)
+        return metadata
+
+    def get(self, job_id: str, user_id: str) -> BatchJobMetadata:
+        """Get job metadata (raises `JobNotFoundException` on unknown job/user id)"""
+        with self._lock:
+            return self._get_record(job_id=job_id, user_id=user_id).to_metadata()
+
+    def get_many(self, job_ids: List[str], user_id: str) -> List[BatchJobMetadata]:
+        """Get metadata of multiple jobs of a user (in order of `job_ids`), skipping unknown job ids"""
+        with self._lock:
+            return [self._jobs[user_id, j].to_metadata() for j in job_ids if (user_id, j) in self._jobs]
+
+    def update(self, job_id: str, user_id: str, **fields) -> BatchJobMetadata:
+        """Update fields (e.g. `status`, `progress`, `updated`) of a job"""
+        unknown = set(fields).difference(JobRecord.UPDATABLE)
+        if unknown:
+            raise ValueError("Can not update job fields {u!r}".format(u=sorted(unknown)))
+        with self._lock:
+            record = self._get_record(job_id=job_id, user_id=user_id)
+            if "status" in fields and fields["status"] != record.status:
+                self._by_status[record.status].discard(record.key)
+                self._by_status.setdefault(fields["status"], set()).add(record.key)
+            changed = any(getattr(record, k) != fields[k] for k in ["status", "progress"] if k in fields)
+            for name, value in fields.items():
+                setattr(record, name, value)
+            self._persist(record)
+            metadata = record.to_metadata()
+        if changed:
+            self._notify(user_id, metadata)
+        return metadata
+
+    def remove(self, job_id: str, user_id: str):
+        """Remove a job"""
+        with self._lock:
+            record = self._get_record(job_id=job_id, user_id=user_id)
+            self._unindex(record)
+            del self._jobs[record.key]
+            self._delete(record)
+
+    def get_user_jobs(self, user_id: str, limit: int = None, offset: int = 0) -> List[BatchJobMetadata]:
+        """Get (page of) jobs of a user, ordered on creation time"""
+        with self._lock:
+            user_jobs = self._by_user.get(user_id, [])
+            page = user_jobs[offset:None if limit is None else offset + limit]
+            return [self._jobs[user_id, job_id].to_metadata() for (_, job_id) in page]
+
+    def get_jobs_with_status(self, status: str) -> List[Tuple[str, BatchJobMetadata]]:
+        """Get all jobs with given status as (user_id, metadata) tuples, ordered on creation time"""
+        with self._lock:
+            records = sorted((self._jobs[k] for k in self._by_status.get(status, ())), key=lambda r: r.created)
+            return [(r.user_id, r.to_metadata()) for r in records]
+
+    def _persist(self, record: JobRecord):
+        """Hook to persist a new/updated job record (called while holding lock)"""
+        pass
+
+    def _delete(self, record: JobRecord):
+        """Hook to delete a persisted job record (called while holding lock)"""
+        pass
+
+
+class SqliteJobStore(JobStore):
+    """
+    Job store that is persisted in a SQLite database (write-through),
+    so that it survives restarts. All reads are served from the in-memory indexes.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        super().__init__()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs "
+                "(user_id TEXT NOT NULL, job_id TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (user_id, job_id))"
+            )
+        for (data,) in self._db.execute("SELECT data FROM jobs"):
+            record = JobRecord.from_dict(json.loads(data))
+            self._jobs[record.key] = record
+            self._index(record)
+        _log.info("Loaded {c} jobs from {p!r}".format(c=len(self._jobs), p=str(path)))
+
+    def _persist(self, record: JobRecord):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (user_id, job_id, data) VALUES (?, ?, ?)",
+                (record.user_id, record.job_id, json.dumps(record.to_dict()))
+            )
+
+    def _delete(self, record: JobRecord):
+        with self._db:
+            self._db.execute("DELETE FROM jobs WHERE user_id = ? AND job_id = ?", (record.user_id, record.job_id))
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,124 @@
+"""
+Prometheus-style instrumentation of the openEO driver:
+request latency/status per endpoint, process graph evaluation, caches and authentication.
+
+Requires the optional `prometheus_client` package (metrics are no-ops without it).
+To aggregate metrics across (gunicorn) worker processes, point environment variable
+`PROMETHEUS_MULTIPROC_DIR` to an (empty) directory before startup
+and call `child_exit` from the gunicorn `child_exit` server hook.
+"""
+import contextlib
+import logging
+import os
+import time
+from typing import List, Tuple
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+_log = logging.getLogger(__name__)
+
+
+class _NoopMetric:
+    """Stand-in for metrics when `prometheus_client` is not available."""
+
+    def labels(self, *args, **kwargs) -> '_NoopMetric':
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, amount):
+        pass
+
+
+def _multiprocess_dir() -> str:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+
+if prometheus_client:
+    _registry = prometheus_client.CollectorRegistry(auto_describe=True)
+
+
+def _metric(metric_type: str, name: str, documentation: str, labelnames: List[str], **kwargs):
+    if prometheus_client is None:
+        return _NoopMetric()
+    cls = getattr(prometheus_client, metric_type)
+    return cls(name, documentation, labelnames=labelnames, registry=_registry, **kwargs)
+
+
+http_requests = _metric(
+    "Counter", "openeo_http_requests_total", "Number of handled HTTP requests",
+    ["endpoint", "api_version", "method", "status"]
+)
+http_request_duration = _metric(
+    "Histogram", "openeo_http_request_duration_seconds", "HTTP request handling time",
+    ["endpoint", "api_version"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, float("inf")),
+)
+http_requests_in_flight = _metric(
+    "Gauge", "openeo_http_requests_in_flight", "Number of HTTP requests being handled",
+    ["endpoint"], multiprocess_mode="livesum"
+)
+processes_executed = _metric(
+    "Counter", "openeo_processes_executed_total", "Number of successfully executed processes (process graph nodes)",
+    ["process"]
+)
+process_duration = _metric(
+    "Counter", "openeo_process_duration_seconds_total",
+    "Total execution time of processes (inclusive the nodes they depend on)",
+    ["process"]
+)
+cache_requests = _metric(
+    "Counter", "openeo_cache_requests_total", "Number of cache lookups", ["cache", "result"]
+)
+auth_lookups = _metric(
+    "Counter", "openeo_auth_lookups_total", "Number of user lookups from access tokens", ["method", "result"]
+)
+
+
+@contextlib.contextmanager
+def time_process(process_id: str):
+    """
+    Context manager to count and time successful execution of a process
+    (failures are not recorded, to avoid metric label pollution by unknown process ids).
+    """
+    start = time.time()
+    yield
+    processes_executed.labels(process=process_id).inc()
+    process_duration.labels(process=process_id).inc(time.time() - start)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    cache_requests.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_auth_lookup(method: str, success: bool):
+    auth_lookups.labels(method=method, result="success" if success else "failure").inc()
+
+
+def generate_latest() -> Tuple[bytes, str]:
+    """Generate metrics in Prometheus text format: returns (data, content type)."""
+    if prometheus_client is None:
+        raise RuntimeError("prometheus_client is not available")
+    if _multiprocess_dir():
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = _registry
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def child_exit(server, worker):
+    """Gunicorn `child_exit` server hook to clean up metrics of dead worker process."""
+    if prometheus_client is not None and _multiprocess_dir():
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,4 +1,3 @@
-import os
 import tempfile
 import warnings
 from abc import ABC
@@ -7,8 +6,8 @@ from tempfile import mkstemp
 from typing import Union
 from zipfile import ZipFile
 
-import numpy as np
-from flask import send_from_directory, jsonify
+from flask import jsonify
+from openeo_driver import file_serving
 from openeo_driver.utils import replace_nan_values
 from shapely.geometry import GeometryCollection, mapping
 
@@ -43,7 +42,7 @@ class ImageCollectionResult(SaveResult):
 
     def create_flask_response(self):
         filename = self.imagecollection.download(None, bbox="", time="", format=self.format, **self.options)
-        return send_from_directory(os.path.dirname(filename), os.path.basename(filename))
+        return file_serving.send_file(filename)
 
 
 class JSONResult(SaveResult):
@@ -90,7 +89,7 @@ class AggregatePolygonResult(JSONResult):
     def create_flask_response(self):
         if self.format.lower() in ('netcdf'):
             filename = self.to_netcdf()
-            return send_from_directory(os.path.dirname(filename), os.path.basename(filename))
+            return file_serving.send_file(filename)
 
         return super().create_flask_response()
 
@@ -126,6 +125,7 @@ class AggregatePolygonResult(JSONResult):
         return the_array
 
     def to_netcdf(self,destination = None):
+        import numpy as np
         points = [r.representative_point() for r in self._regions]
         lats = [p.y for p in points]
         lons = [p.x for p in points]
@@ -153,6 +153,7 @@ class AggregatePolygonResult(JSONResult):
         """
         Convert internal timeseries structure to Coverage JSON structured dict
         """
+        import numpy as np
 
         # Convert GeometryCollection to list of GeoJSON Polygon coordinate arrays
         polygons = [p["coordinates"] for p in mapping(self._regions)["geometries"]]
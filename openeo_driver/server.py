@@ -1,15 +1,109 @@
-import gunicorn.app.base
-from gunicorn.six import iteritems
-
-from openeo_driver.views import app
-
 """
 Script to start a production server. This script can serve as the entry-point for doing spark-submit.
+
+Server settings can be given as command line options or environment variables
+(e.g. `--workers 8` or `OPENEO_SERVER_WORKERS=8`), see `--help`.
+Defaults are derived from the available CPU cores and memory.
 """
+import argparse
+import logging
+import multiprocessing
+import os
+from typing import List, Union
+
+import gunicorn.app.base
+
+_log = logging.getLogger(__name__)
+
+# Rough estimate of memory usage of a worker process (in bytes), to cap the default number of workers.
+WORKER_MEMORY_ESTIMATE = 512 * 1024 * 1024
+
+WORKER_CLASSES = ["gthread", "gevent", "sync"]
+
+
+def cpu_count() -> int:
+    """Number of CPU cores available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def available_memory() -> Union[int, None]:
+    """Memory (in bytes) available to this process: physical memory, or cgroup limit if lower."""
+    memory = None
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        pass
+    for path in ["/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"]:
+        try:
+            with open(path) as f:
+                limit = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        memory = min(memory, limit) if memory else limit
+    return memory
+
 
+def number_of_workers(cores: int = None, memory: int = None) -> int:
+    """Default number of worker processes: (2 x cores) + 1, capped by available memory."""
+    cores = cores or cpu_count()
+    workers = 2 * cores + 1
+    if memory:
+        workers = min(workers, max(1, memory // WORKER_MEMORY_ESTIMATE))
+    return workers
 
-def number_of_workers():
-    return 4#(multiprocessing.cpu_count() * 2) + 1
+
+def _env(name: str, default=None):
+    return os.environ.get("OPENEO_SERVER_" + name.upper(), default)
+
+
+def _env_flag(name: str) -> bool:
+    """Boolean environment variable: "1", "true", "yes" or "on" (case insensitive) enable it."""
+    return (_env(name) or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def build_options(argv: List[str] = None) -> dict:
+    """Build gunicorn options from command line arguments and environment variables."""
+    parser = argparse.ArgumentParser(
+        description="Run openEO driver web app with gunicorn. "
+                    "Options can also be set with environment variables (OPENEO_SERVER_<OPTION>)."
+    )
+    parser.add_argument("--bind", default=_env("bind", "127.0.0.1:8080"), help="Address to bind to (host:port)")
+    parser.add_argument("--workers", type=int, default=_env("workers"), help="Number of worker processes")
+    parser.add_argument("--worker-class", choices=WORKER_CLASSES, default=_env("worker_class", "gthread"))
+    parser.add_argument(
+        "--threads", type=int, default=_env("threads"),
+        help="Threads per worker (gthread) or greenlet connections per worker (gevent)"
+    )
+    parser.add_argument("--keepalive", type=int, default=_env("keepalive", 5), help="Keep-alive timeout (seconds)")
+    parser.add_argument(
+        "--max-requests", type=int, default=_env("max_requests", 0),
+        help="Recycle worker after this number of requests (default: 0, no recycling)"
+    )
+    parser.add_argument("--max-requests-jitter", type=int, default=_env("max_requests_jitter", 100))
+    parser.add_argument("--timeout", type=int, default=_env("timeout", 1000), help="Worker timeout (seconds)")
+    parser.add_argument("--graceful-timeout", type=int, default=_env("graceful_timeout", 30))
+    parser.add_argument("--no-preload", action="store_true", default=_env_flag("no_preload"))
+    args = parser.parse_args(argv)
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers or number_of_workers(memory=available_memory()),
+        "worker_class": args.worker_class,
+        "keepalive": args.keepalive,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "preload_app": not args.no_preload,
+    }
+    if args.worker_class == "gthread":
+        options["threads"] = args.threads or 4
+    elif args.worker_class == "gevent":
+        options["worker_connections"] = args.threads or 100
+    return options
 
 
 class StandaloneApplication(gunicorn.app.base.BaseApplication):
@@ -20,21 +114,28 @@ class StandaloneApplication(gunicorn.app.base.BaseApplication):
         super(StandaloneApplication, self).__init__()
 
     def load_config(self):
-        config = dict([(key, value) for key, value in iteritems(self.options)
-                       if key in self.cfg.settings and value is not None])
-        for key, value in iteritems(config):
-            self.cfg.set(key.lower(), value)
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
 
     def load(self):
         return self.application
 
 
+def main(argv: List[str] = None):
+    logging.basicConfig(level=logging.INFO)
+    options = build_options(argv)
+
+    from openeo_driver import metrics
+    from openeo_driver.views import app, preload, post_fork
+
+    options["child_exit"] = metrics.child_exit
+    options["post_fork"] = post_fork
+    if options["preload_app"]:
+        preload(app)
+    _log.info("Starting gunicorn with options {o!r}".format(o=options))
+    StandaloneApplication(app, options).run()
+
+
 if __name__ == '__main__':
-    options = {
-        'bind': '%s:%s' % ('127.0.0.1', '0'),
-        'workers': number_of_workers(),
-        'worker_class':'gaiohttp',
-        'timeout':1000
-    }
-    # Modification 3: pass Flask app instead of handler_app
-    StandaloneApplication(app, options).run()
\ No newline at end of file
+    main()
@@ -10,9 +10,10 @@ import logging
 from typing import Callable, Tuple
 
 import requests
-from flask import request, current_app, Request
+from flask import request, current_app, Request, g
 
 from openeo.rest.auth.auth import BearerAuth
+from openeo_driver import metrics
 from openeo_driver.errors import AuthenticationRequiredException, \
     AuthenticationSchemeInvalidException, TokenInvalidException, CredentialsInvalidException
 
@@ -60,8 +61,11 @@ class HttpAuthHandler:
 
         @functools.wraps(f)
         def decorated(*args, **kwargs):
-            # Try to load user info from request (failure will raise appropriate exception).
-            user = self.get_user_from_bearer_token(request)
+            # Reuse user already resolved in this request (e.g. by admission control), if any.
+            user = g.get("optional_user")
+            if user is None:
+                # Try to load user info from request (failure will raise appropriate exception).
+                user = g.optional_user = self.get_user_from_bearer_token(request)
             # If handler function expects a `user` argument: pass the user object
             if 'user' in f.__code__.co_varnames:
                 kwargs['user'] = user
@@ -84,12 +88,20 @@ class HttpAuthHandler:
         """Get User object from bearer token of request."""
         token = self.get_auth_token(request, "Bearer")
         if token.startswith(self._BASIC_ACCESS_TOKEN_PREFIX):
-            return self.resolve_basic_access_token(token)
+            method, resolve = "basic", self.resolve_basic_access_token
         elif len(token) > 16:
             # Assume token is OpenID Connect access token
-            return self.resolve_oidc_access_token(token)
+            method, resolve = "oidc", self.resolve_oidc_access_token
         else:
+            metrics.record_auth_lookup("unknown", success=False)
             raise TokenInvalidException
+        try:
+            user = resolve(token)
+        except Exception:
+            metrics.record_auth_lookup(method, success=False)
+            raise
+        metrics.record_auth_lookup(method, success=True)
+        return user
 
     def parse_basic_auth_header(self, request: Request) -> Tuple[str, str]:
         """
@@ -1,15 +1,22 @@
 from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import copy
 import datetime
 import functools
+import hashlib
+import inspect
+import json
 import logging
-import os
+import math
+import random
 import re
-from typing import Callable, Tuple, List
+import threading
+import time
+import uuid
+from typing import Callable, Tuple, List, Optional
 
-from flask import Flask, request, url_for, jsonify, send_from_directory, abort, make_response, Blueprint, g, \
-    current_app, redirect
-import pkg_resources
+from flask import Flask, request, url_for, jsonify, abort, make_response, Blueprint, g, \
+    current_app, redirect, copy_current_request_context
 from werkzeug.exceptions import HTTPException, NotFound
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -17,7 +24,15 @@ from openeo import ImageCollection
 from openeo.capabilities import ComparableVersion
 from openeo.error_summary import ErrorSummary
 from openeo.util import date_to_rfc3339, dict_no_none, deep_get
-from openeo_driver.backend import ServiceMetadata, BatchJobMetadata, get_backend_implementation
+from openeo_driver.admission import AdmissionController, AdmissionDenied
+from openeo_driver.backend import ServiceMetadata, BatchJobMetadata, LazyBackendImplementation, CollectionCatalog, \
+    LOG_LEVELS
+from openeo_driver.collection_index import parse_interval
+from openeo_driver.compression import CompressionCache, compress_response
+from openeo_driver import file_serving
+from openeo_driver.job_events import JobEvent
+from openeo_driver.job_results import JobResultsCache
+from openeo_driver import metrics
 from openeo_driver.errors import OpenEOApiException, ProcessGraphMissingException, ServiceNotFoundException, \
     FilePathInvalidException
 from openeo_driver.ProcessGraphDeserializer import evaluate, get_process_registry
@@ -46,19 +61,11 @@ DEFAULT_VERSION = '0.4.2'
 _log.info("API Versions: {v}".format(v=API_VERSIONS))
 _log.info("Default API Version: {v}".format(v=DEFAULT_VERSION))
 
-app = Flask(__name__)
-
-# Make sure app handles reverse proxy aspects (e.g. HTTPS) correctly.
-app.wsgi_app = ProxyFix(app.wsgi_app)
-
-# TODO: get this OpenID config url from a real config
-app.config['OPENID_CONNECT_CONFIG_URL'] = "https://sso-dev.vgt.vito.be/auth/realms/terrascope/.well-known/openid-configuration"
-
 auth_handler = HttpAuthHandler()
 
 openeo_bp = Blueprint('openeo', __name__)
 
-backend_implementation = get_backend_implementation()
+backend_implementation = LazyBackendImplementation()
 
 
 @openeo_bp.url_defaults
@@ -89,20 +96,134 @@ def requested_api_version() -> ComparableVersion:
     return ComparableVersion(g.api_version)
 
 
-@openeo_bp.before_request
+# Incoming request id header (e.g. set by reverse proxy) and its allowed format
+REQUEST_ID_HEADER = "X-Request-Id"
+_REQUEST_ID_REGEX = re.compile(r"^[\w.:-]{1,128}$")
+
+
 def _before_request():
-    # Log some info about request
-    data = request.data
-    if len(data) > 1000:
-        data = repr(data[:1000] + b'...') + ' ({b} bytes)'.format(b=len(data))
-    else:
-        data = repr(data)
-    _log.info("Handling {method} {url} with data {data}".format(
-        method=request.method, url=request.url, data=data
-    ))
+    incoming_id = request.headers.get(REQUEST_ID_HEADER)
+    g.request_id = incoming_id if incoming_id and _REQUEST_ID_REGEX.match(incoming_id) else str(uuid.uuid4())
+    if _log.isEnabledFor(logging.INFO):
+        # Avoid reading request body: use content length from headers.
+        _log.info("Handling {m} {u} (request id {r}, content length {c})".format(
+            m=request.method, u=request.url, r=g.request_id, c=request.content_length
+        ))
+    if _log.isEnabledFor(logging.DEBUG) and request.content_length:
+        # Log small request bodies (all or a sample of them).
+        config = current_app.config
+        if (
+                request.content_length <= config.get("OPENEO_LOG_REQUEST_BODY_MAX_SIZE", 1000)
+                and random.random() < config.get("OPENEO_LOG_REQUEST_BODY_SAMPLE_RATE", 1.0)
+        ):
+            _log.debug("Request {r} body: {b!r}".format(r=g.request_id, b=request.get_data(cache=True)))
+
+
+def _add_request_id_header(response):
+    if "request_id" in g:
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
+
+
+def _metrics_before_request():
+    g.metrics_endpoint = request.endpoint or "unmatched"
+    g.metrics_start = time.time()
+    metrics.http_requests_in_flight.labels(endpoint=g.metrics_endpoint).inc()
+
+
+def _metrics_after_request(response):
+    if "metrics_start" in g:
+        api_version = g.get("api_version", "")
+        metrics.http_request_duration.labels(endpoint=g.metrics_endpoint, api_version=api_version).observe(
+            time.time() - g.metrics_start
+        )
+        metrics.http_requests.labels(
+            endpoint=g.metrics_endpoint, api_version=api_version, method=request.method, status=response.status_code
+        ).inc()
+    return response
+
+
+def _metrics_teardown_request(exc=None):
+    if "metrics_start" in g:
+        metrics.http_requests_in_flight.labels(endpoint=g.metrics_endpoint).dec()
+
+
+def _compress_response(response):
+    """
+    Compress response (content negotiated through `Accept-Encoding`),
+    unless disabled with config `OPENEO_COMPRESSION` or smaller than `OPENEO_COMPRESSION_MIN_SIZE` (bytes).
+    """
+    config = current_app.config
+    if not config.get("OPENEO_COMPRESSION", True):
+        return response
+    if "openeo_compression_cache" not in current_app.extensions:
+        current_app.extensions["openeo_compression_cache"] = CompressionCache(
+            max_size=config.get("OPENEO_COMPRESSION_CACHE_SIZE", 32 * 1024 * 1024)
+        )
+    return compress_response(
+        response, accept_encodings=request.accept_encodings,
+        min_size=config.get("OPENEO_COMPRESSION_MIN_SIZE", 1024),
+        cache=current_app.extensions["openeo_compression_cache"],
+    )
+
+
+def prometheus_metrics():
+    """Prometheus metrics (unauthenticated, not versioned)"""
+    if metrics.prometheus_client is None:
+        raise OpenEOApiException(status_code=501, code="NotSupported", message="Metrics are not available.")
+    data, content_type = metrics.generate_latest()
+    return current_app.response_class(data, mimetype=None, content_type=content_type)
+
+
+# Endpoints subject to admission control (when `OPENEO_ADMISSION_CONTROL` is configured)
+PROCESSING_ENDPOINTS = {"openeo.result", "openeo.preview", "openeo.execute", "openeo.point", "openeo.download"}
+
+_admission_controller_lock = threading.Lock()
+
+
+def _get_admission_controller() -> Optional[AdmissionController]:
+    """
+    Get admission controller of current app (lazily built from `OPENEO_ADMISSION_CONTROL` config dict,
+    containing `AdmissionController` constructor arguments), or None when not configured.
+    """
+    config = current_app.config.get("OPENEO_ADMISSION_CONTROL")
+    if not config:
+        return None
+    with _admission_controller_lock:
+        if "openeo_admission" not in current_app.extensions:
+            current_app.extensions["openeo_admission"] = AdmissionController.from_config(config)
+        return current_app.extensions["openeo_admission"]
+
+
+@openeo_bp.before_request
+def _admission_control():
+    if request.endpoint not in PROCESSING_ENDPOINTS or request.method != "POST":
+        return None
+    controller = _get_admission_controller()
+    if controller is None:
+        return None
+    user = _get_optional_user()
+    key = user.user_id if user else "anonymous:{a}".format(a=request.remote_addr)
+    try:
+        controller.admit(key)
+    except AdmissionDenied as e:
+        _log.warning("Request {m} {p} of {k!r} not admitted: {e}".format(m=request.method, p=request.path, k=key, e=e))
+        error = OpenEOApiException(status_code=429, code="TooManyRequests", message=str(e))
+        response = jsonify(error.to_dict())
+        response.status_code = error.status_code
+        response.headers["Retry-After"] = str(int(math.ceil(e.retry_after)))
+        return response
+    g.admission = (controller, key)
+
+
+@openeo_bp.teardown_request
+def _admission_release(exc=None):
+    admission = g.pop("admission", None)
+    if admission:
+        controller, key = admission
+        controller.release(key)
 
 
-@app.errorhandler(HTTPException)
 def handle_http_exceptions(error: HTTPException):
     # Convert to OpenEOApiException based handling
     return handle_openeoapi_exception(OpenEOApiException(
@@ -112,14 +233,12 @@ def handle_http_exceptions(error: HTTPException):
     ))
 
 
-@app.errorhandler(OpenEOApiException)
 def handle_openeoapi_exception(error: OpenEOApiException):
     error_dict = error.to_dict()
     _log.error(str(error_dict), exc_info=True)
     return jsonify(error_dict), error.status_code
 
 
-@app.errorhandler(Exception)
 def handle_error(error: Exception):
     # TODO: convert to OpenEOApiException based handling
     error = backend_implementation.summarize_exception(error)
@@ -154,6 +273,85 @@ def response_204_no_content():
     return make_response('', 204, {"Content-Type": "application/json"})
 
 
+def _extract_pagination() -> Tuple[Optional[int], int]:
+    """Extract pagination parameters (`limit` and `offset`) from request arguments."""
+    pagination = []
+    for name, default, minimum in [("limit", None, 1), ("offset", 0, 0)]:
+        value = request.args.get(name)
+        if value is None:
+            pagination.append(default)
+            continue
+        try:
+            value = int(value)
+            if value < minimum:
+                raise ValueError("should be at least {m}".format(m=minimum))
+        except ValueError as e:
+            raise OpenEOApiException(
+                status_code=400, code="ParameterInvalid",
+                message="Invalid value for parameter {n!r}: {v!r} ({e})".format(n=name, v=request.args[name], e=e)
+            )
+        pagination.append(value)
+    limit, offset = pagination
+    return limit, offset
+
+
+def _get_page(get_items: Callable, limit: Optional[int], offset: int) -> Tuple[list, List[dict]]:
+    """
+    Get page of items (through `get_items` callable, with `limit` and `offset` arguments)
+    and build the corresponding pagination links (e.g. link to "next" page).
+    """
+    if limit is None:
+        return get_items(), []
+    if _accepts_pagination(get_items):
+        # Ask for one item extra to find out if there is a next page.
+        items = get_items(limit=limit + 1, offset=offset)
+    else:
+        # Backend implementation without pagination support (old signature): paginate here.
+        items = get_items()[offset:offset + limit + 1]
+    links = []
+    if len(items) > limit:
+        args = request.args.to_dict()
+        args.update(limit=limit, offset=offset + limit)
+        # View args (e.g. `job_id`) take precedence over homonymous query args.
+        # Note that `version` is already popped from view args (and is re-added by `_add_version`).
+        args.pop("version", None)
+        args.update(request.view_args or {})
+        links.append({
+            "rel": "next",
+            "href": url_for(request.endpoint, _external=True, **args),
+        })
+    return items[:limit], links
+
+
+def _accepts_pagination(func: Callable) -> bool:
+    """Check whether given callable accepts `limit` and `offset` arguments."""
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters):
+        return True
+    names = {p.name for p in parameters}
+    return "limit" in names and "offset" in names
+
+
+# Container for a JSON document, together with its serialized form and ETag.
+JsonDocument = namedtuple("JsonDocument", ["data", "body", "etag"])
+
+
+def build_json_document(data) -> JsonDocument:
+    """Serialize given (JSON-able) data once and calculate its ETag"""
+    body = jsonify(data).get_data()
+    return JsonDocument(data=data, body=body, etag=hashlib.md5(body).hexdigest())
+
+
+def json_document_response(document: JsonDocument):
+    """Build JSON response from pre-serialized document, with ETag/conditional request support."""
+    response = current_app.response_class(document.body, mimetype=current_app.config["JSONIFY_MIMETYPE"])
+    response.set_etag(document.etag)
+    return response.make_conditional(request)
+
+
 class EndpointRegistry:
     """
     Registry of OpenEO API endpoints, to be used as decorator with flask view functions.
@@ -216,19 +414,49 @@ class EndpointRegistry:
 api_endpoint = EndpointRegistry()
 
 
+# Config settings that affect the capabilities document
+_CAPABILITIES_CONFIG_KEYS = [
+    'OPENEO_TITLE', 'OPENEO_SERVICE_ID', 'OPENEO_BACKEND_VERSION', 'OPENEO_DESCRIPTION',
+    'OPENEO_BACKEND_DEPLOY_METADATA',
+]
+
+# Cache of capabilities documents, keyed on API version and config settings
+_capabilities_documents = {}
+
+
 @openeo_bp.route('/')
 def index():
-    app_config = current_app.config
+    document = get_capabilities_document(api_version=requested_api_version().to_string(), app_config=current_app.config)
+    return json_document_response(document)
+
 
-    api_version = requested_api_version().to_string()
+def get_capabilities_document(api_version: str, app_config: dict) -> JsonDocument:
+    """Get (cached) capabilities document for given API version and config."""
+    key = (api_version,) + tuple(repr(app_config.get(k)) for k in _CAPABILITIES_CONFIG_KEYS)
+    document = _capabilities_documents.get(key)
+    if document is None:
+        document = _capabilities_documents[key] = build_json_document(
+            build_capabilities(api_version=api_version, app_config=app_config)
+        )
+    return document
+
+
+def preload_capabilities(flask_app: Flask):
+    """Precompute capabilities documents of all supported API versions (e.g. at startup, before forking workers)."""
+    with flask_app.app_context():
+        for api_version in sorted(set(v.version for v in API_VERSIONS.values() if v.supported)):
+            get_capabilities_document(api_version=api_version, app_config=flask_app.config)
+
+
+def build_capabilities(api_version: str, app_config: dict) -> dict:
+    """Build capabilities document for given API version"""
     title = app_config.get('OPENEO_TITLE', 'OpenEO API')
     service_id = app_config.get('OPENEO_SERVICE_ID', re.sub(r"\s+", "", title.lower() + '-' + api_version))
     # TODO only list endpoints that are actually supported by the backend.
     endpoints = EndpointRegistry.get_capabilities_endpoints(_openeo_endpoint_metadata, api_version=api_version)
-    deploy_metadata = app_config.get('OPENEO_BACKEND_DEPLOY_METADATA') \
-                      or build_backend_deploy_metadata(packages=["openeo", "openeo_driver"])
+    deploy_metadata = app_config.get('OPENEO_BACKEND_DEPLOY_METADATA') or get_backend_deploy_metadata()
 
-    capabilities = {
+    return {
         "version": api_version,  # Deprecated pre-0.4.0 API version field
         "api_version": api_version,  # API version field since 0.4.0
         "backend_version": app_config.get('OPENEO_BACKEND_VERSION', '0.0.1'),
@@ -252,10 +480,10 @@ def index():
         "_backend_deploy_metadata": deploy_metadata
     }
 
-    return jsonify(capabilities)
-
 
 def build_backend_deploy_metadata(packages: List[str]) -> dict:
+    # Note: pkg_resources is slow to import and query: only use it when necessary.
+    import pkg_resources
     version_info = {}
     for package in packages:
         try:
@@ -268,11 +496,19 @@ def build_backend_deploy_metadata(packages: List[str]) -> dict:
     }
 
 
+@functools.lru_cache(maxsize=1)
+def get_backend_deploy_metadata() -> dict:
+    """Backend deploy metadata of the driver's own packages (built once per process)."""
+    return build_backend_deploy_metadata(packages=["openeo", "openeo_driver"])
+
+
 @openeo_bp.route('/health')
 def health():
-    return jsonify({
-        "health": backend_implementation.health_check()
-    })
+    admission = _get_admission_controller()
+    return jsonify(dict_no_none(
+        health=backend_implementation.health_check(),
+        admission=admission.stats() if admission else None,
+    ))
 
 
 @api_endpoint(version=ComparableVersion("0.3.1").or_lower)
@@ -383,7 +619,7 @@ def download():
         # TODO Unify with execute?
         filename = image_collection.download(None,outputformat=outputformat)
 
-        return send_from_directory(os.path.dirname(filename),os.path.basename(filename))
+        return file_serving.send_file(filename)
     else:
         return 'Usage: Download image using POST.'
 
@@ -404,10 +640,104 @@ def _extract_process_graph(post_data: dict) -> dict:
         raise ProcessGraphMissingException
 
 
+_result_executor = None
+_result_slots = None
+_result_executor_lock = threading.Lock()
+
+
+def _get_result_executor() -> Tuple[ThreadPoolExecutor, threading.Semaphore]:
+    """
+    Get (lazily created) executor for `/result` evaluations with a time budget,
+    and semaphore of its free slots (`OPENEO_SYNC_RESULT_WORKERS`, default 4).
+    A slot is only freed when its evaluation finishes, so timed out (orphaned) evaluations keep counting.
+    """
+    global _result_executor, _result_slots
+    with _result_executor_lock:
+        if _result_executor is None:
+            workers = current_app.config.get('OPENEO_SYNC_RESULT_WORKERS', 4)
+            _result_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="openeo-result")
+            _result_slots = threading.Semaphore(workers)
+        return _result_executor, _result_slots
+
+
+# `g` values to pass on to request context copies in other threads. Other values (e.g. admission and metrics state)
+# stay in the original context: teardown handlers also run when the copy is popped and would release them twice.
+_REQUEST_CONTEXT_G_KEYS = ["request_version", "api_version", "request_id"]
+
+
+def _with_request_context(f: Callable) -> Callable:
+    """Wrap a function to run in another thread with (a copy of) the current request context and some `g` values."""
+    g_values = {k: g.get(k) for k in _REQUEST_CONTEXT_G_KEYS if k in g}
+
+    @copy_current_request_context
+    def wrapped(*args, **kwargs):
+        vars(g).update(g_values)
+        return f(*args, **kwargs)
+
+    return wrapped
+
+
+def _get_optional_user() -> Optional[User]:
+    """
+    Get user from bearer token of request, if any (`None` if missing or invalid).
+    The result is cached on `g` for the rest of the request.
+    """
+    if "optional_user" not in g:
+        user = None
+        if "Authorization" in request.headers:
+            try:
+                user = auth_handler.get_user_from_bearer_token(request)
+            except OpenEOApiException as e:
+                _log.warning("Failed to resolve user from bearer token: {e!r}".format(e=e))
+        g.optional_user = user
+    return g.optional_user
+
+
 @api_endpoint
 @openeo_bp.route('/result', methods=['POST'])
 def result():
-    return execute()
+    """
+    Synchronous processing.
+
+    When `OPENEO_SYNC_RESULT_TIMEOUT` (seconds) is configured and the request is authenticated,
+    evaluation runs on a separate executor. If it does not finish in time, a batch job is created
+    and started for the process graph, and a "202 Accepted" response points to it.
+    Note that the timed out evaluation can not be interrupted: its result is just discarded,
+    but it keeps occupying an executor slot until it finishes.
+    When all slots are occupied, the process graph goes to a batch job directly.
+    """
+    timeout = current_app.config.get('OPENEO_SYNC_RESULT_TIMEOUT')
+    user = _get_optional_user() if timeout else None
+    if user is None:
+        return execute()
+
+    post_data = request.get_json()
+    process_graph = _extract_process_graph(post_data)
+    executor, slots = _get_result_executor()
+    if slots.acquire(blocking=False):
+        future = executor.submit(_with_request_context(execute))
+        # Also called when evaluation finishes after the timeout.
+        future.add_done_callback(lambda f: slots.release())
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+        _log.info("Synchronous evaluation took more than {t}s: falling back to batch job".format(t=timeout))
+    else:
+        _log.info("No free synchronous evaluation slots: falling back to batch job")
+
+    batch_jobs = backend_implementation.batch_jobs
+    job_info = batch_jobs.create_job(
+        user_id=user.user_id,
+        process={"process_graph": process_graph},
+        api_version=g.api_version,
+        job_options=post_data.get("job_options"),
+    )
+    batch_jobs.start_job(job_id=job_info.id, user_id=user.user_id)
+    response = make_response("", 202)
+    response.headers['Location'] = url_for('.get_job_info', job_id=job_info.id)
+    response.headers['OpenEO-Identifier'] = str(job_info.id)
+    return response
 
 
 @api_endpoint(version=ComparableVersion("0.3.1").or_lower)
@@ -428,7 +758,7 @@ def execute():
     if isinstance(result, ImageCollection):
         format_options = post_data.get('output', {})
         filename = result.download(None, bbox="", time="", **format_options)
-        return send_from_directory(os.path.dirname(filename), os.path.basename(filename))
+        return file_serving.send_file(filename)
     elif result is None:
         abort(500, "Process graph evaluation gave no result")
     elif isinstance(result, SaveResult):
@@ -462,11 +792,38 @@ def create_job(user: User):
 @openeo_bp.route('/jobs', methods=['GET'])
 @auth_handler.requires_bearer_auth
 def list_jobs(user: User):
+    if "ids" in request.args:
+        return _list_jobs_by_id(user)
+    limit, offset = _extract_pagination()
+    jobs, links = _get_page(
+        functools.partial(backend_implementation.batch_jobs.get_user_jobs, user.user_id),
+        limit=limit, offset=offset
+    )
     return jsonify({
-        "jobs": [
-            _jsonable_batch_job_metadata(m, full=False)
-            for m in backend_implementation.batch_jobs.get_user_jobs(user.user_id)
-        ],
+        "jobs": [_jsonable_batch_job_metadata(m, full=False) for m in jobs],
+        "links": links,
+    })
+
+
+def _list_jobs_by_id(user: User):
+    """
+    Bulk job status: metadata (including progress) of the jobs with given `ids` (comma separated),
+    at most `OPENEO_BULK_JOBS_MAX_IDS` (default 100). Unknown job ids are skipped.
+    """
+    job_ids = []
+    for value in request.args.getlist("ids"):
+        for job_id in value.split(","):
+            if job_id.strip() and job_id.strip() not in job_ids:
+                job_ids.append(job_id.strip())
+    max_ids = current_app.config.get("OPENEO_BULK_JOBS_MAX_IDS", 100)
+    if len(job_ids) > max_ids:
+        raise OpenEOApiException(
+            status_code=400, code="ParameterInvalid",
+            message="Too many job ids: {n} (maximum is {m}).".format(n=len(job_ids), m=max_ids)
+        )
+    jobs = backend_implementation.batch_jobs.get_jobs_info(job_ids=job_ids, user_id=user.user_id)
+    return jsonify({
+        "jobs": [dict_no_none(progress=m.progress, **_jsonable_batch_job_metadata(m, full=False)) for m in jobs],
         "links": [],
     })
 
@@ -490,6 +847,124 @@ def _jsonable_batch_job_metadata(metadata: BatchJobMetadata, full=True) -> dict:
     return dict_no_none(**d)
 
 
+def _sse_job_event(event: JobEvent) -> str:
+    """Format job event as server-sent event."""
+    data = dict_no_none(id=event.job_id, status=event.status, progress=event.progress)
+    return "id: {i}\nevent: job\ndata: {d}\n\n".format(i=event.seq, d=json.dumps(data))
+
+
+_job_event_streams_lock = threading.Lock()
+
+
+def _get_job_event_streams() -> AdmissionController:
+    """
+    Get concurrency limiter of job event streams of current app (per process):
+    at most `OPENEO_JOB_EVENTS_MAX_STREAMS` (default 2) streams in total
+    and `OPENEO_JOB_EVENTS_MAX_STREAMS_PER_USER` (default 1) per user.
+    """
+    with _job_event_streams_lock:
+        if "openeo_job_event_streams" not in current_app.extensions:
+            current_app.extensions["openeo_job_event_streams"] = AdmissionController(
+                max_concurrent=current_app.config.get("OPENEO_JOB_EVENTS_MAX_STREAMS", 2),
+                max_concurrent_per_user=current_app.config.get("OPENEO_JOB_EVENTS_MAX_STREAMS_PER_USER", 1),
+                retry_after=5,
+            )
+        return current_app.extensions["openeo_job_event_streams"]
+
+
+def _job_events_response(user_id: str, job_id: str = None, initial: JobEvent = None):
+    """
+    Stream job change events of user (and job) as server-sent events (`text/event-stream`).
+
+    The stream is closed after `OPENEO_JOB_EVENTS_STREAM_TIMEOUT` seconds (clients reconnect automatically,
+    resuming with `Last-Event-ID`) and a comment line is sent every `OPENEO_JOB_EVENTS_HEARTBEAT` seconds
+    to keep idle connections alive.
+
+    Each open stream occupies a worker thread (or greenlet with gevent workers), so the number of streams
+    is capped (see `_get_job_event_streams`): additional ones get a "429 Too Many Requests" response.
+    Events are only delivered within the same process (see `JobEventBus`).
+    """
+    batch_jobs = backend_implementation.batch_jobs
+    if not batch_jobs.supports_job_events:
+        raise OpenEOApiException(
+            status_code=501, code="FeatureUnsupported", message="Job events are not supported by this back-end."
+        )
+    bus = batch_jobs.job_events
+    streams = _get_job_event_streams()
+    try:
+        streams.admit(user_id)
+    except AdmissionDenied as e:
+        _log.warning("Job event stream of {u!r} not admitted: {e}".format(u=user_id, e=e))
+        error = OpenEOApiException(status_code=429, code="TooManyRequests", message="Too many job event streams.")
+        response = jsonify(error.to_dict())
+        response.status_code = error.status_code
+        response.headers["Retry-After"] = str(int(math.ceil(e.retry_after)))
+        return response
+    config = current_app.config
+    stream_timeout = config.get("OPENEO_JOB_EVENTS_STREAM_TIMEOUT", 300)
+    heartbeat = config.get("OPENEO_JOB_EVENTS_HEARTBEAT", 15)
+    try:
+        after = int(request.headers.get("Last-Event-ID", ""))
+        # Sequence numbers of another (e.g. restarted) server process are not comparable.
+        after = min(after, bus.last_seq)
+        initial = None
+    except ValueError:
+        after = bus.last_seq
+
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            streams.release(user_id)
+
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            if initial:
+                yield _sse_job_event(initial._replace(seq=after))
+            last = after
+            deadline = time.time() + stream_timeout
+            while time.time() < deadline:
+                events = bus.wait(
+                    after=last, user_id=user_id, job_id=job_id, timeout=min(heartbeat, deadline - time.time())
+                )
+                if not events:
+                    yield ": keep-alive\n\n"
+                for event in events:
+                    yield _sse_job_event(event)
+                    last = event.seq
+        finally:
+            release()
+
+    response = current_app.response_class(
+        stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Also release when the WSGI server closes a response that was never iterated.
+    response.call_on_close(release)
+    return response
+
+
+@api_endpoint(hidden=True)
+@openeo_bp.route('/jobs/events', methods=['GET'])
+@auth_handler.requires_bearer_auth
+def job_events(user: User):
+    """Stream status/progress changes of all jobs of the user as server-sent events."""
+    return _job_events_response(user_id=user.user_id)
+
+
+@api_endpoint(hidden=True)
+@openeo_bp.route('/jobs/<job_id>/events', methods=['GET'])
+@auth_handler.requires_bearer_auth
+def job_events_by_id(job_id, user: User):
+    """Stream status/progress changes of a job as server-sent events (starting with its current status)."""
+    job_info = backend_implementation.batch_jobs.get_job_info(job_id=job_id, user_id=user.user_id)
+    initial = JobEvent(
+        seq=0, user_id=user.user_id, job_id=job_id, status=job_info.status, progress=job_info.progress, time=None
+    )
+    return _job_events_response(user_id=user.user_id, job_id=job_id, initial=initial)
+
+
 @api_endpoint
 @openeo_bp.route('/jobs/<job_id>', methods=['GET'])
 @auth_handler.requires_bearer_auth
@@ -516,34 +991,50 @@ def modify_job(job_id, user: User):
 @openeo_bp.route('/jobs/<job_id>/results', methods=['POST'])
 @auth_handler.requires_bearer_auth
 def queue_job(job_id, user: User):
+    _job_results_cache.invalidate(job_id=job_id, user_id=user.user_id)
     backend_implementation.batch_jobs.start_job(job_id=job_id, user_id=user.user_id)
     return make_response("", 202)
 
 
+# Cache of job result manifests (of finished jobs)
+_job_results_cache = JobResultsCache()
+
+
 @api_endpoint
 @openeo_bp.route('/jobs/<job_id>/results', methods=['GET'])
 @auth_handler.requires_bearer_auth
 def list_job_results(job_id, user: User):
-    # TODO: error JobNotFinished when job is not finished yet
-    results = backend_implementation.batch_jobs.get_results(job_id=job_id, user_id=user.user_id)
-    filenames = results.keys()
+    manifest = _job_results_cache.get_manifest(
+        batch_jobs=backend_implementation.batch_jobs, job_id=job_id, user_id=user.user_id
+    )
+
+    def href(filename):
+        return url_for('.download_job_result', job_id=job_id, filename=filename, _external=True)
+
     if requested_api_version().at_least("1.0.0"):
+        # STAC item (without spatial/temporal extent)
         result = {
-            # TODO: #EP-3281 API 1.0 required fields: "stac_version", "id", "type", "bbox", "geometry", "properties", "assets"
+            "stac_version": "0.9.0",
+            "stac_extensions": ["file"],
+            "id": job_id,
+            "type": "Feature",
+            "geometry": None,
+            "properties": {"datetime": None},
             "assets": {
-                filename: {
-                    "href": url_for('.download_job_result', job_id=job_id, filename=filename, _external=True)
-                    # TODO #EP-3281 add "type" field with media type
-                }
-                for filename in filenames
-            }
+                filename: dict_no_none(**{
+                    "href": href(filename),
+                    "type": asset.media_type,
+                    "file:size": asset.size,
+                    # Multihash of SHA2-256 checksum
+                    "file:checksum": "1220" + asset.checksum if asset.checksum else None,
+                })
+                for filename, asset in manifest.items()
+            },
+            "links": [],
         }
     else:
         result = {
-            "links": [
-                {"href": url_for('.download_job_result', job_id=job_id, filename=filename, _external=True)}
-                for filename in filenames
-            ]
+            "links": [{"href": href(filename)} for filename in manifest]
         }
 
     # TODO "OpenEO-Costs" header?
@@ -554,28 +1045,61 @@ def list_job_results(job_id, user: User):
 @openeo_bp.route('/jobs/<job_id>/results/<filename>', methods=['GET'])
 @auth_handler.requires_bearer_auth
 def download_job_result(job_id, filename, user: User):
-    results = backend_implementation.batch_jobs.get_results(job_id=job_id, user_id=user.user_id)
-    if filename not in results:
+    manifest = _job_results_cache.get_manifest(
+        batch_jobs=backend_implementation.batch_jobs, job_id=job_id, user_id=user.user_id
+    )
+    if filename not in manifest:
         raise FilePathInvalidException
-    output_dir = results[filename]
-    return send_from_directory(output_dir, filename)
+    asset = manifest[filename]
+    return file_serving.send_file(asset.path, mimetype=asset.media_type)
 
 
 @api_endpoint
 @openeo_bp.route('/jobs/<job_id>/logs', methods=['GET'])
 @auth_handler.requires_bearer_auth
 def get_job_logs(job_id, user: User):
-    offset = request.args.get('offset', 0)
-    return jsonify({
-        "logs": backend_implementation.batch_jobs.get_log_entries(job_id=job_id, user_id=user.user_id, offset=offset),
-        "links": [],
-    })
+    """
+    Job logs, paginated with `offset` (id of the last entry already received) and `limit`
+    (defaults to config `OPENEO_JOB_LOGS_DEFAULT_LIMIT`), filtered on minimum severity with `level`.
+    """
+    offset = request.args.get('offset')
+    limit = request.args.get('limit', current_app.config.get("OPENEO_JOB_LOGS_DEFAULT_LIMIT"))
+    level = request.args.get('level')
+    if limit is not None:
+        try:
+            limit = int(limit)
+            if limit < 1:
+                raise ValueError("should be at least 1")
+        except ValueError as e:
+            raise OpenEOApiException(
+                status_code=400, code="ParameterInvalid",
+                message="Invalid value for parameter 'limit': {v!r} ({e})".format(v=request.args['limit'], e=e)
+            )
+    if level is not None and level not in LOG_LEVELS:
+        raise OpenEOApiException(
+            status_code=400, code="ParameterInvalid",
+            message="Invalid value for parameter 'level': {v!r} (should be one of {l})".format(v=level, l=LOG_LEVELS)
+        )
+    entries, next_offset = backend_implementation.batch_jobs.get_log_page(
+        job_id=job_id, user_id=user.user_id, offset=offset, limit=limit, level=level
+    )
+    links = []
+    if next_offset is not None:
+        links.append({
+            "rel": "next",
+            "href": url_for(
+                '.get_job_logs', job_id=job_id, _external=True,
+                **dict_no_none(offset=next_offset, limit=limit, level=level)
+            ),
+        })
+    return jsonify({"logs": entries, "links": links})
 
 
 @api_endpoint
 @openeo_bp.route('/jobs/<job_id>/results', methods=['DELETE'])
 @auth_handler.requires_bearer_auth
 def cancel_job(job_id, user: User):
+    _job_results_cache.invalidate(job_id=job_id, user_id=user.user_id)
     backend_implementation.batch_jobs.cancel_job(job_id=job_id, user_id=user.user_id)
     return make_response("", 204)
 
@@ -753,25 +1277,128 @@ def _normalize_collection_metadata(metadata: dict, api_version: ComparableVersio
     return metadata
 
 
+class CollectionMetadataCache:
+    """
+    Cache of normalized collection metadata documents (and their JSON serialization),
+    per (collection id, API version, full/basic metadata).
+
+    The cache is automatically cleared when the catalog (or its version) changes.
+    """
+
+    def __init__(self):
+        self._documents = {}
+        self._catalog_key = None
+        self._lock = threading.Lock()
+
+    def _get_documents(self, catalog: CollectionCatalog) -> dict:
+        """Get document cache dictionary corresponding with current state of the catalog."""
+        catalog_key = (id(catalog), catalog.version)
+        with self._lock:
+            if catalog_key != self._catalog_key:
+                _log.info("Resetting collection metadata cache for catalog version {v!r}".format(v=catalog.version))
+                self._documents = {}
+                self._catalog_key = catalog_key
+            return self._documents
+
+    def get_collection(
+            self, catalog: CollectionCatalog, collection_id: str, api_version: ComparableVersion, full=True
+    ) -> JsonDocument:
+        """Get normalized metadata document of a single collection."""
+        documents = self._get_documents(catalog)
+        key = (collection_id, api_version.to_string(), full)
+        metrics.record_cache_lookup("collection_metadata", hit=key in documents)
+        if key not in documents:
+            metadata = catalog.get_collection_metadata(collection_id=collection_id)
+            documents[key] = build_json_document(
+                _normalize_collection_metadata(metadata=metadata, api_version=api_version, full=full)
+            )
+        return documents[key]
+
+    def get_listing(self, catalog: CollectionCatalog, api_version: ComparableVersion) -> JsonDocument:
+        """Get listing document of all collections (with basic metadata)."""
+        documents = self._get_documents(catalog)
+        key = (None, api_version.to_string(), False)
+        metrics.record_cache_lookup("collection_listing", hit=key in documents)
+        if key not in documents:
+            documents[key] = build_json_document({
+                'collections': [
+                    self.get_collection(catalog, m["id"], api_version=api_version, full=False).data
+                    for m in catalog.get_all_metadata()
+                ],
+                'links': []
+            })
+        return documents[key]
+
+
+_collection_metadata_cache = CollectionMetadataCache()
+
+
+def _extract_collection_search_filters(args: dict) -> dict:
+    """
+    Extract STAC-style collection search filters from request arguments:
+    `bbox` ("west,south,east,north"), `datetime` (instant or "start/end" interval, ".." for open end)
+    and `q` (comma separated keywords/band names)
+    """
+    filters = {}
+    parsers = {
+        "bbox": ("bbox", _parse_bbox),
+        "datetime": ("interval", parse_interval),
+        "q": ("keywords", lambda v: [t.strip() for t in v.split(",") if t.strip()]),
+    }
+    for name, (key, parse) in parsers.items():
+        value = args.get(name)
+        if value:
+            try:
+                filters[key] = parse(value)
+            except ValueError as e:
+                raise OpenEOApiException(
+                    status_code=400, code="ParameterInvalid",
+                    message="Invalid value for parameter {n!r}: {v!r} ({e})".format(n=name, v=value, e=e)
+                )
+    return filters
+
+
+def _parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    bbox = tuple(float(v) for v in value.split(","))
+    if len(bbox) != 4:
+        raise ValueError("expected 4 coordinates")
+    if not all(math.isfinite(c) for c in bbox):
+        raise ValueError("coordinates must be finite")
+    west, south, east, north = bbox
+    if west > east or south > north:
+        raise ValueError("expected west <= east and south <= north")
+    return bbox
+
+
 @api_endpoint
 @openeo_bp.route('/collections', methods=['GET'])
 def collections():
-    metadata = [
-        _normalize_collection_metadata(metadata=m, api_version=requested_api_version(), full=False)
-        for m in backend_implementation.catalog.get_all_metadata()
-    ]
-    return jsonify({
-        'collections': metadata,
-        'links': []
-    })
+    catalog = backend_implementation.catalog
+    api_version = requested_api_version()
+    filters = _extract_collection_search_filters(request.args)
+    limit, offset = _extract_pagination()
+    if filters or limit is not None:
+        get_metadata = functools.partial(catalog.search, **filters) if filters else catalog.get_all_metadata
+        metadata, links = _get_page(get_metadata, limit=limit, offset=offset)
+        return jsonify({
+            'collections': [
+                _collection_metadata_cache.get_collection(catalog, m["id"], api_version=api_version, full=False).data
+                for m in metadata
+            ],
+            'links': links
+        })
+    document = _collection_metadata_cache.get_listing(catalog=catalog, api_version=api_version)
+    return json_document_response(document)
 
 
 @api_endpoint
 @openeo_bp.route('/collections/<collection_id>', methods=['GET'])
 def collection_by_id(collection_id):
-    metadata = backend_implementation.catalog.get_collection_metadata(collection_id=collection_id)
-    metadata = _normalize_collection_metadata(metadata=metadata, api_version=requested_api_version(), full=True)
-    return jsonify(metadata)
+    document = _collection_metadata_cache.get_collection(
+        catalog=backend_implementation.catalog, collection_id=collection_id,
+        api_version=requested_api_version(), full=True
+    )
+    return json_document_response(document)
 
 
 @api_endpoint
@@ -780,7 +1407,17 @@ def processes():
     # TODO: this `qname` feature is non-standard. Is this necessary for some reason?
     substring = request.args.get('qname')
     processes = get_process_registry(requested_api_version()).get_specs(substring)
-    return jsonify({'processes': processes, 'links': []})
+    if substring:
+        return jsonify({'processes': processes, 'links': []})
+    # Processes can only be added to a registry: the number of processes identifies the listing.
+    key = (requested_api_version().to_string(), len(processes))
+    if key not in _processes_documents:
+        _processes_documents[key] = build_json_document({'processes': processes, 'links': []})
+    return json_document_response(_processes_documents[key])
+
+
+# Cache of process listing documents, keyed on API version and number of processes
+_processes_documents = {}
 
 
 @api_endpoint
@@ -790,15 +1427,10 @@ def process(process_id):
     return jsonify(spec)
 
 
-app.register_blueprint(openeo_bp, url_prefix='/openeo')
-app.register_blueprint(openeo_bp, url_prefix='/openeo/<version>')
-
 # Build endpoint metadata dictionary
 _openeo_endpoint_metadata = api_endpoint.get_path_metadata(openeo_bp)
 
 
-# Note: /.well-known/openeo should be available directly under domain, without version prefix.
-@app.route('/.well-known/openeo', methods=['GET'])
 def well_known_openeo():
     return jsonify({
         'versions': [
@@ -811,3 +1443,69 @@ def well_known_openeo():
             if v.advertised
         ]
     })
+
+
+def create_app(config: dict = None) -> Flask:
+    """
+    Flask application factory.
+
+    :param config: Flask config settings (overriding the defaults)
+    """
+    app = Flask(__name__)
+
+    # Make sure app handles reverse proxy aspects (e.g. HTTPS) correctly.
+    app.wsgi_app = ProxyFix(app.wsgi_app)
+
+    # TODO: get this OpenID config url from a real config
+    app.config['OPENID_CONNECT_CONFIG_URL'] = \
+        "https://sso-dev.vgt.vito.be/auth/realms/terrascope/.well-known/openid-configuration"
+    app.config.update(config or {})
+
+    app.before_request(_before_request)
+    app.after_request(_add_request_id_header)
+    app.before_request(_metrics_before_request)
+    app.after_request(_metrics_after_request)
+    app.teardown_request(_metrics_teardown_request)
+    app.after_request(_compress_response)
+
+    app.register_error_handler(HTTPException, handle_http_exceptions)
+    app.register_error_handler(OpenEOApiException, handle_openeoapi_exception)
+    app.register_error_handler(Exception, handle_error)
+
+    app.add_url_rule('/metrics', view_func=prometheus_metrics)
+    # Note: /.well-known/openeo should be available directly under domain, without version prefix.
+    app.add_url_rule('/.well-known/openeo', view_func=well_known_openeo, methods=['GET'])
+    app.register_blueprint(openeo_bp, url_prefix='/openeo')
+    app.register_blueprint(openeo_bp, url_prefix='/openeo/<version>')
+
+    return app
+
+
+def preload(app: Flask):
+    """
+    Build expensive, immutable shared state up front,
+    e.g. in the gunicorn master process (`preload_app`), so that it is shared (copy-on-write) by forked workers:
+    backend implementation (and its collection catalog), collection metadata documents and capabilities documents.
+    """
+    _log.info("Preloading backend implementation and documents")
+    catalog = backend_implementation.catalog
+    with app.app_context():
+        for api_version in sorted(set(v.version for v in API_VERSIONS.values() if v.supported)):
+            _collection_metadata_cache.get_listing(catalog, api_version=ComparableVersion(api_version))
+    preload_capabilities(app)
+
+
+def post_fork(server=None, worker=None):
+    """
+    Initialize per-process resources after forking a worker process
+    (usable as gunicorn `post_fork` server hook).
+    """
+    global _result_executor, _result_slots
+    # Thread pools do not survive a fork: let them be recreated lazily.
+    _result_executor = None
+    _result_slots = None
+    backend_implementation.post_fork()
+
+
+# Default app (e.g. for `gunicorn openeo_driver.views:app`)
+app = create_app()
@@ -45,6 +45,8 @@ setup(
     ],
     extras_require={
         "dev": tests_require,
+        "metrics": ["prometheus_client"],
+        "compression": ["brotli"],
     },
     classifiers=[
         'Programming Language :: Python :: 3',
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from openeo_driver.admission import TokenBucket, AdmissionController, AdmissionDenied
+
+
+class FakeClock:
+    def __init__(self, t=1000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.take() == pytest.approx(0.5)
+    clock.t += 0.5
+    assert bucket.take() == 0
+    assert not bucket.full
+    clock.t += 10
+    assert bucket.full
+
+
+def test_admission_rate_limit():
+    clock = FakeClock()
+    controller = AdmissionController(rate_per_user=1, burst_per_user=2, clock=clock)
+    for _ in range(2):
+        controller.admit("john")
+        controller.release("john")
+    with pytest.raises(AdmissionDenied) as e:
+        controller.admit("john")
+    assert e.value.retry_after == pytest.approx(1)
+    # Other user is not affected
+    controller.admit("alice")
+    clock.t += 1
+    controller.admit("john")
+    assert controller.stats() == {
+        "in_flight": 2, "in_flight_users": 2, "queue_depth": 0, "admitted": 4, "rejected": {"rate": 1}
+    }
+
+
+def test_admission_concurrency_limits():
+    controller = AdmissionController(max_concurrent=3, max_concurrent_per_user=2, retry_after=5)
+    controller.admit("john")
+    controller.admit("john")
+    with pytest.raises(AdmissionDenied) as e:
+        controller.admit("john")
+    assert e.value.retry_after == 5
+    controller.admit("alice")
+    with pytest.raises(AdmissionDenied):
+        controller.admit("bob")
+    controller.release("john")
+    controller.admit("bob")
+    assert controller.stats()["rejected"] == {"concurrency": 2}
+    assert controller.stats()["in_flight"] == 3
+
+
+def test_admission_queue_timeout():
+    controller = AdmissionController(max_concurrent_per_user=1, queue_timeout=5)
+    controller.admit("john")
+    admitted = []
+
+    def admit():
+        controller.admit("john")
+        admitted.append(time.time())
+
+    thread = threading.Thread(target=admit)
+    thread.start()
+    while controller.stats()["queue_depth"] == 0:
+        time.sleep(0.01)
+    assert admitted == []
+    controller.release("john")
+    thread.join(timeout=5)
+    assert len(admitted) == 1
+    assert controller.stats()["queue_depth"] == 0
+    assert controller.stats()["in_flight"] == 1
@@ -1,7 +1,12 @@
+from datetime import datetime
+import json
+import time
+
 import pytest
 
-from openeo_driver.backend import CollectionCatalog, CollectionIncompleteMetadataWarning
-from openeo_driver.errors import CollectionNotFoundException
+from openeo_driver.backend import CollectionCatalog, CollectionIncompleteMetadataWarning, ReloadableCollectionCatalog, \
+    BatchJobs, BatchJobMetadata
+from openeo_driver.errors import CollectionNotFoundException, JobNotFoundException
 
 
 def test_collection_catalog_basic():
@@ -17,3 +22,110 @@ def test_collection_catalog_invalid_id(caplog):
     catalog = CollectionCatalog([{"id": "Sentinel2", "flavor": "salty"}, {"id": "NDVI", "flavor": "smurf"}])
     with pytest.raises(CollectionNotFoundException):
         catalog.get_collection_metadata("nope")
+
+
+def test_collection_catalog_version():
+    catalog = CollectionCatalog([{"id": "Sentinel2", "flavor": "salty"}])
+    assert catalog.version == 0
+
+
+def test_reloadable_collection_catalog_file(tmp_path):
+    path = tmp_path / "layercatalog.json"
+    path.write_text(json.dumps([{"id": "Sentinel2", "flavor": "salty"}, {"id": "NDVI", "flavor": "smurf"}]))
+    catalog = ReloadableCollectionCatalog(path, check_interval=None)
+    assert catalog.version == 1
+    assert set(c["id"] for c in catalog.get_all_metadata()) == {"Sentinel2", "NDVI"}
+    ndvi = catalog.get_collection_metadata("NDVI")
+
+    assert catalog.reload() is False
+    assert catalog.version == 1
+
+    path.write_text(json.dumps([{"id": "Sentinel2", "flavor": "sweeter"}, {"id": "NDVI", "flavor": "smurf"}]))
+    assert catalog.reload() is True
+    assert catalog.version == 2
+    assert catalog.get_collection_metadata("Sentinel2") == {"id": "Sentinel2", "flavor": "sweeter"}
+    # Unchanged entries are kept as is
+    assert catalog.get_collection_metadata("NDVI") is ndvi
+
+    path.write_text(json.dumps([{"id": "NDVI", "flavor": "smurf"}]))
+    assert catalog.reload() is True
+    assert catalog.version == 3
+    assert [c["id"] for c in catalog.get_all_metadata()] == ["NDVI"]
+    with pytest.raises(CollectionNotFoundException):
+        catalog.get_collection_metadata("Sentinel2")
+
+
+def test_reloadable_collection_catalog_directory(tmp_path):
+    (tmp_path / "s2.json").write_text(json.dumps({"id": "Sentinel2", "flavor": "salty"}))
+    (tmp_path / "ndvi.json").write_text(json.dumps({"id": "NDVI", "flavor": "smurf"}))
+    catalog = ReloadableCollectionCatalog(tmp_path, check_interval=None)
+    assert set(c["id"] for c in catalog.get_all_metadata()) == {"Sentinel2", "NDVI"}
+
+    (tmp_path / "s1.json").write_text(json.dumps({"id": "Sentinel1", "flavor": "bitter"}))
+    (tmp_path / "ndvi.json").unlink()
+    assert catalog.reload() is True
+    assert set(c["id"] for c in catalog.get_all_metadata()) == {"Sentinel2", "Sentinel1"}
+
+    # Invalid (e.g. half written) files are skipped until they are valid
+    (tmp_path / "s1.json").write_text('{"id": "Sentinel1", "fla')
+    assert catalog.reload() is False
+    assert catalog.get_collection_metadata("Sentinel1") == {"id": "Sentinel1", "flavor": "bitter"}
+    (tmp_path / "s1.json").write_text(json.dumps({"id": "Sentinel1", "flavor": "sour"}))
+    assert catalog.reload() is True
+    assert catalog.get_collection_metadata("Sentinel1") == {"id": "Sentinel1", "flavor": "sour"}
+
+
+def test_reloadable_collection_catalog_background_reload(tmp_path):
+    (tmp_path / "s2.json").write_text(json.dumps({"id": "Sentinel2", "flavor": "salty"}))
+    catalog = ReloadableCollectionCatalog(tmp_path, check_interval=0)
+    assert catalog.version == 1
+    (tmp_path / "ndvi.json").write_text(json.dumps({"id": "NDVI", "flavor": "smurf"}))
+    # Access triggers a background reload: eventually the new collection should show up.
+    for _ in range(100):
+        if "NDVI" in [c["id"] for c in catalog.get_all_metadata()]:
+            break
+        time.sleep(0.02)
+    assert catalog.version == 2
+    assert catalog.get_collection_metadata("NDVI") == {"id": "NDVI", "flavor": "smurf"}
+
+
+def test_collection_catalog_search():
+    catalog = CollectionCatalog([
+        {"id": "Sentinel2", "keywords": ["salty"], "extent": {"spatial": [2, 50, 5, 52], "temporal": ["2019-01-01", None]}},
+        {"id": "NDVI", "keywords": ["smurf"], "extent": {"spatial": [-180, -90, 180, 90], "temporal": [None, None]}},
+    ])
+    assert [c["id"] for c in catalog.search()] == ["Sentinel2", "NDVI"]
+    assert [c["id"] for c in catalog.search(bbox=(3, 51, 4, 52))] == ["Sentinel2", "NDVI"]
+    assert [c["id"] for c in catalog.search(bbox=(13, 51, 14, 52))] == ["NDVI"]
+    assert [c["id"] for c in catalog.search(keywords=["SALTY"])] == ["Sentinel2"]
+    assert catalog.search(keywords=["salty", "smurf"]) == []
+    assert [c["id"] for c in catalog.search(interval=(datetime(2018, 1, 1), datetime(2018, 2, 1)))] == ["NDVI"]
+
+
+def test_reloadable_collection_catalog_search(tmp_path):
+    path = tmp_path / "layercatalog.json"
+    path.write_text(json.dumps([{"id": "Sentinel2", "keywords": ["salty"]}]))
+    catalog = ReloadableCollectionCatalog(path, check_interval=None)
+    assert [c["id"] for c in catalog.search(keywords=["salty"])] == ["Sentinel2"]
+    path.write_text(json.dumps([{"id": "Sentinel2", "keywords": ["salty"]}, {"id": "NDVI", "keywords": ["salty"]}]))
+    catalog.reload()
+    assert [c["id"] for c in catalog.search(keywords=["salty"])] == ["Sentinel2", "NDVI"]
+
+
+def test_collection_catalog_paginated():
+    catalog = CollectionCatalog([{"id": "Sentinel2"}, {"id": "NDVI"}, {"id": "Landsat"}])
+    assert [c["id"] for c in catalog.get_all_metadata(limit=2)] == ["Sentinel2", "NDVI"]
+    assert [c["id"] for c in catalog.get_all_metadata(limit=2, offset=2)] == ["Landsat"]
+    assert [c["id"] for c in catalog.get_all_metadata(offset=1)] == ["NDVI", "Landsat"]
+    assert [c["id"] for c in catalog.search(limit=1, offset=1)] == ["NDVI"]
+
+
+def test_batch_jobs_get_jobs_info_default():
+    class Jobs(BatchJobs):
+        def get_job_info(self, job_id: str, user_id: str) -> BatchJobMetadata:
+            if job_id == "unknown":
+                raise JobNotFoundException(job_id=job_id)
+            return BatchJobMetadata(id=job_id, status="running", process={}, created=datetime(2020, 1, 1))
+
+    jobs = Jobs().get_jobs_info(job_ids=["j1", "unknown", "j2"], user_id="john")
+    assert [j.id for j in jobs] == ["j1", "j2"]
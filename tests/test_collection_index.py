@@ -0,0 +1,108 @@
+import datetime
+import random
+
+import pytest
+
+from openeo_driver.collection_index import parse_datetime, parse_interval, get_spatial_extents, \
+    get_temporal_extents, get_terms, SpatialGridIndex, IntervalIndex, CollectionIndex
+
+
+def test_parse_datetime():
+    assert parse_datetime("2019-03-04") == datetime.datetime(2019, 3, 4)
+    assert parse_datetime("2019-03-04T12:34:56Z") == datetime.datetime(2019, 3, 4, 12, 34, 56)
+    assert parse_datetime("2019-03-04T12:34:56.789+02:00") == datetime.datetime(2019, 3, 4, 10, 34, 56)
+    assert parse_datetime("2019-03-04T22:30:00-0230") == datetime.datetime(2019, 3, 5, 1, 0, 0)
+    assert parse_datetime("2019-03-04T12:34:56+00:00") == datetime.datetime(2019, 3, 4, 12, 34, 56)
+    assert parse_datetime(
+        datetime.datetime(2019, 3, 4, 12, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+    ) == datetime.datetime(2019, 3, 4, 10, 0)
+    assert parse_datetime("0001-01-01T00:00:00+01:00") == datetime.datetime.min
+    assert parse_datetime(None) is None
+    assert parse_datetime("..", default=datetime.datetime.max) == datetime.datetime.max
+    with pytest.raises(ValueError):
+        parse_datetime("last week")
+
+
+def test_parse_interval():
+    assert parse_interval("2019-03-04") == (datetime.datetime(2019, 3, 4), datetime.datetime(2019, 3, 4))
+    assert parse_interval("2019-03-04/2019-05-06") == (datetime.datetime(2019, 3, 4), datetime.datetime(2019, 5, 6))
+    assert parse_interval("../2019-05-06") == (datetime.datetime.min, datetime.datetime(2019, 5, 6))
+    assert parse_interval("2019-03-04/..") == (datetime.datetime(2019, 3, 4), datetime.datetime.max)
+
+
+def test_get_extents_040_style():
+    metadata = {"extent": {"spatial": [1, 2, 3, 4], "temporal": ["2019-01-01", None]}}
+    assert get_spatial_extents(metadata) == [(1, 2, 3, 4)]
+    assert get_temporal_extents(metadata) == [(datetime.datetime(2019, 1, 1), datetime.datetime.max)]
+
+
+def test_get_extents_100_style():
+    metadata = {"extent": {
+        "spatial": {"bbox": [[1, 2, 3, 4], [5, 6, 7, 8]]},
+        "temporal": {"interval": [["2019-01-01T00:00:00Z", "2019-02-01T00:00:00Z"]]}
+    }}
+    assert get_spatial_extents(metadata) == [(1, 2, 3, 4), (5, 6, 7, 8)]
+    assert get_temporal_extents(metadata) == [(datetime.datetime(2019, 1, 1), datetime.datetime(2019, 2, 1))]
+
+
+def test_get_terms():
+    metadata = {
+        "keywords": ["Sentinel", "NDVI"],
+        "summaries": {"eo:bands": [{"name": "B04", "common_name": "red"}]},
+        "cube:dimensions": {"x": {"type": "spatial"}, "b": {"type": "bands", "values": ["B04", "SCL"]}},
+    }
+    assert get_terms(metadata) == {"sentinel", "ndvi", "b04", "red", "scl"}
+
+
+def test_spatial_grid_index():
+    index = SpatialGridIndex()
+    index.insert("be", (2.5, 49.5, 6.4, 51.5))
+    index.insert("nl", (3.3, 50.7, 7.2, 53.6))
+    index.insert("fiji", (177, -21, -178, -12))
+    assert index.query((4, 49.6, 5, 50.5)) == {"be"}
+    assert index.query((5, 51, 6, 52)) == {"be", "nl"}
+    assert index.query((-179, -15, -170, -10)) == {"fiji"}
+    assert index.query((179, -15, -179, -10)) == {"fiji"}
+    assert index.query((10, 10, 20, 20)) == set()
+
+
+def test_interval_index():
+    index = IntervalIndex([
+        ("a", datetime.datetime(2019, 1, 1), datetime.datetime(2019, 2, 1)),
+        ("b", datetime.datetime(2019, 3, 1), datetime.datetime.max),
+        ("c", datetime.datetime.min, datetime.datetime(2019, 1, 10)),
+    ])
+    assert index.query(datetime.datetime(2019, 1, 5), datetime.datetime(2019, 1, 5)) == {"a", "c"}
+    assert index.query(datetime.datetime(2019, 2, 5), datetime.datetime(2019, 2, 20)) == set()
+    assert index.query(datetime.datetime(2019, 1, 20), datetime.datetime(2020, 1, 1)) == {"a", "b"}
+    assert IntervalIndex([]).query(datetime.datetime.min, datetime.datetime.max) == set()
+
+
+def test_interval_index_brute_force():
+    rnd = random.Random(42)
+    base = datetime.datetime(2000, 1, 1)
+    intervals = []
+    for i in range(200):
+        start = base + datetime.timedelta(days=rnd.randint(0, 3000))
+        intervals.append(("i{i}".format(i=i), start, start + datetime.timedelta(days=rnd.randint(0, 500))))
+    index = IntervalIndex(intervals)
+    for _ in range(100):
+        start = base + datetime.timedelta(days=rnd.randint(-100, 3600))
+        end = start + datetime.timedelta(days=rnd.randint(0, 200))
+        expected = set(k for (k, s, e) in intervals if s <= end and e >= start)
+        assert index.query(start, end) == expected
+
+
+def test_collection_index():
+    index = CollectionIndex([
+        {"id": "S2", "keywords": ["Sentinel"], "extent": {"spatial": [-180, -90, 180, 90], "temporal": ["2015-07-01", None]}},
+        {"id": "BE", "keywords": ["Belgium"], "extent": {"spatial": [2.5, 49.5, 6.4, 51.5], "temporal": ["2019-01-01", "2019-12-31"]}},
+        {"id": "Whatever"},
+    ])
+    assert index.query() == ["S2", "BE", "Whatever"]
+    assert index.query(bbox=(4, 50, 5, 51)) == ["S2", "BE", "Whatever"]
+    assert index.query(bbox=(10, 10, 20, 20)) == ["S2", "Whatever"]
+    assert index.query(interval=(datetime.datetime(2016, 1, 1), datetime.datetime(2016, 2, 1))) == ["S2", "Whatever"]
+    assert index.query(terms=["sentinel"]) == ["S2"]
+    assert index.query(bbox=(4, 50, 5, 51), terms=["Belgium"]) == ["BE"]
+    assert index.query(bbox=(10, 10, 20, 20), terms=["Belgium"]) == []
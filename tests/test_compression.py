@@ -0,0 +1,92 @@
+import gzip
+
+import flask
+import pytest
+from werkzeug.http import parse_accept_header
+
+from openeo_driver.compression import CompressionCache, compress_response, compress, supported_encodings
+
+
+def _accept(value: str):
+    return parse_accept_header(value)
+
+
+def _response(data: bytes = b'{"foo": "' + b"bar" * 1000 + b'"}', mimetype="application/json", **kwargs):
+    return flask.Response(data, mimetype=mimetype, **kwargs)
+
+
+def test_compress_response_gzip():
+    response = compress_response(_response(), accept_encodings=_accept("gzip, deflate"))
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < 100
+    assert gzip.decompress(response.get_data()) == b'{"foo": "' + b"bar" * 1000 + b'"}'
+
+
+def test_compress_response_brotli():
+    brotli = pytest.importorskip("brotli")
+    response = compress_response(_response(), accept_encodings=_accept("gzip, br"))
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.get_data()) == b'{"foo": "' + b"bar" * 1000 + b'"}'
+
+
+@pytest.mark.parametrize("accept", ["", "identity", "deflate", "gzip;q=0"])
+def test_compress_response_not_accepted(accept):
+    response = compress_response(_response(), accept_encodings=_accept(accept))
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize("response", [
+    _response(data=b'{"foo": "bar"}'),
+    _response(mimetype="image/tiff"),
+    _response(mimetype="application/zip"),
+    _response(status=404),
+    _response(headers={"Content-Encoding": "deflate"}),
+])
+def test_compress_response_skip(response):
+    data = response.get_data()
+    encoding = response.headers.get("Content-Encoding")
+    response = compress_response(response, accept_encodings=_accept("gzip"))
+    assert response.headers.get("Content-Encoding") == encoding
+    assert "Vary" not in response.headers
+    assert response.get_data() == data
+
+
+def test_compress_response_skip_passthrough():
+    response = _response()
+    response.direct_passthrough = True
+    response = compress_response(response, accept_encodings=_accept("gzip"))
+    assert "Content-Encoding" not in response.headers
+
+
+def test_compress_response_etag_cache():
+    cache = CompressionCache()
+    for _ in range(3):
+        response = _response()
+        response.set_etag("abc123")
+        response = compress_response(response, accept_encodings=_accept("gzip"), cache=cache)
+        assert response.headers["ETag"] == 'W/"abc123"'
+        assert gzip.decompress(response.get_data()).startswith(b'{"foo": "barbar')
+    assert len(cache) == 1
+    # No caching without (strong) ETag
+    compress_response(_response(), accept_encodings=_accept("gzip"), cache=cache)
+    response = _response()
+    response.set_etag("xyz", weak=True)
+    compress_response(response, accept_encodings=_accept("gzip"), cache=cache)
+    assert len(cache) == 1
+
+
+def test_compression_cache_eviction():
+    data = {k: bytes(range(256)) * 4 for k in "abc"}
+    size = len(compress(data["a"], "gzip", cached=True))
+    cache = CompressionCache(max_size=2 * size)
+    cache.get("a", "gzip", data["a"])
+    cache.get("b", "gzip", data["b"])
+    cache.get("a", "gzip", data["a"])
+    cache.get("c", "gzip", data["c"])
+    assert set(k for (k, _) in cache._entries) == {"a", "c"}
+
+
+def test_supported_encodings():
+    assert supported_encodings()[-1] == "gzip"
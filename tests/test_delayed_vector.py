@@ -1,4 +1,16 @@
-from openeo_driver.delayed_vector import DelayedVector
+import io
+import json
+import math
+import os
+from pathlib import Path
+
+import pytest
+from shapely.geometry import LineString, Point, box, mapping, shape
+
+from openeo_driver.delayed_vector import (
+    DelayedVector, VectorCache, _iter_geojson_features, _update_geometry_bounds
+)
+from openeo_driver.download_cache import DownloadCache
 from .data import get_path
 
 
@@ -10,3 +22,268 @@ def test_feature_collection_bounds():
 def test_geometry_collection_bounds():
     dv = DelayedVector(str(get_path("GeometryCollection.geojson")))
     assert dv.bounds == (5.0761587693484875, 51.21222494794898, 5.166854684377381, 51.268936260927404)
+
+
+def test_geometries_memoized():
+    dv = DelayedVector(str(get_path("FeatureCollection.geojson")))
+    assert dv.geometries is dv.geometries
+
+
+def test_geometries_cache_shared(tmp_path):
+    path = tmp_path / "geometries.geojson"
+    path.write_text(get_path("GeometryCollection.geojson").read_text())
+    DelayedVector.cache.clear()
+    geometries = DelayedVector(str(path)).geometries
+    assert len(geometries) > 0
+    assert DelayedVector(str(path)).geometries is geometries
+    assert len(DelayedVector.cache) == 1
+
+
+def test_geometries_cache_invalidated_on_change(tmp_path):
+    path = tmp_path / "geometries.geojson"
+    path.write_text(json.dumps({"type": "Point", "coordinates": [1, 2]}))
+    DelayedVector.cache.clear()
+    assert DelayedVector(str(path)).bounds == (1, 2, 1, 2)
+    path.write_text(json.dumps({"type": "Point", "coordinates": [3, 44]}))
+    stat = path.stat()
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert DelayedVector(str(path)).bounds == (3, 44, 3, 44)
+
+
+def test_vector_cache_eviction():
+    cache = VectorCache(max_size=100)
+    cache.put("a", validator=1, geometries=["A"], size=40)
+    cache.put("b", validator=1, geometries=["B"], size=40)
+    assert cache.get("a") == (1, ["A"])
+    cache.put("c", validator=1, geometries=["C"], size=40)
+    assert cache.get("a") == (1, ["A"])
+    assert cache.get("b") is None
+    assert cache.get("c", validator=1) == (1, ["C"])
+    assert cache.get("c", validator=2) is None
+    cache.put("d", validator=1, geometries=["D"], size=1000)
+    assert cache.get("d") is None
+    assert len(cache) == 2
+
+
+@pytest.mark.parametrize(["filename", "expected"], [
+    ("FeatureCollection.geojson", (4.461822509765625, 51.14704810491208, 4.5208740234375, 51.19354556162766)),
+    ("GeometryCollection.geojson", (5.0761587693484875, 51.21222494794898, 5.166854684377381, 51.268936260927404)),
+])
+def test_bounds_streaming(filename, expected):
+    DelayedVector.cache.clear()
+    dv = DelayedVector(str(get_path(filename)))
+    assert dv.bounds == expected
+    assert dv._geometries is None
+    assert dv.bounds == DelayedVector._total_bounds(dv.geometries)
+
+
+@pytest.mark.parametrize(["geometry", "expected"], [
+    ({"type": "Point", "coordinates": [1, 2]}, [1, 2, 1, 2]),
+    ({"type": "Polygon", "coordinates": [[[3, 4], [5, 4], [5, 6], [3, 4]]]}, [3, 4, 5, 6]),
+    ({"type": "LineString", "coordinates": [[-1, 8.5, 100], [0, 0, 100]]}, [-1, 0, 0, 8.5]),
+    ({"type": "GeometryCollection", "geometries": [
+        {"type": "Point", "coordinates": [1, 2]},
+        {"type": "MultiPoint", "coordinates": [[3, -4], [0, 0]]},
+    ]}, [0, -4, 3, 2]),
+])
+def test_update_geometry_bounds(geometry, expected):
+    bounds = [float("inf"), float("inf"), float("-inf"), float("-inf")]
+    _update_geometry_bounds(bounds, geometry)
+    assert bounds == expected
+    assert tuple(bounds) == shape(geometry).bounds
+
+
+def test_bounds_streaming_ignores_properties(tmp_path):
+    path = tmp_path / "parcels.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"coordinates": [999, -999], "geometry": {"coordinates": [5, 5]}},
+         "geometry": {"type": "Point", "coordinates": [1, 2]}},
+        {"type": "Feature", "properties": {}, "geometry": None},
+    ]}))
+    DelayedVector.cache.clear()
+    assert DelayedVector(str(path)).bounds == (1, 2, 1, 2)
+
+
+def test_bounds_streaming_empty(tmp_path):
+    path = tmp_path / "empty.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": []}))
+    bounds = DelayedVector(str(path)).bounds
+    assert len(bounds) == 4 and all(math.isnan(b) for b in bounds)
+
+
+def test_bounds_streaming_invalid(tmp_path):
+    path = tmp_path / "invalid.geojson"
+    path.write_text('{"type": "Point", "coordinates": [1, 2')
+    with pytest.raises(ValueError):
+        _ = DelayedVector(str(path)).bounds
+
+
+def _write_parcels(path, count: int = 5):
+    geojson = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"id": i},
+         "geometry": {"type": "Point", "coordinates": [i, 50 + i]}}
+        for i in range(count)
+    ]}
+    path.write_text(json.dumps(geojson))
+    return geojson
+
+
+def test_iter_geometries(tmp_path):
+    path = tmp_path / "parcels.geojson"
+    _write_parcels(path)
+    dv = DelayedVector(str(path))
+    geometries = dv.iter_geometries()
+    assert not isinstance(geometries, list)
+    assert [(g.x, g.y) for g in geometries] == [(i, 50 + i) for i in range(5)]
+    assert [(g.x, p) for g, p in dv.iter_geometries(with_properties=True)] == [(i, {"id": i}) for i in range(5)]
+    assert dv._geometries is None
+
+
+def test_iter_geometries_loaded():
+    dv = DelayedVector(str(get_path("GeometryCollection.geojson")))
+    assert list(dv.iter_geometries()) == dv.geometries
+    assert [p for _, p in dv.iter_geometries(with_properties=True)] == [None] * len(dv.geometries)
+
+
+def test_iter_geometry_batches(tmp_path):
+    path = tmp_path / "parcels.geojson"
+    _write_parcels(path)
+    dv = DelayedVector(str(path))
+    batches = list(dv.iter_geometry_batches(2))
+    assert [[g.x for g in batch] for batch in batches] == [[0, 1], [2, 3], [4]]
+    batches = list(dv.iter_geometry_batches(3, with_properties=True))
+    assert [[p["id"] for _, p in batch] for batch in batches] == [[0, 1, 2], [3, 4]]
+
+
+def test_iter_geometries_shapefile(tmp_path):
+    fiona = pytest.importorskip("fiona")
+    path = str(tmp_path / "parcels.shp")
+    schema = {"geometry": "Point", "properties": {"id": "int"}}
+    with fiona.open(path, "w", driver="ESRI Shapefile", schema=schema) as collection:
+        for i in range(3):
+            collection.write({"geometry": {"type": "Point", "coordinates": (i, 50 + i)}, "properties": {"id": i}})
+    dv = DelayedVector(path)
+    assert [(g.x, p) for g, p in dv.iter_geometries(with_properties=True)] == [(i, {"id": i}) for i in range(3)]
+    assert [len(b) for b in dv.iter_geometry_batches(2)] == [2, 1]
+    assert dv.bounds == (0, 50, 2, 52)
+
+
+def test_iter_geometries_remote(requests_mock):
+    geojson = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"id": 1}, "geometry": {"type": "Point", "coordinates": [1, 2]}},
+    ]}
+    requests_mock.get("https://vector.test/parcels.geojson", json=geojson)
+    dv = DelayedVector("https://vector.test/parcels.geojson")
+    assert [(g.x, g.y, p) for g, p in dv.iter_geometries(with_properties=True)] == [(1, 2, {"id": 1})]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1024])
+@pytest.mark.parametrize(["geojson", "expected"], [
+    (
+        {"type": "FeatureCollection", "bbox": [0, 0, 12345, 9], "features": [
+            {"type": "Feature", "properties": {"name": "a"}, "geometry": {"type": "Point", "coordinates": [12345, 1]}},
+            {"type": "Feature", "properties": None, "geometry": {"type": "Point", "coordinates": [2, 3.25]}},
+        ]},
+        [({"type": "Point", "coordinates": [12345, 1]}, {"name": "a"}),
+         ({"type": "Point", "coordinates": [2, 3.25]}, None)],
+    ),
+    (
+        {"type": "GeometryCollection", "geometries": [{"type": "Point", "coordinates": [1, 2]}]},
+        [({"type": "Point", "coordinates": [1, 2]}, None)],
+    ),
+    (
+        {"type": "Feature", "properties": {"x": 1}, "geometry": {"type": "Point", "coordinates": [1, 2]}},
+        [({"type": "Point", "coordinates": [1, 2]}, {"x": 1})],
+    ),
+    (
+        {"type": "Point", "coordinates": [1, 2]},
+        [({"type": "Point", "coordinates": [1, 2]}, None)],
+    ),
+    (
+        {"features": [], "type": "FeatureCollection"},
+        [],
+    ),
+])
+def test_iter_geojson_features(geojson, expected, chunk_size):
+    f = io.StringIO(json.dumps(geojson, indent=1))
+    assert list(_iter_geojson_features(f, chunk_size=chunk_size)) == expected
+
+
+@pytest.mark.parametrize("data", ['{"type": "Point", "coordinates": [1, 2]', '{"features": [{"geometry": null} {}]}', '[1, 2]', ''])
+def test_iter_geojson_features_invalid(data):
+    with pytest.raises(ValueError):
+        list(_iter_geojson_features(io.StringIO(data), chunk_size=4))
+
+
+def _grid(tmp_path, size: int = 10):
+    """Write GeometryCollection of unit squares on a size x size grid."""
+    geojson = {"type": "GeometryCollection", "geometries": [
+        mapping(box(x, y, x + 1, y + 1)) for x in range(size) for y in range(size)
+    ]}
+    path = tmp_path / "grid.geojson"
+    path.write_text(json.dumps(geojson))
+    return DelayedVector(str(path))
+
+
+def test_query_bbox(tmp_path):
+    dv = _grid(tmp_path)
+    result = dv.query((2.5, 2.5, 3.5, 3.2))
+    assert [g.bounds for g in result] == [(2, 2, 3, 3), (2, 3, 3, 4), (3, 2, 4, 3), (3, 3, 4, 4)]
+    assert all(any(g is h for h in dv.geometries) for g in result)
+    assert dv.query((20, 20, 30, 30)) == []
+    assert dv.spatial_index is dv.spatial_index
+
+
+def test_query_geometry(tmp_path):
+    dv = _grid(tmp_path)
+    result = dv.query(Point(5.5, 6.5).buffer(0.1))
+    assert [g.bounds for g in result] == [(5, 6, 6, 7)]
+
+
+def test_intersecting(tmp_path):
+    dv = _grid(tmp_path)
+    # Diagonal line: bounding box overlaps 9 squares, but line only intersects (touches) 7 of them.
+    line = LineString([(0.5, 0.5), (2.5, 2.5)])
+    assert len(dv.query(line)) == 9
+    result = dv.intersecting(line)
+    assert [g.bounds for g in result] == [
+        (0, 0, 1, 1), (0, 1, 1, 2), (1, 0, 2, 1), (1, 1, 2, 2), (1, 2, 2, 3), (2, 1, 3, 2), (2, 2, 3, 3)
+    ]
+    assert result == [g for g in dv.geometries if g.intersects(line)]
+
+
+def test_query_empty(tmp_path):
+    path = tmp_path / "empty.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": []}))
+    dv = DelayedVector(str(path))
+    assert dv.query((0, 0, 1, 1)) == []
+    assert dv.intersecting(Point(0, 0)) == []
+
+
+def test_remote_shapefile_download_cache(tmp_path, requests_mock, monkeypatch):
+    fiona = pytest.importorskip("fiona")
+    source = tmp_path / "source"
+    source.mkdir()
+    schema = {"geometry": "Point", "properties": {"id": "int"}}
+    with fiona.open(str(source / "parcels.shp"), "w", driver="ESRI Shapefile", schema=schema) as collection:
+        for i in range(3):
+            collection.write({"geometry": {"type": "Point", "coordinates": (i, 50 + i)}, "properties": {"id": i}})
+    mocks = {
+        ext: requests_mock.get(
+            "https://vector.test/data/parcels" + ext + "?token=123",
+            content=(source / ("parcels" + ext)).read_bytes()
+        )
+        for ext in [".shp", ".shx", ".dbf"]
+    }
+    monkeypatch.setattr(DelayedVector, "download_cache", DownloadCache(root=tmp_path / "cache"))
+
+    url = "https://vector.test/data/parcels.shp?token=123"
+    dv = DelayedVector(url)
+    assert dv.bounds == (0, 50, 2, 52)
+    local_path = Path(dv._download_shapefile(url))
+    assert local_path.parent.parent == DelayedVector.download_cache.entry_path(url)
+    assert sorted(p.name for p in local_path.parent.iterdir()) == ["parcels.dbf", "parcels.shp", "parcels.shx"]
+    assert [(g.x, p) for g, p in DelayedVector(url).iter_geometries(with_properties=True)] == [
+        (i, {"id": i}) for i in range(3)
+    ]
+    assert all(m.call_count == 1 for m in mocks.values())
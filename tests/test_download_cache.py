@@ -0,0 +1,209 @@
+import hashlib
+import os
+import time
+
+import pytest
+import requests
+
+from openeo_driver.download_cache import DownloadCache
+
+URL = "https://data.test/vectors/parcels.shp"
+
+
+@pytest.fixture
+def cache(tmp_path) -> DownloadCache:
+    return DownloadCache(root=tmp_path / "cache", max_size=1000, max_age=3600, revalidate_after=60)
+
+
+def test_entry_path(cache):
+    assert cache.entry_path(URL) == cache.root / hashlib.sha256(URL.encode("utf-8")).hexdigest()
+    assert cache.entry_path(URL) == DownloadCache(root=cache.root).entry_path(URL)
+    assert cache.entry_path(URL) != cache.entry_path(URL + "?v=2")
+
+
+def test_get(cache, requests_mock):
+    m = requests_mock.get(URL, content=b"shp data", headers={"ETag": '"v1"'})
+    path = cache.get(URL)
+    assert path.parent.parent == cache.entry_path(URL)
+    assert path.name == "parcels.shp"
+    assert path.read_bytes() == b"shp data"
+    assert cache.get(URL) == path
+    assert m.call_count == 1
+    assert [p.name for p in path.parent.iterdir()] == ["parcels.shp"]
+    assert [p.name for p in cache.entry_path(URL).iterdir() if p.name.startswith(".tmp")] == []
+
+
+GROUP = [URL, URL.replace(".shp", ".shx"), URL.replace(".shp", ".dbf")]
+
+
+def test_get_files(cache, requests_mock):
+    mocks = [requests_mock.get(url, content=url[-3:].encode("ascii")) for url in GROUP]
+    paths = cache.get_files(GROUP)
+    assert [p.name for p in paths] == ["parcels.shp", "parcels.shx", "parcels.dbf"]
+    assert len(set(p.parent for p in paths)) == 1
+    assert [p.read_bytes() for p in paths] == [b"shp", b"shx", b"dbf"]
+    assert cache.get_files(GROUP) == paths
+    assert [m.call_count for m in mocks] == [1, 1, 1]
+
+
+def test_get_files_revalidated_as_group(cache, requests_mock):
+    for url in GROUP:
+        requests_mock.get(url, content=b"v1 " + url[-3:].encode("ascii"), headers={"ETag": '"v1"'})
+    old = cache.get_files(GROUP)
+    cache.revalidate_after = 0
+
+    # Not modified: only the primary file is checked.
+    mocks = [requests_mock.get(URL, status_code=304)] + [
+        requests_mock.get(url, exc=AssertionError("no companion request")) for url in GROUP[1:]
+    ]
+    assert cache.get_files(GROUP) == old
+    assert [m.call_count for m in mocks] == [1, 0, 0]
+
+    # Modified: all files are downloaded to a new version.
+    for url in GROUP:
+        requests_mock.get(url, content=b"v2 " + url[-3:].encode("ascii"), headers={"ETag": '"v2"'})
+    new = cache.get_files(GROUP)
+    assert new[0].parent != old[0].parent
+    assert [p.read_bytes() for p in new] == [b"v2 shp", b"v2 shx", b"v2 dbf"]
+    # Previous version is kept for readers that are still using it.
+    assert [p.read_bytes() for p in old] == [b"v1 shp", b"v1 shx", b"v1 dbf"]
+
+    requests_mock.get(URL, content=b"v3 shp", headers={"ETag": '"v3"'})
+    newer = cache.get_files(GROUP)
+    assert [p.read_bytes() for p in newer] == [b"v3 shp", b"v2 shx", b"v2 dbf"]
+    assert not old[0].parent.exists()
+    assert new[0].exists()
+
+
+def test_get_files_companion_failure(cache, requests_mock):
+    for url in GROUP:
+        requests_mock.get(url, content=b"v1", headers={"ETag": '"v1"'})
+    old = cache.get_files(GROUP)
+    cache.revalidate_after = 0
+    requests_mock.get(URL, content=b"v2", headers={"ETag": '"v2"'})
+    requests_mock.get(GROUP[2], status_code=500)
+    # Incomplete new version is discarded: keep using complete previous version.
+    assert cache.get_files(GROUP) == old
+    assert [p.read_bytes() for p in old] == [b"v1", b"v1", b"v1"]
+    assert set(p.name for p in cache.entry_path(URL).iterdir() if not p.name.startswith(".")) == {
+        old[0].parent.name, "meta.json"
+    }
+
+
+def test_get_files_other_group(cache, requests_mock):
+    for url in GROUP:
+        requests_mock.get(url, content=url[-3:].encode("ascii"))
+    shp = cache.get(URL)
+    paths = cache.get_files(GROUP)
+    assert paths[0].read_bytes() == b"shp"
+    assert paths[2].read_bytes() == b"dbf"
+    assert shp.parent != paths[0].parent
+
+
+@pytest.mark.parametrize(["headers", "expected"], [
+    ({"ETag": '"v1"'}, {"If-None-Match": '"v1"'}),
+    ({"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}, {"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"}),
+])
+def test_revalidate_not_modified(cache, requests_mock, headers, expected):
+    requests_mock.get(URL, content=b"v1", headers=headers)
+    path = cache.get(URL)
+    cache.revalidate_after = 0
+    m = requests_mock.get(URL, status_code=304)
+    assert cache.get(URL) == path
+    assert path.read_bytes() == b"v1"
+    assert m.call_count == 1
+    for k, v in expected.items():
+        assert m.last_request.headers[k] == v
+
+
+def test_revalidate_modified(cache, requests_mock):
+    requests_mock.get(URL, content=b"v1", headers={"ETag": '"v1"'})
+    path = cache.get(URL)
+    cache.revalidate_after = 0
+    requests_mock.get(URL, content=b"v2", headers={"ETag": '"v2"'})
+    assert cache.get(URL).read_bytes() == b"v2"
+    m = requests_mock.get(URL, status_code=304)
+    cache.get(URL)
+    assert m.last_request.headers["If-None-Match"] == '"v2"'
+
+
+def test_revalidate_failure_uses_cached(cache, requests_mock):
+    requests_mock.get(URL, content=b"v1")
+    path = cache.get(URL)
+    cache.revalidate_after = 0
+    requests_mock.get(URL, exc=requests.ConnectionError)
+    assert cache.get(URL) == path
+    assert path.read_bytes() == b"v1"
+
+
+def test_get_failure(cache, requests_mock):
+    requests_mock.get(URL, status_code=404)
+    with pytest.raises(requests.HTTPError):
+        cache.get(URL)
+    assert [p.name for p in cache.entry_path(URL).iterdir()] == [".lock"]
+
+
+def test_partial_download_not_visible(cache, requests_mock):
+    def body():
+        yield b"partial"
+        raise requests.ConnectionError("connection lost")
+
+    requests_mock.get(URL, body=_Stream(body()))
+    with pytest.raises(requests.RequestException):
+        cache.get(URL)
+    assert [p.name for p in cache.entry_path(URL).iterdir()] == [".lock"]
+
+
+class _Stream:
+    """File-like wrapper of a chunk generator (as response body)."""
+
+    closed = False
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def read(self, *args, **kwargs):
+        return next(self._chunks, b"")
+
+    def close(self):
+        self.closed = True
+
+
+def test_evict_size(cache, requests_mock):
+    for i in range(4):
+        requests_mock.get("https://data.test/{i}.bin".format(i=i), content=b"x" * 150)
+    paths = []
+    for i in range(4):
+        paths.append(cache.get("https://data.test/{i}.bin".format(i=i)))
+        # Make sure entries have different last use times.
+        os.utime(str(paths[-1].parent.parent), (time.time() - 100 + i, time.time() - 100 + i))
+    assert [p.exists() for p in paths] == [False, True, True, True]
+
+    # Use 1.bin: 2.bin becomes least recently used.
+    cache.get("https://data.test/1.bin")
+    requests_mock.get("https://data.test/4.bin", content=b"x" * 150)
+    cache.get("https://data.test/4.bin")
+    assert [p.exists() for p in paths] == [False, True, False, True]
+
+
+def test_evict_age(cache, requests_mock):
+    requests_mock.get("https://data.test/old.bin", content=b"old")
+    requests_mock.get("https://data.test/new.bin", content=b"new")
+    old = cache.get("https://data.test/old.bin")
+    os.utime(str(old.parent.parent), (time.time() - 7200, time.time() - 7200))
+    new = cache.get("https://data.test/new.bin")
+    assert not old.exists()
+    assert new.exists()
+    assert sorted(p.name for p in cache.root.iterdir()) == [new.parent.parent.name]
+
+
+def test_env_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENEO_DOWNLOAD_CACHE_DIR", str(tmp_path / "env"))
+    monkeypatch.setenv("OPENEO_DOWNLOAD_CACHE_MAX_SIZE", "1234")
+    monkeypatch.setenv("OPENEO_DOWNLOAD_CACHE_MAX_AGE", "60")
+    cache = DownloadCache()
+    assert cache.root == tmp_path / "env"
+    assert cache.max_size == 1234
+    assert cache.max_age == 60
+    assert cache.revalidate_after == 3600
+    assert not cache.root.exists()
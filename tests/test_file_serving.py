@@ -0,0 +1,126 @@
+import os
+
+import flask
+import pytest
+from werkzeug.http import http_date
+
+from openeo_driver.file_serving import send_from_directory, parse_ranges, file_etag
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    with (tmp_path / "data.tiff").open("wb") as f:
+        f.write(DATA)
+    return tmp_path
+
+
+@pytest.fixture
+def client(data_dir):
+    app = flask.Flask(__name__)
+
+    @app.route("/files/<filename>")
+    def get_file(filename):
+        return send_from_directory(data_dir, filename)
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize(["header", "expected"], [
+    ("bytes=0-99", [(0, 100)]),
+    ("bytes=100-", [(100, 1000)]),
+    ("bytes=-100", [(900, 1000)]),
+    ("bytes=-2000", [(0, 1000)]),
+    ("bytes=900-1999", [(900, 1000)]),
+    ("bytes=0-9,10-19,50-59", [(0, 20), (50, 60)]),
+    ("bytes=1000-1100", []),
+    ("bytes=foo", None),
+    ("items=0-9", None),
+    ("bytes=" + ",".join("{a}-{b}".format(a=i * 10, b=i * 10 + 1) for i in range(50)), None),
+])
+def test_parse_ranges(header, expected):
+    assert parse_ranges(header, length=1000) == expected
+
+
+def test_send_file_full(client, data_dir):
+    resp = client.get("/files/data.tiff")
+    assert resp.status_code == 200
+    assert resp.data == DATA
+    assert resp.content_type == "image/tiff"
+    assert resp.headers["Accept-Ranges"] == "bytes"
+    assert resp.headers["Content-Length"] == str(len(DATA))
+    assert resp.headers["ETag"] == '"{e}"'.format(e=file_etag(os.stat(str(data_dir / "data.tiff"))))
+    assert resp.headers["Last-Modified"]
+
+
+def test_send_file_not_found(client):
+    assert client.get("/files/nope.tiff").status_code == 404
+    assert client.get("/files/..%2Fetc%2Fpasswd").status_code == 404
+
+
+def test_send_file_single_range(client):
+    resp = client.get("/files/data.tiff", headers={"Range": "bytes=100-299"})
+    assert resp.status_code == 206
+    assert resp.data == DATA[100:300]
+    assert resp.headers["Content-Range"] == "bytes 100-299/10240"
+    assert resp.headers["Content-Length"] == "200"
+
+    resp = client.get("/files/data.tiff", headers={"Range": "bytes=-10"})
+    assert resp.status_code == 206
+    assert resp.data == DATA[-10:]
+
+
+def test_send_file_multipart_range(client):
+    resp = client.get("/files/data.tiff", headers={"Range": "bytes=0-9,1000-1019"})
+    assert resp.status_code == 206
+    assert resp.mimetype == "multipart/byteranges"
+    boundary = resp.mimetype_params["boundary"].encode("ascii")
+    assert int(resp.headers["Content-Length"]) == len(resp.data)
+    parts = resp.data.split(b"--" + boundary)
+    assert parts[0] == b""
+    assert parts[-1] == b"--\r\n"
+    assert parts[1] == b"\r\nContent-Type: image/tiff\r\nContent-Range: bytes 0-9/10240\r\n\r\n" + DATA[:10] + b"\r\n"
+    assert parts[2] == (
+            b"\r\nContent-Type: image/tiff\r\nContent-Range: bytes 1000-1019/10240\r\n\r\n" + DATA[1000:1020] + b"\r\n"
+    )
+
+
+def test_send_file_range_not_satisfiable(client):
+    resp = client.get("/files/data.tiff", headers={"Range": "bytes=20000-"})
+    assert resp.status_code == 416
+    assert resp.headers["Content-Range"] == "bytes */10240"
+
+
+def test_send_file_if_none_match(client):
+    etag = client.get("/files/data.tiff").headers["ETag"]
+    resp = client.get("/files/data.tiff", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    resp = client.get("/files/data.tiff", headers={"If-None-Match": '"other"'})
+    assert resp.status_code == 200
+
+
+def test_send_file_if_modified_since(client, data_dir):
+    mtime = os.stat(str(data_dir / "data.tiff")).st_mtime
+    resp = client.get("/files/data.tiff", headers={"If-Modified-Since": http_date(mtime + 10)})
+    assert resp.status_code == 304
+    resp = client.get("/files/data.tiff", headers={"If-Modified-Since": http_date(mtime - 3600)})
+    assert resp.status_code == 200
+
+
+def test_send_file_if_range(client, data_dir):
+    resp = client.get("/files/data.tiff")
+    etag, last_modified = resp.headers["ETag"], resp.headers["Last-Modified"]
+    resp = client.get("/files/data.tiff", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert resp.status_code == 206
+    assert resp.data == DATA[:10]
+    resp = client.get("/files/data.tiff", headers={"Range": "bytes=0-9", "If-Range": last_modified})
+    assert resp.status_code == 206
+    # File changed: full content
+    os.utime(str(data_dir / "data.tiff"), (1000000, 1000000))
+    resp = client.get("/files/data.tiff", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert resp.status_code == 200
+    assert resp.data == DATA
+    resp = client.get("/files/data.tiff", headers={"Range": "bytes=0-9", "If-Range": last_modified})
+    assert resp.status_code == 200
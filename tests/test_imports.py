@@ -0,0 +1,66 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+# Heavy modules that should not be imported just by importing the web app (only on first use).
+HEAVY_MODULES = ["geopandas", "fiona", "pandas", "xarray", "netCDF4"]
+
+# Modules that openeo_driver itself should not import at import time
+# (they might still be imported by third-party dependencies, e.g. `pkg_resources` by setuptools).
+HEAVY_DIRECT_MODULES = HEAVY_MODULES + ["pkg_resources"]
+
+# Script to import a module while recording the heavy modules imported (directly) by openeo_driver modules.
+_DIRECT_IMPORTS_SCRIPT = """
+import builtins, json, sys
+heavy = set(sys.argv[1].split(","))
+found = []
+original_import = builtins.__import__
+
+def tracing_import(name, globals=None, locals=None, fromlist=(), level=0):
+    importer = (globals or {}).get("__name__") or ""
+    if importer.split(".")[0] == "openeo_driver" and level == 0 and name.split(".")[0] in heavy:
+        found.append([importer, name])
+    return original_import(name, globals, locals, fromlist, level)
+
+builtins.__import__ = tracing_import
+__import__(sys.argv[2])
+print(json.dumps(found))
+"""
+
+
+def _import_times(module: str) -> dict:
+    """Import module in fresh interpreter with `-X importtime`: get mapping of imported modules to cumulative time (us)."""
+    env = dict(os.environ, DRIVER_IMPLEMENTATION_PACKAGE="openeo_driver.dummy.dummy_backend")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, env=env, check=True,
+    )
+    times = {}
+    for line in proc.stderr.split("\n"):
+        match = re.match(r"import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)", line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="`-X importtime` requires Python 3.7+")
+def test_import_views_is_lightweight():
+    times = _import_times("openeo_driver.views")
+    assert "openeo_driver.views" in times
+    heavy = [m for m in times if m.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+    # Backend implementation should only be loaded on first use
+    assert "openeo_driver.dummy.dummy_backend" not in times
+
+
+def test_import_views_no_direct_heavy_imports():
+    env = dict(os.environ, DRIVER_IMPLEMENTATION_PACKAGE="openeo_driver.dummy.dummy_backend")
+    proc = subprocess.run(
+        [sys.executable, "-c", _DIRECT_IMPORTS_SCRIPT, ",".join(HEAVY_DIRECT_MODULES), "openeo_driver.views"],
+        stdout=subprocess.PIPE, universal_newlines=True, env=env, check=True,
+    )
+    assert json.loads(proc.stdout.strip().split("\n")[-1]) == []
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from openeo_driver.job_events import JobEventBus
+
+
+def test_publish_and_wait():
+    bus = JobEventBus()
+    assert bus.last_seq == 0
+    bus.publish(user_id="john", job_id="j1", status="queued")
+    bus.publish(user_id="alice", job_id="j2", status="queued")
+    bus.publish(user_id="john", job_id="j3", status="queued")
+    bus.publish(user_id="john", job_id="j1", status="running", progress=10)
+    events = bus.wait(after=0, user_id="john", timeout=0)
+    assert [(e.seq, e.job_id, e.status) for e in events] == [(1, "j1", "queued"), (3, "j3", "queued"), (4, "j1", "running")]
+    events = bus.wait(after=1, user_id="john", job_id="j1", timeout=0)
+    assert [(e.seq, e.status, e.progress) for e in events] == [(4, "running", 10)]
+    assert bus.wait(after=4, user_id="john", timeout=0) == []
+
+
+def test_wait_blocks_until_event():
+    bus = JobEventBus()
+    bus.publish(user_id="alice", job_id="j2", status="queued")
+
+    def publish():
+        time.sleep(0.1)
+        bus.publish(user_id="alice", job_id="j2", status="running")
+        time.sleep(0.1)
+        bus.publish(user_id="john", job_id="j1", status="running")
+
+    threading.Thread(target=publish).start()
+    start = time.time()
+    events = bus.wait(after=bus.last_seq, user_id="john", timeout=5)
+    assert 0.15 < time.time() - start < 4
+    assert [(e.seq, e.job_id) for e in events] == [(3, "j1")]
+
+
+def test_wait_timeout():
+    bus = JobEventBus()
+    start = time.time()
+    assert bus.wait(after=0, user_id="john", timeout=0.1) == []
+    assert 0.05 < time.time() - start < 1
+
+
+def test_history_bounded():
+    bus = JobEventBus(history=3)
+    for i in range(10):
+        bus.publish(user_id="john", job_id="j{i}".format(i=i), status="queued")
+    assert [e.seq for e in bus.wait(after=0, user_id="john", timeout=0)] == [8, 9, 10]
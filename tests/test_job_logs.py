@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from openeo_driver.job_logs import JsonLinesLogReader
+
+
+def _write_log(path, levels, mode="w"):
+    with path.open(mode) as f:
+        for level in levels:
+            f.write(json.dumps({"level": level, "message": "msg", "path": []}) + "\n")
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "log.jsonl"
+    _write_log(path, ["info", "debug", "error"] * 10)
+    return path
+
+
+def _ids(entries):
+    return [int(e["id"]) for e in entries]
+
+
+def test_read_all(log_file):
+    entries, next_offset = JsonLinesLogReader(log_file).read()
+    assert _ids(entries) == list(range(30))
+    assert entries[0] == {"id": "0", "level": "info", "message": "msg", "path": []}
+    assert next_offset is None
+
+
+def test_read_missing(tmp_path):
+    assert JsonLinesLogReader(tmp_path / "nope.jsonl").read() == ([], None)
+
+
+@pytest.mark.parametrize("index_interval", [1, 4, 1000])
+def test_read_pages(log_file, index_interval):
+    reader = JsonLinesLogReader(log_file, index_interval=index_interval)
+    ids = []
+    offset = None
+    while True:
+        entries, offset = reader.read(offset=None if offset is None else int(offset), limit=7)
+        ids.extend(_ids(entries))
+        if offset is None:
+            break
+    assert ids == list(range(30))
+    # Random access
+    assert _ids(reader.read(offset=24, limit=3)[0]) == [25, 26, 27]
+    assert _ids(reader.read(offset=2, limit=2)[0]) == [3, 4]
+    assert reader.read(offset=29, limit=2) == ([], None)
+    assert reader.read(offset=100, limit=2) == ([], None)
+
+
+def test_read_index_is_sparse(log_file):
+    reader = JsonLinesLogReader(log_file, index_interval=4)
+    reader.read(offset=20, limit=1)
+    assert len(reader._offsets) == 6
+    with log_file.open("rb") as f:
+        lines = f.readlines()
+    assert reader._offsets == [sum(len(l) for l in lines[:i]) for i in range(0, 24, 4)]
+
+
+def test_read_level(log_file):
+    reader = JsonLinesLogReader(log_file)
+    entries, next_offset = reader.read(level="error", limit=3)
+    assert _ids(entries) == [2, 5, 8]
+    assert next_offset == "8"
+    entries, next_offset = reader.read(offset=int(next_offset), level="info")
+    assert _ids(entries) == [9, 11, 12, 14, 15, 17, 18, 20, 21, 23, 24, 26, 27, 29]
+
+
+def test_read_growing_and_replaced_file(log_file):
+    reader = JsonLinesLogReader(log_file, index_interval=4)
+    assert len(reader.read()[0]) == 30
+    with log_file.open("a") as f:
+        f.write(json.dumps({"level": "info", "message": "new"}) + "\n")
+        f.write('{"level": "info", "mess')
+    entries, _ = reader.read(offset=28)
+    assert _ids(entries) == [29, 30]
+    assert entries[-1]["message"] == "new"
+    # Replaced (e.g. restarted job)
+    log_file.unlink()
+    _write_log(log_file, ["warning"] * 3)
+    entries, _ = reader.read(offset=0)
+    assert _ids(entries) == [1, 2]
+    assert entries[0]["level"] == "warning"
@@ -0,0 +1,120 @@
+import hashlib
+import os
+from unittest import mock
+
+from openeo_driver.job_results import JobResultsCache, build_assets_manifest, AssetInfo, write_checksums, \
+    read_checksums, CHECKSUMS_FILENAME
+
+
+def test_build_assets_manifest(tmp_path):
+    with (tmp_path / "out.tiff").open("wb") as f:
+        f.write(b"tiffdata")
+    write_checksums(tmp_path, ["out.tiff"])
+    manifest = build_assets_manifest({"out.tiff": str(tmp_path), "missing.json": str(tmp_path)})
+    assert manifest == {
+        "out.tiff": AssetInfo(
+            filename="out.tiff", path=tmp_path / "out.tiff", size=8, media_type="image/tiff",
+            checksum=hashlib.sha256(b"tiffdata").hexdigest()
+        ),
+        "missing.json": AssetInfo(
+            filename="missing.json", path=tmp_path / "missing.json", size=None, media_type="application/json",
+            checksum=None
+        ),
+    }
+
+
+def _batch_jobs(tmp_path):
+    batch_jobs = mock.Mock()
+    batch_jobs.get_results.side_effect = lambda job_id, user_id: {
+        "{j}-{f}".format(j=job_id, f=f): str(tmp_path) for f in ["a.txt"]
+    }
+    return batch_jobs
+
+
+def test_job_results_cache(tmp_path):
+    for job_id in ["j1", "j2", "j3"]:
+        (tmp_path / "{j}-a.txt".format(j=job_id)).write_text("data")
+    batch_jobs = _batch_jobs(tmp_path)
+    cache = JobResultsCache(max_entries=2)
+    for _ in range(3):
+        manifest = cache.get_manifest(batch_jobs, job_id="j1", user_id="john")
+        assert list(manifest.keys()) == ["j1-a.txt"]
+        assert manifest["j1-a.txt"].size == 4
+    assert batch_jobs.get_results.call_count == 1
+
+    cache.get_manifest(batch_jobs, job_id="j2", user_id="john")
+    cache.get_manifest(batch_jobs, job_id="j1", user_id="alice")
+    assert len(cache) == 2
+    # j1 of john was evicted (least recently used)
+    cache.get_manifest(batch_jobs, job_id="j1", user_id="john")
+    assert batch_jobs.get_results.call_count == 4
+
+    cache.invalidate(job_id="j1", user_id="john")
+    cache.get_manifest(batch_jobs, job_id="j1", user_id="john")
+    assert batch_jobs.get_results.call_count == 5
+
+
+def test_job_results_cache_revalidate(tmp_path):
+    path = tmp_path / "j1-a.txt"
+    path.write_text("data")
+    batch_jobs = _batch_jobs(tmp_path)
+    cache = JobResultsCache()
+    assert cache.get_manifest(batch_jobs, job_id="j1", user_id="john")["j1-a.txt"].size == 4
+    cache.get_manifest(batch_jobs, job_id="j1", user_id="john")
+    assert batch_jobs.get_results.call_count == 1
+
+    # Job was re-run (e.g. through another worker process): result files changed.
+    path.write_text("new data")
+    assert cache.get_manifest(batch_jobs, job_id="j1", user_id="john")["j1-a.txt"].size == 8
+    assert batch_jobs.get_results.call_count == 2
+    stat = path.stat()
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cache.get_manifest(batch_jobs, job_id="j1", user_id="john")
+    assert batch_jobs.get_results.call_count == 3
+
+    # Job restarted: result files removed
+    path.unlink()
+    assert cache.get_manifest(batch_jobs, job_id="j1", user_id="john")["j1-a.txt"].size is None
+    assert batch_jobs.get_results.call_count == 4
+
+
+def test_job_results_cache_incomplete(tmp_path):
+    batch_jobs = _batch_jobs(tmp_path)
+    cache = JobResultsCache()
+    manifest = cache.get_manifest(batch_jobs, job_id="j1", user_id="john")
+    assert manifest["j1-a.txt"].size is None
+    cache.get_manifest(batch_jobs, job_id="j1", user_id="john")
+    assert batch_jobs.get_results.call_count == 2
+    assert len(cache) == 0
+
+
+def test_build_assets_manifest_no_checksums(tmp_path):
+    (tmp_path / "out.tiff").write_bytes(b"tiffdata")
+    with mock.patch("openeo_driver.job_results.file_checksum") as file_checksum:
+        manifest = build_assets_manifest({"out.tiff": str(tmp_path)})
+    assert not file_checksum.called
+    assert manifest["out.tiff"].size == 8
+    assert manifest["out.tiff"].checksum is None
+
+
+def test_checksums_sidecar(tmp_path):
+    (tmp_path / "a.tiff").write_bytes(b"tiffdata")
+    (tmp_path / "b c.json").write_bytes(b"{}")
+    path = write_checksums(tmp_path, ["a.tiff", "b c.json"])
+    assert path == tmp_path / CHECKSUMS_FILENAME
+    expected = {"a.tiff": hashlib.sha256(b"tiffdata").hexdigest(), "b c.json": hashlib.sha256(b"{}").hexdigest()}
+    assert read_checksums(tmp_path) == expected
+    assert read_checksums(tmp_path / "missing") == {}
+    with mock.patch("openeo_driver.job_results.file_checksum") as file_checksum:
+        manifest = build_assets_manifest({"a.tiff": str(tmp_path)})
+    assert not file_checksum.called
+    assert manifest["a.tiff"].checksum == expected["a.tiff"]
+
+
+def test_job_results_cache_no_checksums_without_sidecar(tmp_path):
+    (tmp_path / "j1-a.txt").write_text("data")
+    batch_jobs = _batch_jobs(tmp_path)
+    cache = JobResultsCache()
+    with mock.patch("openeo_driver.job_results.file_checksum") as file_checksum:
+        assert cache.get_manifest(batch_jobs, job_id="j1", user_id="john")["j1-a.txt"].checksum is None
+    assert not file_checksum.called
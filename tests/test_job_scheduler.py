@@ -0,0 +1,303 @@
+from datetime import datetime
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import time
+
+import pytest
+
+from openeo_driver.backend import BatchJobMetadata
+from openeo_driver.errors import JobNotFinishedException, OpenEOApiException
+from openeo_driver.job_results import read_checksums
+from openeo_driver.job_scheduler import LocalJobScheduler, LocalBatchJobs, run_job, save_job_result, LOG_FILENAME, \
+    write_log_entry
+from openeo_driver.job_store import JobStore
+from openeo_driver.save_result import JSONResult
+
+
+def _test_runner(job_dir: Path, process: dict, api_version: str):
+    """Job runner for testing: log start, sleep a bit, then succeed or fail."""
+    with open(process["trace"], "a") as f:
+        f.write(job_dir.name + "\n")
+    time.sleep(process.get("sleep", 0))
+    if process.get("fail"):
+        raise RuntimeError("Boom")
+    (job_dir / "out.txt").write_text("api {v}".format(v=api_version))
+
+
+def _wait_for_status(store: JobStore, job_id: str, user_id: str, statuses, timeout=10) -> str:
+    end = time.time() + timeout
+    while True:
+        status = store.get(job_id=job_id, user_id=user_id).status
+        if status in statuses or time.time() > end:
+            return status
+        time.sleep(0.02)
+
+
+def _add_job(store: JobStore, job_id: str, user_id: str = "john", **process) -> BatchJobMetadata:
+    return store.add(user_id=user_id, metadata=BatchJobMetadata(
+        id=job_id, status="created", process=process, created=datetime.utcnow(), api_version="1.0.0"
+    ))
+
+
+@pytest.fixture
+def trace(tmp_path) -> str:
+    return str(tmp_path / "trace.txt")
+
+
+def _read_trace(trace: str):
+    with open(trace) as f:
+        return f.read().split()
+
+
+def test_scheduler_finished_and_error(tmp_path, trace):
+    store = JobStore()
+    _add_job(store, "job-1", trace=trace)
+    _add_job(store, "job-2", trace=trace, fail=True)
+    scheduler = LocalJobScheduler(store, output_root=tmp_path, max_workers=2, runner=_test_runner)
+    try:
+        scheduler.submit("job-1", "john")
+        scheduler.submit("job-2", "john")
+        assert _wait_for_status(store, "job-1", "john", {"finished", "error"}) == "finished"
+        assert _wait_for_status(store, "job-2", "john", {"finished", "error"}) == "error"
+    finally:
+        scheduler.shutdown()
+    assert (tmp_path / "job-1" / "out.txt").read_text() == "api 1.0.0"
+    assert not (tmp_path / "job-2" / "out.txt").exists()
+    assert scheduler.running_count == 0
+
+
+def test_scheduler_priority_and_user_cap(tmp_path, trace):
+    store = JobStore()
+    _add_job(store, "job-1", trace=trace, sleep=0.3)
+    _add_job(store, "job-2", trace=trace)
+    _add_job(store, "job-3", trace=trace)
+    _add_job(store, "job-4", user_id="alice", trace=trace)
+    scheduler = LocalJobScheduler(store, output_root=tmp_path, max_workers=2, max_jobs_per_user=1, runner=_test_runner)
+    try:
+        scheduler.submit("job-1", "john")
+        assert _wait_for_status(store, "job-1", "john", {"running"}) == "running"
+        scheduler.submit("job-2", "john", priority=0)
+        scheduler.submit("job-3", "john", priority=5)
+        # John's job-2 and job-3 wait on job-1 (user cap), but alice can run
+        scheduler.submit("job-4", "alice")
+        assert _wait_for_status(store, "job-4", "alice", {"finished"}) == "finished"
+        assert store.get(job_id="job-1", user_id="john").status == "running"
+        assert store.get(job_id="job-2", user_id="john").status == "queued"
+        for job_id in ["job-1", "job-2", "job-3"]:
+            assert _wait_for_status(store, job_id, "john", {"finished"}) == "finished"
+    finally:
+        scheduler.shutdown()
+    # Higher priority job-3 runs before job-2
+    assert _read_trace(trace) == ["job-1", "job-4", "job-3", "job-2"]
+
+
+def test_scheduler_cancel(tmp_path, trace):
+    store = JobStore()
+    _add_job(store, "job-1", trace=trace, sleep=30)
+    _add_job(store, "job-2", trace=trace)
+    scheduler = LocalJobScheduler(store, output_root=tmp_path, max_workers=1, runner=_test_runner)
+    try:
+        scheduler.submit("job-1", "john")
+        assert _wait_for_status(store, "job-1", "john", {"running"}) == "running"
+        scheduler.submit("job-2", "john")
+        assert scheduler.queue_size == 1
+        scheduler.cancel("job-2", "john")
+        assert store.get(job_id="job-2", user_id="john").status == "canceled"
+        assert scheduler.queue_size == 0
+        start = time.time()
+        scheduler.cancel("job-1", "john")
+        assert _wait_for_status(store, "job-1", "john", {"canceled"}) == "canceled"
+        assert time.time() - start < 10
+    finally:
+        scheduler.shutdown()
+    assert _read_trace(trace) == ["job-1"]
+
+
+def test_scheduler_start_failure(tmp_path, trace):
+    store = JobStore()
+    _add_job(store, "job-1", trace=trace, sleep=0.5)
+    _add_job(store, "job-2", trace=trace)
+    _add_job(store, "job-3", trace=trace)
+    _add_job(store, "job-4", trace=trace)
+    # Job directory of job-3 can not be created
+    (tmp_path / "job-3").write_text("not a directory")
+    scheduler = LocalJobScheduler(store, output_root=tmp_path, max_workers=1, runner=_test_runner)
+    try:
+        scheduler.submit("job-1", "john")
+        assert _wait_for_status(store, "job-1", "john", {"running"}) == "running"
+        for job_id in ["job-2", "job-3", "job-4"]:
+            scheduler.submit(job_id, "john")
+        # job-2 is removed while queued
+        store.remove(job_id="job-2", user_id="john")
+        assert _wait_for_status(store, "job-3", "john", {"error"}) == "error"
+        assert _wait_for_status(store, "job-4", "john", {"finished"}) == "finished"
+    finally:
+        scheduler.shutdown()
+    assert _read_trace(trace) == ["job-1", "job-4"]
+
+
+class _FailingJobStore(JobStore):
+    """Job store that fails to mark jobs as running."""
+
+    def update(self, job_id: str, user_id: str, **fields):
+        if fields.get("status") == "running":
+            raise RuntimeError("Database is locked")
+        return super().update(job_id=job_id, user_id=user_id, **fields)
+
+
+def test_scheduler_start_failure_after_process_start(tmp_path, trace):
+    store = _FailingJobStore()
+    _add_job(store, "job-1", trace=trace, sleep=5)
+    scheduler = LocalJobScheduler(store, output_root=tmp_path, max_workers=1, runner=_test_runner)
+    try:
+        scheduler.submit("job-1", "john")
+        assert _wait_for_status(store, "job-1", "john", {"error"}) == "error"
+        assert scheduler.running_count == 0
+        assert [p.name for p in multiprocessing.active_children() if p.name == "openeo-job-job-1"] == []
+    finally:
+        scheduler.shutdown()
+
+
+def test_scheduler_rerun_cleans_job_dir(tmp_path, trace):
+    store = JobStore()
+    _add_job(store, "job-1", trace=trace)
+    scheduler = LocalJobScheduler(store, output_root=tmp_path, max_workers=1, runner=_test_runner)
+    try:
+        scheduler.submit("job-1", "john")
+        assert _wait_for_status(store, "job-1", "john", {"finished"}) == "finished"
+        (tmp_path / "job-1" / "old.txt").write_text("previous run")
+        scheduler.submit("job-1", "john")
+        assert _wait_for_status(store, "job-1", "john", {"finished"}) == "finished"
+    finally:
+        scheduler.shutdown()
+    assert sorted(p.name for p in (tmp_path / "job-1").iterdir()) == ["out.txt"]
+
+
+def test_scheduler_after_fork(tmp_path, trace):
+    mp = multiprocessing.get_context("fork")
+    store = JobStore()
+    _add_job(store, "job-1", trace=trace)
+    _add_job(store, "job-2", trace=trace)
+    _add_job(store, "job-3", trace=trace)
+    batch_jobs = LocalBatchJobs(output_root=tmp_path, job_store=store, runner=_test_runner)
+    try:
+        # Dispatcher thread started in parent (e.g. gunicorn master process with preloaded app).
+        batch_jobs.start_job("job-1", "john")
+        assert _wait_for_status(store, "job-1", "john", {"finished"}) == "finished"
+
+        def child(job_id: str, post_fork: bool):
+            if post_fork:
+                batch_jobs.post_fork()
+            batch_jobs.start_job(job_id, "john")
+            status = _wait_for_status(store, job_id, "john", {"finished", "error"}, timeout=5)
+            batch_jobs.scheduler.shutdown()
+            os._exit(0 if status == "finished" else 1)
+
+        for job_id, post_fork in [("job-2", True), ("job-3", False)]:
+            process = mp.Process(target=child, args=(job_id, post_fork))
+            process.start()
+            process.join(timeout=10)
+            assert process.exitcode == 0
+    finally:
+        batch_jobs.scheduler.shutdown()
+    assert _read_trace(trace) == ["job-1", "job-2", "job-3"]
+
+
+def test_save_job_result_json(tmp_path):
+    assets = save_job_result(JSONResult({"foo": [1, float("nan")]}), tmp_path)
+    assert assets == [tmp_path / "result.json"]
+    with (tmp_path / "result.json").open() as f:
+        assert json.load(f) == {"foo": [1, None]}
+
+
+def test_run_job_default(tmp_path):
+    process_graph = {
+        "lc": {"process_id": "load_collection", "arguments": {"id": "S2_FOOBAR"}},
+        "sr": {
+            "process_id": "save_result", "arguments": {"data": {"from_node": "lc"}, "format": "GTiff"},
+            "result": True
+        },
+    }
+    run_job(tmp_path, {"process_graph": process_graph}, "1.0.0")
+    assert (tmp_path / "out").exists()
+    assert set(read_checksums(tmp_path)) == {"out"}
+    with (tmp_path / LOG_FILENAME).open() as f:
+        entries = [json.loads(line) for line in f]
+    assert [e["level"] for e in entries] == ["info", "info"]
+
+
+def test_run_job_failure(tmp_path):
+    process_graph = {"foo": {"process_id": "fooBar", "arguments": {}, "result": True}}
+    with pytest.raises(Exception):
+        run_job(tmp_path, {"process_graph": process_graph}, "1.0.0")
+    with (tmp_path / LOG_FILENAME).open() as f:
+        entries = [json.loads(line) for line in f]
+    assert entries[-1]["level"] == "error"
+    assert "fooBar" in entries[-1]["message"]
+
+
+def test_local_batch_jobs(tmp_path, trace):
+    batch_jobs = LocalBatchJobs(output_root=tmp_path, runner=_test_runner)
+    try:
+        job = batch_jobs.create_job(
+            user_id="john", process={"trace": trace}, api_version="0.4.0", job_options={"priority": 3}
+        )
+        assert batch_jobs.get_job_info(job_id=job.id, user_id="john").status == "created"
+        assert [j.id for j in batch_jobs.get_user_jobs(user_id="john")] == [job.id]
+        with pytest.raises(JobNotFinishedException):
+            batch_jobs.get_results(job_id=job.id, user_id="john")
+        batch_jobs.start_job(job_id=job.id, user_id="john")
+        assert _wait_for_status(batch_jobs._job_store, job.id, "john", {"finished"}) == "finished"
+        assert batch_jobs.get_results(job_id=job.id, user_id="john") == {"out.txt": str(tmp_path / job.id)}
+        assert batch_jobs.get_log_entries(job_id=job.id, user_id="john", offset=None) == []
+        events = batch_jobs.job_events.wait(after=0, user_id="john", job_id=job.id, timeout=0)
+        assert [e.status for e in events] == ["created", "queued", "running", "finished"]
+    finally:
+        batch_jobs.scheduler.shutdown()
+
+
+def test_local_batch_jobs_log_page(tmp_path, trace):
+    batch_jobs = LocalBatchJobs(output_root=tmp_path, runner=_test_runner)
+    try:
+        job = batch_jobs.create_job(user_id="john", process={"trace": trace}, api_version="1.0.0")
+        job_dir = batch_jobs.scheduler.job_dir(job.id)
+        job_dir.mkdir()
+        for i in range(5):
+            write_log_entry(job_dir, "error" if i % 2 else "info", "msg {i}".format(i=i))
+        entries, next_offset = batch_jobs.get_log_page(job_id=job.id, user_id="john", limit=2)
+        assert [e["message"] for e in entries] == ["msg 0", "msg 1"]
+        assert next_offset == "1"
+        entries, next_offset = batch_jobs.get_log_page(job_id=job.id, user_id="john", offset="1", level="error")
+        assert [e["message"] for e in entries] == ["msg 3"]
+        assert next_offset is None
+        with pytest.raises(OpenEOApiException):
+            batch_jobs.get_log_page(job_id=job.id, user_id="john", offset="foo")
+    finally:
+        batch_jobs.scheduler.shutdown()
+
+
+@pytest.mark.parametrize("priority", ["high", 1.5, None, [1]])
+def test_local_batch_jobs_invalid_priority(tmp_path, priority):
+    batch_jobs = LocalBatchJobs(output_root=tmp_path, runner=_test_runner)
+    with pytest.raises(OpenEOApiException) as e:
+        batch_jobs.create_job(user_id="john", process={}, api_version="1.0.0", job_options={"priority": priority})
+    assert e.value.status_code == 400
+    # Jobs with invalid priority that were created otherwise can not be started either.
+    job = batch_jobs._job_store.add(user_id="john", metadata=BatchJobMetadata(
+        id="job-1", status="created", process={}, created=datetime.utcnow(), job_options={"priority": priority}
+    ))
+    with pytest.raises(OpenEOApiException) as e:
+        batch_jobs.start_job(job_id=job.id, user_id="john")
+    assert e.value.status_code == 400
+    assert batch_jobs.get_job_info(job_id=job.id, user_id="john").status == "created"
+
+
+def test_local_batch_jobs_log_readers_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(LocalBatchJobs, "_MAX_LOG_READERS", 2)
+    batch_jobs = LocalBatchJobs(output_root=tmp_path, runner=_test_runner)
+    jobs = [batch_jobs.create_job(user_id="john", process={}, api_version="1.0.0") for _ in range(3)]
+    for job in jobs + [jobs[1]]:
+        batch_jobs.get_log_page(job_id=job.id, user_id="john")
+    assert list(batch_jobs._log_readers) == [jobs[2].id, jobs[1].id]
@@ -0,0 +1,114 @@
+from datetime import datetime
+
+import pytest
+
+from openeo_driver.backend import BatchJobMetadata
+from openeo_driver.errors import JobNotFoundException
+from openeo_driver.job_store import JobRecord, JobStore, SqliteJobStore
+
+
+def _job(job_id: str, day: int, status="created") -> BatchJobMetadata:
+    return BatchJobMetadata(
+        id=job_id, status=status, process={"process_graph": {}}, created=datetime(2020, 5, day, 12, 34, 56)
+    )
+
+
+def test_job_record_roundtrip():
+    metadata = _job("job-1", 1)._replace(title="Foo", updated=datetime(2020, 5, 2, 1, 2, 3, 456789))
+    record = JobRecord.from_metadata(user_id="john", metadata=metadata)
+    assert record.key == ("john", "job-1")
+    assert record.to_metadata() == metadata
+    assert JobRecord.from_dict(record.to_dict()).to_metadata() == metadata
+    with pytest.raises(AttributeError):
+        record.foo = "bar"
+
+
+def test_job_store_get():
+    store = JobStore()
+    store.add(user_id="john", metadata=_job("job-1", 1))
+    assert store.get(job_id="job-1", user_id="john") == _job("job-1", 1)
+    with pytest.raises(JobNotFoundException):
+        store.get(job_id="job-2", user_id="john")
+    with pytest.raises(JobNotFoundException):
+        store.get(job_id="job-1", user_id="alice")
+
+
+def test_job_store_get_user_jobs():
+    store = JobStore()
+    for job_id, day in [("job-3", 3), ("job-1", 1), ("job-4", 4), ("job-2", 2)]:
+        store.add(user_id="john", metadata=_job(job_id, day))
+    store.add(user_id="alice", metadata=_job("job-5", 5))
+    assert [j.id for j in store.get_user_jobs("john")] == ["job-1", "job-2", "job-3", "job-4"]
+    assert [j.id for j in store.get_user_jobs("john", limit=2)] == ["job-1", "job-2"]
+    assert [j.id for j in store.get_user_jobs("john", limit=2, offset=3)] == ["job-4"]
+    assert [j.id for j in store.get_user_jobs("alice")] == ["job-5"]
+    assert store.get_user_jobs("bob") == []
+
+    store.remove(job_id="job-2", user_id="john")
+    assert [j.id for j in store.get_user_jobs("john")] == ["job-1", "job-3", "job-4"]
+    assert len(store) == 4
+
+
+def test_job_store_get_many():
+    store = JobStore()
+    for job_id, day in [("job-1", 1), ("job-2", 2), ("job-3", 3)]:
+        store.add(user_id="john", metadata=_job(job_id, day))
+    store.add(user_id="alice", metadata=_job("job-4", 4))
+    jobs = store.get_many(job_ids=["job-3", "job-4", "job-1", "job-9"], user_id="john")
+    assert [j.id for j in jobs] == ["job-3", "job-1"]
+    assert store.get_many(job_ids=[], user_id="john") == []
+
+
+def test_job_store_update_and_status_index():
+    store = JobStore()
+    store.add(user_id="john", metadata=_job("job-1", 1))
+    store.add(user_id="john", metadata=_job("job-2", 2))
+    store.add(user_id="alice", metadata=_job("job-3", 3))
+    assert [(u, j.id) for (u, j) in store.get_jobs_with_status("created")] == [
+        ("john", "job-1"), ("john", "job-2"), ("alice", "job-3")
+    ]
+    updated = store.update(job_id="job-2", user_id="john", status="running", progress=10)
+    assert (updated.status, updated.progress) == ("running", 10)
+    assert store.get(job_id="job-2", user_id="john").status == "running"
+    assert [j.id for (_, j) in store.get_jobs_with_status("created")] == ["job-1", "job-3"]
+    assert [j.id for (_, j) in store.get_jobs_with_status("running")] == ["job-2"]
+    with pytest.raises(ValueError):
+        store.update(job_id="job-2", user_id="john", created=datetime(2020, 1, 1))
+    with pytest.raises(JobNotFoundException):
+        store.update(job_id="job-2", user_id="alice", status="finished")
+
+
+def test_job_store_listener():
+    store = JobStore()
+    changes = []
+    store.add_listener(lambda user_id, job: changes.append((user_id, job.id, job.status, job.progress)))
+    store.add_listener(lambda user_id, job: 1 / 0)
+    store.add(user_id="john", metadata=_job("job-1", 1))
+    store.update(job_id="job-1", user_id="john", status="running")
+    store.update(job_id="job-1", user_id="john", status="running", updated=datetime(2020, 5, 2))
+    store.update(job_id="job-1", user_id="john", progress=50)
+    store.update(job_id="job-1", user_id="john", status="finished", progress=100)
+    assert changes == [
+        ("john", "job-1", "created", None),
+        ("john", "job-1", "running", None),
+        ("john", "job-1", "running", 50),
+        ("john", "job-1", "finished", 100),
+    ]
+
+
+def test_sqlite_job_store_persistence(tmp_path):
+    path = tmp_path / "jobs.db"
+    store = SqliteJobStore(path)
+    store.add(user_id="john", metadata=_job("job-1", 1))
+    store.add(user_id="john", metadata=_job("job-2", 2))
+    store.add(user_id="alice", metadata=_job("job-3", 3))
+    store.update(job_id="job-1", user_id="john", status="finished")
+    store.remove(job_id="job-3", user_id="alice")
+    store.close()
+
+    store = SqliteJobStore(path)
+    assert len(store) == 2
+    assert [j.id for j in store.get_user_jobs("john")] == ["job-1", "job-2"]
+    assert store.get(job_id="job-1", user_id="john") == _job("job-1", 1, status="finished")
+    assert store.get_user_jobs("alice") == []
+    assert [j.id for (_, j) in store.get_jobs_with_status("finished")] == ["job-1"]
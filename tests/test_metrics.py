@@ -0,0 +1,44 @@
+import pytest
+
+from openeo_driver import metrics
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+
+def _sample(name: str, **labels) -> float:
+    return metrics._registry.get_sample_value(name, labels) or 0
+
+
+def test_time_process():
+    before = _sample("openeo_processes_executed_total", process="test_foo")
+    with metrics.time_process("test_foo"):
+        pass
+    assert _sample("openeo_processes_executed_total", process="test_foo") == before + 1
+    assert _sample("openeo_process_duration_seconds_total", process="test_foo") > 0
+
+
+def test_time_process_failure():
+    with pytest.raises(ValueError):
+        with metrics.time_process("test_fail"):
+            raise ValueError
+    assert _sample("openeo_processes_executed_total", process="test_fail") == 0
+
+
+def test_record_lookups():
+    metrics.record_cache_lookup("test_cache", hit=True)
+    metrics.record_cache_lookup("test_cache", hit=False)
+    metrics.record_cache_lookup("test_cache", hit=False)
+    assert _sample("openeo_cache_requests_total", cache="test_cache", result="hit") == 1
+    assert _sample("openeo_cache_requests_total", cache="test_cache", result="miss") == 2
+    metrics.record_auth_lookup("test_auth", success=False)
+    assert _sample("openeo_auth_lookups_total", method="test_auth", result="failure") == 1
+
+
+def test_generate_latest_multiprocess(tmp_path, monkeypatch):
+    data, content_type = metrics.generate_latest()
+    assert content_type.startswith("text/plain")
+    assert b"openeo_http_requests_total" in data
+    # Multiprocess mode: aggregate from (here: empty) directory
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    data, content_type = metrics.generate_latest()
+    assert b"openeo_http_requests_total" not in data
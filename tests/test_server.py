@@ -0,0 +1,76 @@
+import pytest
+
+from openeo_driver.server import number_of_workers, build_options, WORKER_MEMORY_ESTIMATE
+
+
+@pytest.mark.parametrize(["cores", "memory", "expected"], [
+    (1, None, 3),
+    (4, None, 9),
+    (4, 64 * WORKER_MEMORY_ESTIMATE, 9),
+    (4, 5 * WORKER_MEMORY_ESTIMATE, 5),
+    (4, WORKER_MEMORY_ESTIMATE // 2, 1),
+])
+def test_number_of_workers(cores, memory, expected):
+    assert number_of_workers(cores=cores, memory=memory) == expected
+
+
+def test_build_options_defaults(monkeypatch):
+    monkeypatch.setattr("openeo_driver.server.cpu_count", lambda: 2)
+    monkeypatch.setattr("openeo_driver.server.available_memory", lambda: None)
+    options = build_options([])
+    assert options == {
+        "bind": "127.0.0.1:8080",
+        "workers": 5,
+        "worker_class": "gthread",
+        "threads": 4,
+        "keepalive": 5,
+        "max_requests": 0,
+        "max_requests_jitter": 100,
+        "timeout": 1000,
+        "graceful_timeout": 30,
+        "preload_app": True,
+    }
+
+
+def test_build_options_cli():
+    options = build_options([
+        "--bind", "0.0.0.0:80", "--workers", "3", "--worker-class", "gevent", "--threads", "50",
+        "--max-requests", "500", "--no-preload",
+    ])
+    assert options["bind"] == "0.0.0.0:80"
+    assert options["workers"] == 3
+    assert options["worker_class"] == "gevent"
+    assert options["worker_connections"] == 50
+    assert "threads" not in options
+    assert options["max_requests"] == 500
+    assert options["preload_app"] is False
+
+
+def test_build_options_env(monkeypatch):
+    monkeypatch.setenv("OPENEO_SERVER_WORKERS", "7")
+    monkeypatch.setenv("OPENEO_SERVER_THREADS", "8")
+    monkeypatch.setenv("OPENEO_SERVER_KEEPALIVE", "10")
+    monkeypatch.setenv("OPENEO_SERVER_WORKER_CLASS", "sync")
+    options = build_options([])
+    assert options["workers"] == 7
+    assert options["worker_class"] == "sync"
+    assert options["keepalive"] == 10
+    assert "threads" not in options
+
+    # Command line arguments take precedence
+    options = build_options(["--workers", "2", "--worker-class", "gthread"])
+    assert options["workers"] == 2
+    assert options["threads"] == 8
+
+
+@pytest.mark.parametrize(["value", "expected"], [
+    ("1", False),
+    ("true", False),
+    ("Yes", False),
+    ("0", True),
+    ("false", True),
+    ("", True),
+])
+def test_build_options_env_no_preload(monkeypatch, value, expected):
+    monkeypatch.setenv("OPENEO_SERVER_NO_PRELOAD", value)
+    assert build_options([])["preload_app"] is expected
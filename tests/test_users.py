@@ -1,8 +1,9 @@
 import base64
 import json
+from unittest import mock
 
 import pytest
-from flask import Flask, jsonify, Response, request
+from flask import Flask, jsonify, Response, request, g
 
 from openeo_driver.errors import OpenEOApiException
 from openeo_driver.users import HttpAuthHandler, User
@@ -198,3 +199,17 @@ def test_bearer_auth_oidc_success(app, url, expected_data, requests_mock):
         resp = client.get(url, headers=headers)
         assert resp.status_code == 200
         assert resp.data == expected_data
+
+
+def test_bearer_auth_reuses_resolved_user(app):
+    @app.before_request
+    def resolve_user():
+        # E.g. admission control resolves the user before the request handler.
+        g.optional_user = User(user_id="resolved", info={})
+
+    with app.test_client() as client, \
+            mock.patch.object(HttpAuthHandler, "get_user_from_bearer_token") as get_user:
+        resp = client.get("/personal/hello", headers={"Authorization": "Bearer basic.blehrff"})
+    assert resp.status_code == 200
+    assert resp.data == b"hello resolved"
+    assert not get_user.called
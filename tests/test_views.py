@@ -1,9 +1,14 @@
 from contextlib import contextmanager
 from datetime import datetime
+import gzip
+import hashlib
+import json
 import logging
 import os
 from pathlib import Path
 import re
+import threading
+import time
 from unittest import TestCase, mock
 
 import flask
@@ -11,12 +16,17 @@ from flask.testing import FlaskClient
 import pytest
 
 from openeo.capabilities import ComparableVersion
-from openeo_driver.backend import BatchJobMetadata
+import openeo_driver.backend
+from openeo_driver.backend import BatchJobMetadata, CollectionCatalog, ReloadableCollectionCatalog
 from openeo_driver.dummy import dummy_backend
+from openeo_driver.job_results import write_checksums
+from openeo_driver.job_store import JobStore
 import openeo_driver.testing
+import openeo_driver.views
 from openeo_driver.testing import TEST_USER, ApiResponse
 from openeo_driver.users import HttpAuthHandler
-from openeo_driver.views import app, EndpointRegistry, build_backend_deploy_metadata, _normalize_collection_metadata
+from openeo_driver.views import app, EndpointRegistry, build_backend_deploy_metadata, _normalize_collection_metadata, \
+    CollectionMetadataCache, preload_capabilities, create_app, preload, post_fork, _get_page
 from .data import TEST_DATA_ROOT
 from .test_users import _build_basic_auth_header
 
@@ -91,6 +101,57 @@ class TestGeneral:
         assert capabilities["id"] == "openeotestapi-1.0.0"
         assert capabilities["production"] is False
 
+    def test_capabilities_etag(self, api100):
+        resp = api100.get('/').assert_status_code(200)
+        etag = resp.headers["ETag"]
+        resp = api100.get('/', headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    def test_capabilities_gzip(self, api100):
+        plain = api100.get('/').assert_status_code(200)
+        resp = api100.get('/', headers={"Accept-Encoding": "gzip"}).assert_status_code(200)
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in resp.headers["Vary"]
+        assert json.loads(gzip.decompress(resp.data)) == plain.json
+        etag = resp.headers["ETag"]
+        assert etag == "W/" + plain.headers["ETag"]
+        resp = api100.get('/', headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert resp.status_code == 304
+        assert "Content-Encoding" not in resp.headers
+
+    def test_compression_disabled(self, api100):
+        app.config["OPENEO_COMPRESSION"] = False
+        try:
+            resp = api100.get('/', headers={"Accept-Encoding": "gzip"}).assert_status_code(200)
+        finally:
+            del app.config["OPENEO_COMPRESSION"]
+        assert "Content-Encoding" not in resp.headers
+        assert resp.json["api_version"] == "1.0.0"
+
+    def test_capabilities_cached(self, api100):
+        with mock.patch("openeo_driver.views.build_backend_deploy_metadata") as build:
+            build.return_value = {"versions": {"openeo": "1.2.3"}}
+            openeo_driver.views.get_backend_deploy_metadata.cache_clear()
+            openeo_driver.views._capabilities_documents.clear()
+            for _ in range(3):
+                assert api100.get('/').assert_status_code(200).json["title"] == "OpenEO Test API"
+            # Config changes are taken into account
+            app.config["OPENEO_TITLE"] = "Changed Title"
+            try:
+                assert api100.get('/').assert_status_code(200).json["title"] == "Changed Title"
+            finally:
+                app.config["OPENEO_TITLE"] = "OpenEO Test API"
+            capabilities = api100.get('/').assert_status_code(200).json
+            assert capabilities["_backend_deploy_metadata"] == {"versions": {"openeo": "1.2.3"}}
+        assert build.call_count == 1
+        openeo_driver.views.get_backend_deploy_metadata.cache_clear()
+        openeo_driver.views._capabilities_documents.clear()
+
+    def test_preload_capabilities(self):
+        openeo_driver.views._capabilities_documents.clear()
+        preload_capabilities(app)
+        assert sorted(k[0] for k in openeo_driver.views._capabilities_documents) == ["0.4.0", "0.4.1", "0.4.2", "1.0.0"]
+
     def test_capabilities_version_alias(self, client):
         resp = ApiResponse(client.get('/openeo/0.4/')).assert_status_code(200).json
         assert resp["api_version"] == "0.4.2"
@@ -121,6 +182,9 @@ class TestGeneral:
         assert endpoints["/credentials/basic"] == ["GET"]
         assert endpoints["/credentials/oidc"] == ["GET"]
         assert endpoints["/me"] == ["GET"]
+        # Job event streams are not part of the openEO API
+        assert "/jobs/events" not in endpoints
+        assert "/jobs/{job_id}/events" not in endpoints
 
     def test_capabilities_endpoints_issue_28_v040(self, api040):
         """https://github.com/Open-EO/openeo-python-driver/issues/28"""
@@ -140,6 +204,54 @@ class TestGeneral:
         resp = api.get('/health').assert_status_code(200).json
         assert resp == {"health": "OK"}
 
+    def test_metrics(self, api, client):
+        pytest.importorskip("prometheus_client")
+        from openeo_driver import metrics
+
+        def sample(name, **labels):
+            return metrics._registry.get_sample_value(name, labels) or 0
+
+        health_ok = dict(endpoint="openeo.health", api_version=api.api_version, method="GET", status="200")
+        not_found = dict(endpoint="openeo.collection_by_id", api_version=api.api_version, method="GET", status="404")
+        before = sample("openeo_http_requests_total", **health_ok), sample("openeo_http_requests_total", **not_found)
+        api.get('/health').assert_status_code(200)
+        api.get('/collections/FOOBAR').assert_status_code(404)
+        assert sample("openeo_http_requests_total", **health_ok) == before[0] + 1
+        assert sample("openeo_http_requests_total", **not_found) == before[1] + 1
+        assert sample(
+            "openeo_http_request_duration_seconds_count", endpoint="openeo.health", api_version=api.api_version
+        ) > 0
+
+        resp = client.get('/metrics')
+        assert resp.status_code == 200
+        assert resp.content_type.startswith("text/plain")
+        text = resp.get_data(as_text=True)
+        assert "openeo_http_requests_total" in text
+        assert 'openeo_http_requests_in_flight{endpoint="prometheus_metrics"} 1.0' in text
+
+    def test_request_id(self, api):
+        resp = api.get('/health').assert_status_code(200)
+        assert re.match(r"^[0-9a-f-]{36}$", resp.headers["X-Request-Id"])
+        resp = api.get('/health', headers={"X-Request-Id": "req-123"}).assert_status_code(200)
+        assert resp.headers["X-Request-Id"] == "req-123"
+        resp = api.get('/health', headers={"X-Request-Id": "req 123 <script>"}).assert_status_code(200)
+        assert resp.headers["X-Request-Id"] != "req 123 <script>"
+
+    def test_request_id_error_correlation(self, api):
+        resp = api.get('/collections/FOOBAR', headers={"X-Request-Id": "req-456"})
+        resp.assert_error(404, "CollectionNotFound")
+        assert resp.json["id"] == "req-456"
+        assert resp.headers["X-Request-Id"] == "req-456"
+
+    def test_request_logging(self, api, caplog):
+        caplog.set_level(logging.DEBUG, logger="openeo_driver.views")
+        api.post("/result", json={"foo": "small"})
+        api.post("/result", json={"foo": "large" * 1000})
+        messages = [r.getMessage() for r in caplog.records if r.name == "openeo_driver.views"]
+        assert any(re.match(r"Handling POST .*/result \(request id .*, content length 16\)", m) for m in messages)
+        assert any(re.match(r"Request .* body: b'{\"foo\": \"small\"}'", m) for m in messages)
+        assert not any("largelarge" in m for m in messages)
+
     def test_output_formats(self, api040):
         resp = api040.get('/output_formats').assert_status_code(200).json
         assert resp == {"GTiff": {"title": "GeoTiff", "gis_data_types": ["raster"]}, }
@@ -162,6 +274,15 @@ class TestGeneral:
         for process in processes:
             assert all(k in process for k in expected_keys)
 
+    def test_processes_etag_and_compression(self, api):
+        plain = api.get('/processes').assert_status_code(200)
+        etag = plain.headers["ETag"]
+        assert api.get('/processes', headers={"If-None-Match": etag}).status_code == 304
+        resp = api.get('/processes', headers={"Accept-Encoding": "gzip"}).assert_status_code(200)
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(resp.data)) == plain.json
+        assert len(resp.data) < len(plain.data) / 4
+
     def test_processes_non_standard_histogram(self, api):
         resp = api.get('/processes').assert_status_code(200).json
         histogram_spec, = [p for p in resp["processes"] if p['id'] == "histogram"]
@@ -375,6 +496,95 @@ class TestCollections:
             assert collection['properties']['cube:dimensions'] == cube_dimensions
             assert collection['properties']["eo:bands"] == eo_bands
 
+    @pytest.mark.parametrize("path", ["/collections", "/collections/S2_FOOBAR"])
+    def test_collections_etag(self, api, path):
+        resp = api.get(path).assert_status_code(200)
+        etag = resp.headers["ETag"]
+        assert etag
+        resp = api.get(path, headers={"If-None-Match": etag}).assert_status_code(304)
+        assert resp.data == b""
+        resp = api.get(path, headers={"If-None-Match": '"0ther"'}).assert_status_code(200)
+        assert resp.headers["ETag"] == etag
+
+    def test_collections_hot_reload(self, api, tmp_path, monkeypatch):
+        (tmp_path / "s2.json").write_text(json.dumps({"id": "S2", "description": "Sentinel 2"}))
+        catalog = ReloadableCollectionCatalog(tmp_path, check_interval=0)
+        monkeypatch.setattr(openeo_driver.backend.get_backend_implementation(), "catalog", catalog)
+        assert [c["id"] for c in api.get("/collections").assert_status_code(200).json["collections"]] == ["S2"]
+        api.get("/collections/S2").assert_status_code(200)
+
+        (tmp_path / "s2.json").write_text(json.dumps({"id": "S2", "description": "Sentinel 2 L2A"}))
+        (tmp_path / "ndvi.json").write_text(json.dumps({"id": "NDVI", "description": "NDVI"}))
+        # Requests trigger a background reload: eventually the changes should show up.
+        for _ in range(100):
+            collections = api.get("/collections").assert_status_code(200).json["collections"]
+            if len(collections) == 2:
+                break
+            time.sleep(0.02)
+        assert sorted(c["id"] for c in collections) == ["NDVI", "S2"]
+        assert api.get("/collections/S2").assert_status_code(200).json["description"] == "Sentinel 2 L2A"
+        assert catalog.version >= 2
+
+    @pytest.mark.parametrize(["args", "expected"], [
+        ("bbox=3,50,4,51", ["S2_FAPAR_CLOUDCOVER", "S2_FOOBAR", "PROBAV_L3_S10_TOC_NDVI_333M_V2"]),
+        ("bbox=10,10,20,20", ["S2_FAPAR_CLOUDCOVER", "PROBAV_L3_S10_TOC_NDVI_333M_V2"]),
+        ("datetime=2019-03-01/..", ["S2_FOOBAR", "PROBAV_L3_S10_TOC_NDVI_333M_V2"]),
+        ("datetime=2019-01-15", ["S2_FAPAR_CLOUDCOVER", "S2_FOOBAR", "PROBAV_L3_S10_TOC_NDVI_333M_V2"]),
+        ("q=nir", ["S2_FOOBAR"]),
+        ("q=nir,B02&bbox=10,10,20,20", []),
+    ])
+    def test_collections_search(self, api, args, expected):
+        resp = api.get('/collections?' + args).assert_status_code(200).json
+        assert [c["id"] for c in resp["collections"]] == expected
+        for collection in resp['collections']:
+            assert 'stac_version' in collection
+            assert 'cube:dimensions' not in collection
+
+    def test_collections_paginated(self, api100):
+        resp = api100.get('/collections?limit=2').assert_status_code(200).json
+        assert [c["id"] for c in resp["collections"]] == ["S2_FAPAR_CLOUDCOVER", "S2_FOOBAR"]
+        assert resp["links"] == [{"rel": "next", "href": "http://oeo.net/openeo/1.0.0/collections?limit=2&offset=2"}]
+        resp = api100.get('/collections?limit=2&offset=2').assert_status_code(200).json
+        assert [c["id"] for c in resp["collections"]] == ["PROBAV_L3_S10_TOC_NDVI_333M_V2"]
+        assert resp["links"] == []
+
+    def test_collections_search_paginated(self, api100):
+        resp = api100.get('/collections?bbox=10,10,20,20&limit=1').assert_status_code(200).json
+        assert [c["id"] for c in resp["collections"]] == ["S2_FAPAR_CLOUDCOVER"]
+        assert resp["links"] == [{
+            "rel": "next", "href": "http://oeo.net/openeo/1.0.0/collections?bbox=10%2C10%2C20%2C20&limit=1&offset=1"
+        }]
+        resp = api100.get('/collections?bbox=10,10,20,20&limit=1&offset=1').assert_status_code(200).json
+        assert [c["id"] for c in resp["collections"]] == ["PROBAV_L3_S10_TOC_NDVI_333M_V2"]
+        assert resp["links"] == []
+
+    @pytest.mark.parametrize("args", [
+        "bbox=1,2,3", "bbox=a,b,c,d", "bbox=nan,nan,nan,nan", "bbox=-inf,0,inf,1", "bbox=4,50,3,51", "bbox=3,51,4,50",
+        "datetime=yesterday",
+    ])
+    def test_collections_search_invalid(self, api, args):
+        api.get('/collections?' + args).assert_error(400, "ParameterInvalid")
+
+    def test_collection_metadata_cache(self):
+        catalog = CollectionCatalog([{"id": "S2", "description": "Sentinel 2"}])
+        cache = CollectionMetadataCache()
+        api_version = ComparableVersion("1.0.0")
+        with app.app_context():
+            doc1 = cache.get_collection(catalog, "S2", api_version=api_version, full=True)
+            assert doc1.data["description"] == "Sentinel 2"
+            assert cache.get_collection(catalog, "S2", api_version=api_version, full=True) is doc1
+            assert cache.get_collection(catalog, "S2", api_version=api_version, full=False) is not doc1
+            listing = cache.get_listing(catalog, api_version=api_version)
+            assert [c["id"] for c in listing.data["collections"]] == ["S2"]
+
+            # Catalog change should invalidate cache
+            catalog._catalog["S2"] = {"id": "S2", "description": "Sentinel 2 L2A"}
+            catalog._version += 1
+            doc2 = cache.get_collection(catalog, "S2", api_version=api_version, full=True)
+            assert doc2.data["description"] == "Sentinel 2 L2A"
+            assert doc2.etag != doc1.etag
+            assert cache.get_listing(catalog, api_version=api_version) is not listing
+
 
 class TestBatchJobs:
     AUTH_HEADER = {
@@ -385,15 +595,15 @@ class TestBatchJobs:
     @contextmanager
     def _fresh_job_registry(next_job_id):
         """Set up a fresh job registry and predefine next job id"""
+        openeo_driver.views._job_results_cache.clear()
         with mock.patch.object(dummy_backend.DummyBatchJobs, 'generate_job_id', return_value=next_job_id):
-            dummy_backend.DummyBatchJobs._job_registry = {
-                (TEST_USER, '07024ee9-7847-4b8a-b260-6c879a2b3cdc'): BatchJobMetadata(
-                    id='07024ee9-7847-4b8a-b260-6c879a2b3cdc',
-                    status='running',
-                    process={'process_graph': {'foo': {'process_id': 'foo', 'arguments': {}}}},
-                    created=datetime(2017, 1, 1, 9, 32, 12),
-                )
-            }
+            dummy_backend.DummyBatchJobs._job_registry = JobStore()
+            dummy_backend.DummyBatchJobs._job_registry.add(user_id=TEST_USER, metadata=BatchJobMetadata(
+                id='07024ee9-7847-4b8a-b260-6c879a2b3cdc',
+                status='running',
+                process={'process_graph': {'foo': {'process_id': 'foo', 'arguments': {}}}},
+                created=datetime(2017, 1, 1, 9, 32, 12),
+            ))
             yield
 
     def test_create_job_040(self, api040):
@@ -404,7 +614,7 @@ class TestBatchJobs:
             }).assert_status_code(201)
         assert resp.headers['Location'] == 'http://oeo.net/openeo/0.4.0/jobs/job-220'
         assert resp.headers['OpenEO-Identifier'] == 'job-220'
-        job_info = dummy_backend.DummyBatchJobs._job_registry[TEST_USER, 'job-220']
+        job_info = dummy_backend.DummyBatchJobs._job_registry.get(job_id='job-220', user_id=TEST_USER)
         assert job_info.id == "job-220"
         assert job_info.process == {"process_graph": {"foo": {"process_id": "foo", "arguments": {}}}}
         assert job_info.status == "created"
@@ -420,7 +630,7 @@ class TestBatchJobs:
             }).assert_status_code(201)
         assert resp.headers['Location'] == 'http://oeo.net/openeo/0.4.0/jobs/job-230'
         assert resp.headers['OpenEO-Identifier'] == 'job-230'
-        job_info = dummy_backend.DummyBatchJobs._job_registry[TEST_USER, 'job-230']
+        job_info = dummy_backend.DummyBatchJobs._job_registry.get(job_id='job-230', user_id=TEST_USER)
         assert job_info.job_options == {"driver-memory": "3g", "executor-memory": "5g"}
 
     def test_create_job_100(self, api100):
@@ -433,7 +643,7 @@ class TestBatchJobs:
             }).assert_status_code(201)
         assert resp.headers['Location'] == 'http://oeo.net/openeo/1.0.0/jobs/job-245'
         assert resp.headers['OpenEO-Identifier'] == 'job-245'
-        job_info = dummy_backend.DummyBatchJobs._job_registry[TEST_USER, 'job-245']
+        job_info = dummy_backend.DummyBatchJobs._job_registry.get(job_id='job-245', user_id=TEST_USER)
         assert job_info.id == "job-245"
         assert job_info.process == {"process_graph": {"foo": {"process_id": "foo", "arguments": {}}}}
         assert job_info.status == "created"
@@ -451,7 +661,7 @@ class TestBatchJobs:
             }).assert_status_code(201)
         assert resp.headers['Location'] == 'http://oeo.net/openeo/1.0.0/jobs/job-256'
         assert resp.headers['OpenEO-Identifier'] == 'job-256'
-        job_info = dummy_backend.DummyBatchJobs._job_registry[TEST_USER, 'job-256']
+        job_info = dummy_backend.DummyBatchJobs._job_registry.get(job_id='job-256', user_id=TEST_USER)
         assert job_info.job_options == {"driver-memory": "3g", "executor-memory": "5g"}
 
     def test_start_job(self, api):
@@ -459,9 +669,10 @@ class TestBatchJobs:
             api.post('/jobs', headers=self.AUTH_HEADER, json=api.get_process_graph_dict(
                 {"foo": {"process_id": "foo", "arguments": {}}},
             )).assert_status_code(201)
-            assert dummy_backend.DummyBatchJobs._job_registry[TEST_USER, 'job-267'].status == "created"
+            job_registry = dummy_backend.DummyBatchJobs._job_registry
+            assert job_registry.get(job_id='job-267', user_id=TEST_USER).status == "created"
             api.post('/jobs/job-267/results', headers=self.AUTH_HEADER, json={}).assert_status_code(202)
-            assert dummy_backend.DummyBatchJobs._job_registry[TEST_USER, 'job-267'].status == "running"
+            assert job_registry.get(job_id='job-267', user_id=TEST_USER).status == "running"
 
     def test_start_job_invalid(self, api):
         resp = api.post('/jobs/deadbeef-f00/results', headers=self.AUTH_HEADER)
@@ -518,6 +729,91 @@ class TestBatchJobs:
             "links": []
         }
 
+    def test_list_user_jobs_paginated(self, api100):
+        with self._fresh_job_registry(next_job_id="job-340"):
+            for d in range(2, 5):
+                job_id = "job-34{d}".format(d=d)
+                dummy_backend.DummyBatchJobs._job_registry.add(user_id=TEST_USER, metadata=BatchJobMetadata(
+                    id=job_id, status='created', process={}, created=datetime(2017, 1, d, 9, 32, 12),
+                ))
+            resp = api100.get('/jobs?limit=3', headers=self.AUTH_HEADER).assert_status_code(200).json
+            assert [j["id"] for j in resp["jobs"]] == ['07024ee9-7847-4b8a-b260-6c879a2b3cdc', 'job-342', 'job-343']
+            assert resp["links"] == [
+                {"rel": "next", "href": "http://oeo.net/openeo/1.0.0/jobs?limit=3&offset=3"}
+            ]
+            resp = api100.get('/jobs?limit=3&offset=3', headers=self.AUTH_HEADER).assert_status_code(200).json
+            assert [j["id"] for j in resp["jobs"]] == ['job-344']
+            assert resp["links"] == []
+
+    def test_list_user_jobs_paginated_query_arg_like_view_arg(self, api100):
+        with self._fresh_job_registry(next_job_id="job-340"):
+            for d in range(2, 5):
+                job_id = "job-34{d}".format(d=d)
+                dummy_backend.DummyBatchJobs._job_registry.add(user_id=TEST_USER, metadata=BatchJobMetadata(
+                    id=job_id, status='created', process={}, created=datetime(2017, 1, d, 9, 32, 12),
+                ))
+            resp = api100.get('/jobs?limit=3&version=0.4.0', headers=self.AUTH_HEADER).assert_status_code(200).json
+            assert resp["links"] == [
+                {"rel": "next", "href": "http://oeo.net/openeo/1.0.0/jobs?limit=3&offset=3"}
+            ]
+
+    def test_list_user_jobs_paginated_legacy_signature(self, api100):
+        """Backend implementation with `get_user_jobs` without pagination support."""
+        with self._fresh_job_registry(next_job_id="job-340"):
+            for d in range(2, 5):
+                job_id = "job-34{d}".format(d=d)
+                dummy_backend.DummyBatchJobs._job_registry.add(user_id=TEST_USER, metadata=BatchJobMetadata(
+                    id=job_id, status='created', process={}, created=datetime(2017, 1, d, 9, 32, 12),
+                ))
+            original = dummy_backend.DummyBatchJobs.get_user_jobs
+
+            def get_user_jobs(self, user_id):
+                return original(self, user_id)
+
+            with mock.patch.object(dummy_backend.DummyBatchJobs, "get_user_jobs", get_user_jobs):
+                resp = api100.get('/jobs?limit=3', headers=self.AUTH_HEADER).assert_status_code(200).json
+                assert [j["id"] for j in resp["jobs"]] == [
+                    '07024ee9-7847-4b8a-b260-6c879a2b3cdc', 'job-342', 'job-343'
+                ]
+                assert resp["links"] == [
+                    {"rel": "next", "href": "http://oeo.net/openeo/1.0.0/jobs?limit=3&offset=3"}
+                ]
+                resp = api100.get('/jobs?limit=3&offset=3', headers=self.AUTH_HEADER).assert_status_code(200).json
+                assert [j["id"] for j in resp["jobs"]] == ['job-344']
+                assert resp["links"] == []
+
+    def test_list_jobs_by_id(self, api100):
+        with self._fresh_job_registry(next_job_id="job-341"):
+            for d in range(2, 5):
+                dummy_backend.DummyBatchJobs._job_registry.add(user_id=TEST_USER, metadata=BatchJobMetadata(
+                    id="job-34{d}".format(d=d), status='running', process={}, progress=10 * d,
+                    created=datetime(2017, 1, d, 9, 32, 12),
+                ))
+            dummy_backend.DummyBatchJobs._job_registry.add(user_id="someone", metadata=BatchJobMetadata(
+                id="job-345", status='running', process={}, created=datetime(2017, 1, 5, 9, 32, 12),
+            ))
+            with mock.patch.object(
+                    dummy_backend.DummyBatchJobs, "get_job_info", side_effect=AssertionError("no single lookups")
+            ):
+                resp = api100.get(
+                    '/jobs?ids=job-344,job-342,job-999&ids=job-345,job-344', headers=self.AUTH_HEADER
+                ).assert_status_code(200).json
+        assert resp == {
+            "jobs": [
+                {"id": "job-344", "status": "running", "progress": 40, "created": "2017-01-04T09:32:12Z"},
+                {"id": "job-342", "status": "running", "progress": 20, "created": "2017-01-02T09:32:12Z"},
+            ],
+            "links": [],
+        }
+
+    def test_list_jobs_by_id_too_many(self, api):
+        ids = ",".join("job-{i}".format(i=i) for i in range(101))
+        api.get('/jobs?ids=' + ids, headers=self.AUTH_HEADER).assert_error(400, "ParameterInvalid")
+
+    @pytest.mark.parametrize("args", ["limit=0", "limit=foo", "offset=-1"])
+    def test_list_user_jobs_invalid_pagination(self, api, args):
+        api.get('/jobs?' + args, headers=self.AUTH_HEADER).assert_error(400, "ParameterInvalid")
+
     def test_get_job_results_unfinished(self, api):
         with self._fresh_job_registry(next_job_id="job-345"):
             resp = api.get('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results', headers=self.AUTH_HEADER)
@@ -542,16 +838,73 @@ class TestBatchJobs:
                 job_id="07024ee9-7847-4b8a-b260-6c879a2b3cdc", user_id=TEST_USER, status="finished")
             resp = api100.get('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results', headers=self.AUTH_HEADER)
         assert resp.assert_status_code(200).json == {
+            "stac_version": "0.9.0",
+            "stac_extensions": ["file"],
+            "id": "07024ee9-7847-4b8a-b260-6c879a2b3cdc",
+            "type": "Feature",
+            "geometry": None,
+            "properties": {"datetime": None},
             "assets": {
                 "output.tiff": {
-                    "href": "http://oeo.net/openeo/1.0.0/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results/output.tiff"
+                    "href": "http://oeo.net/openeo/1.0.0/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results/output.tiff",
+                    "type": "image/tiff",
                 }
+            },
+            "links": [],
+        }
+
+    def test_get_job_results_manifest_cached(self, api100, tmp_path):
+        output_root = Path(tmp_path)
+        output = output_root / "07024ee9-7847-4b8a-b260-6c879a2b3cdc" / "out" / "output.tiff"
+        output.parent.mkdir(parents=True)
+        with output.open("wb") as f:
+            f.write(b"tiffdata")
+        write_checksums(output.parent, ["output.tiff"])
+        with self._fresh_job_registry(next_job_id="job-363"), \
+                mock.patch.object(dummy_backend.DummyBatchJobs, '_output_root', return_value=output_root):
+            dummy_backend.DummyBatchJobs._update_status(
+                job_id="07024ee9-7847-4b8a-b260-6c879a2b3cdc", user_id=TEST_USER, status="finished")
+            with mock.patch.object(
+                    dummy_backend.DummyBatchJobs, 'get_results', wraps=dummy_backend.DummyBatchJobs().get_results
+            ) as get_results:
+                resp = api100.get('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results', headers=self.AUTH_HEADER)
+                for _ in range(3):
+                    download = api100.get(
+                        "/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results/output.tiff", headers=self.AUTH_HEADER
+                    )
+                    assert download.assert_status_code(200).data == b"tiffdata"
+                assert get_results.call_count == 1
+        assert resp.assert_status_code(200).json["assets"] == {
+            "output.tiff": {
+                "href": "http://oeo.net/openeo/1.0.0/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results/output.tiff",
+                "type": "image/tiff",
+                "file:size": 8,
+                "file:checksum": "1220" + hashlib.sha256(b"tiffdata").hexdigest(),
             }
         }
 
+    def test_get_job_results_no_checksums_sidecar(self, api100, tmp_path):
+        output_root = Path(tmp_path)
+        output = output_root / "07024ee9-7847-4b8a-b260-6c879a2b3cdc" / "out" / "output.tiff"
+        output.parent.mkdir(parents=True)
+        output.write_bytes(b"tiffdata")
+        with self._fresh_job_registry(next_job_id="job-364"), \
+                mock.patch.object(dummy_backend.DummyBatchJobs, '_output_root', return_value=output_root), \
+                mock.patch("openeo_driver.job_results.file_checksum") as file_checksum:
+            dummy_backend.DummyBatchJobs._update_status(
+                job_id="07024ee9-7847-4b8a-b260-6c879a2b3cdc", user_id=TEST_USER, status="finished")
+            resp = api100.get('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results', headers=self.AUTH_HEADER)
+        assert resp.assert_status_code(200).json["assets"]["output.tiff"]["file:size"] == 8
+        assert "file:checksum" not in resp.json["assets"]["output.tiff"]
+        assert not file_checksum.called
+
     def test_get_job_results_invalid_job(self, api):
         api.get('/jobs/deadbeef-f00/results', headers=self.AUTH_HEADER).assert_error(404, "JobNotFound")
 
+    @pytest.fixture(autouse=True)
+    def _clear_job_results_cache(self):
+        openeo_driver.views._job_results_cache.clear()
+
     def test_download_result_invalid_job(self, api):
         api.get('/jobs/deadbeef-f00/results/some_file', headers=self.AUTH_HEADER).assert_error(404, "JobNotFound")
 
@@ -565,6 +918,32 @@ class TestBatchJobs:
             resp = api.get("/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results/output.tiff", headers=self.AUTH_HEADER)
         assert resp.assert_status_code(200).data == b"tiffdata"
 
+    def test_download_result_no_checksum(self, api, tmp_path):
+        output_root = Path(tmp_path)
+        with mock.patch.object(dummy_backend.DummyBatchJobs, '_output_root', return_value=output_root), \
+                mock.patch("openeo_driver.job_results.file_checksum") as file_checksum:
+            output = output_root / "07024ee9-7847-4b8a-b260-6c879a2b3cdc" / "out" / "output.tiff"
+            output.parent.mkdir(parents=True)
+            output.write_bytes(b"tiffdata")
+            resp = api.get("/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results/output.tiff", headers=self.AUTH_HEADER)
+        assert resp.assert_status_code(200).data == b"tiffdata"
+        assert not file_checksum.called
+
+    def test_download_result_range(self, api, tmp_path):
+        output_root = Path(tmp_path)
+        with mock.patch.object(dummy_backend.DummyBatchJobs, '_output_root', return_value=output_root):
+            output = output_root / "07024ee9-7847-4b8a-b260-6c879a2b3cdc" / "out" / "output.tiff"
+            output.parent.mkdir(parents=True)
+            with output.open("wb") as f:
+                f.write(b"tiffdata")
+            path = "/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results/output.tiff"
+            resp = api.get(path, headers=dict(self.AUTH_HEADER, Range="bytes=4-"))
+            assert resp.assert_status_code(206).data == b"data"
+            assert resp.headers["Content-Range"] == "bytes 4-7/8"
+            etag = resp.headers["ETag"]
+            resp = api.get(path, headers=dict(self.AUTH_HEADER, **{"If-None-Match": etag}))
+            assert resp.assert_status_code(304).data == b""
+
     def test_get_batch_job_logs(self, api):
         resp = api.get('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/logs', headers=self.AUTH_HEADER)
         assert resp.assert_status_code(200).json == {
@@ -574,6 +953,123 @@ class TestBatchJobs:
             "links": []
         }
 
+    def test_get_batch_job_logs_paginated(self, api):
+        entries = [
+            {"id": str(i), "level": level, "message": "msg {i}".format(i=i), "path": []}
+            for i, level in enumerate(["info", "debug", "error", "info", "warning"])
+        ]
+        with mock.patch.object(dummy_backend.DummyBatchJobs, "get_log_entries", return_value=entries):
+            resp = api.get('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/logs?limit=2', headers=self.AUTH_HEADER)
+            assert resp.assert_status_code(200).json["logs"] == entries[:2]
+            assert resp.json["links"] == [{
+                "rel": "next",
+                "href": "http://oeo.net/openeo/{v}/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/logs?offset=1&limit=2".format(
+                    v=api.api_version
+                )
+            }]
+            resp = api.get(
+                '/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/logs?level=warning&limit=10', headers=self.AUTH_HEADER
+            )
+            assert resp.assert_status_code(200).json == {"logs": [entries[2], entries[4]], "links": []}
+
+    @pytest.mark.parametrize("query", ["limit=0", "limit=foo", "level=fatal"])
+    def test_get_batch_job_logs_invalid(self, api, query):
+        resp = api.get('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/logs?' + query, headers=self.AUTH_HEADER)
+        resp.assert_error(400, "ParameterInvalid")
+
+    @pytest.fixture
+    def job_events_config(self):
+        app.config["OPENEO_JOB_EVENTS_STREAM_TIMEOUT"] = 0.5
+        app.config["OPENEO_JOB_EVENTS_HEARTBEAT"] = 0.2
+        yield
+        del app.config["OPENEO_JOB_EVENTS_STREAM_TIMEOUT"]
+        del app.config["OPENEO_JOB_EVENTS_HEARTBEAT"]
+
+    @staticmethod
+    def _parse_sse(data: bytes) -> list:
+        events = []
+        for block in data.decode("utf-8").split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.split("\n") if line and not line.startswith(":"))
+            if "data" in fields:
+                events.append(json.loads(fields["data"]))
+        return events
+
+    def test_job_events_by_id(self, api, job_events_config):
+        bus = openeo_driver.views.backend_implementation.batch_jobs.job_events
+        with self._fresh_job_registry(next_job_id="job-410"):
+            def publish():
+                time.sleep(0.1)
+                bus.publish(user_id="someone", job_id="07024ee9-7847-4b8a-b260-6c879a2b3cdc", status="error")
+                bus.publish(user_id=TEST_USER, job_id="07024ee9-7847-4b8a-b260-6c879a2b3cdc", status="finished")
+
+            threading.Thread(target=publish).start()
+            resp = api.get('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/events', headers=self.AUTH_HEADER)
+        assert resp.assert_status_code(200).headers["Content-Type"].startswith("text/event-stream")
+        assert ": keep-alive" in resp.data.decode("utf-8")
+        assert self._parse_sse(resp.data) == [
+            {"id": "07024ee9-7847-4b8a-b260-6c879a2b3cdc", "status": "running"},
+            {"id": "07024ee9-7847-4b8a-b260-6c879a2b3cdc", "status": "finished"},
+        ]
+
+    def test_job_events_all_jobs(self, api, job_events_config):
+        bus = openeo_driver.views.backend_implementation.batch_jobs.job_events
+        with self._fresh_job_registry(next_job_id="job-411"):
+            last_seq = bus.last_seq
+            api.post('/jobs', headers=self.AUTH_HEADER, json=api.get_process_graph_dict(
+                {"foo": {"process_id": "foo", "arguments": {}}}
+            )).assert_status_code(201)
+            api.post('/jobs/job-411/results', headers=self.AUTH_HEADER).assert_status_code(202)
+            headers = dict(self.AUTH_HEADER, **{"Last-Event-ID": str(last_seq)})
+            resp = api.get('/jobs/events', headers=headers)
+        assert self._parse_sse(resp.assert_status_code(200).data) == [
+            {"id": "job-411", "status": "created"},
+            {"id": "job-411", "status": "running"},
+        ]
+        assert "id: {s}\n".format(s=last_seq + 2) in resp.data.decode("utf-8")
+
+    def test_job_events_max_streams(self, api, job_events_config):
+        app.config["OPENEO_JOB_EVENTS_MAX_STREAMS_PER_USER"] = 2
+        app.extensions.pop("openeo_job_event_streams", None)
+        try:
+            with app.app_context():
+                streams = openeo_driver.views._get_job_event_streams()
+            streams.admit("someone")
+            streams.admit(TEST_USER)
+            resp = api.get('/jobs/events', headers=self.AUTH_HEADER)
+            resp.assert_error(429, "TooManyRequests")
+            assert resp.headers["Retry-After"] == "5"
+            streams.release("someone")
+            api.get('/jobs/events', headers=self.AUTH_HEADER).assert_status_code(200)
+            # Slot is released when stream is closed
+            assert streams.stats()["in_flight"] == 1
+        finally:
+            del app.config["OPENEO_JOB_EVENTS_MAX_STREAMS_PER_USER"]
+            app.extensions.pop("openeo_job_event_streams", None)
+
+    def test_job_events_max_streams_per_user(self, api, job_events_config):
+        app.extensions.pop("openeo_job_event_streams", None)
+        with app.app_context():
+            streams = openeo_driver.views._get_job_event_streams()
+        streams.admit(TEST_USER)
+        api.get('/jobs/events', headers=self.AUTH_HEADER).assert_error(429, "TooManyRequests")
+        streams.release(TEST_USER)
+        api.get('/jobs/events', headers=self.AUTH_HEADER).assert_status_code(200)
+        assert streams.stats()["in_flight"] == 0
+        # Stream that is closed without being read (e.g. client disconnected)
+        resp = api.get('/jobs/events', headers=self.AUTH_HEADER)
+        assert streams.stats()["in_flight"] == 1
+        resp.response.close()
+        assert streams.stats()["in_flight"] == 0
+        app.extensions.pop("openeo_job_event_streams", None)
+
+    def test_job_events_unknown_job(self, api):
+        api.get('/jobs/deadbeef-f00/events', headers=self.AUTH_HEADER).assert_error(404, "JobNotFound")
+
+    def test_job_events_unsupported(self, api):
+        with mock.patch.object(dummy_backend.DummyBatchJobs, "supports_job_events", False):
+            resp = api.get('/jobs/events', headers=self.AUTH_HEADER)
+        resp.assert_error(501, "FeatureUnsupported")
+
     def test_cancel_job(self, api):
         with self._fresh_job_registry(next_job_id="job-403"):
             resp = api.delete('/jobs/07024ee9-7847-4b8a-b260-6c879a2b3cdc/results', headers=self.AUTH_HEADER)
@@ -699,6 +1195,31 @@ class TestSecondaryServices(TestCase):
         assert res.json['code'] == 'ServiceNotFound'
 
 
+def test_create_app():
+    other_app = create_app({"OPENEO_TITLE": "Other API", "TESTING": True})
+    assert other_app is not app
+    client = other_app.test_client()
+    resp = ApiResponse(client.get('/openeo/1.0.0/')).assert_status_code(200)
+    assert resp.json["title"] == "Other API"
+    assert resp.headers["X-Request-Id"]
+    ApiResponse(client.get('/openeo/1.0.0/collections/FOOBAR')).assert_error(404, "CollectionNotFound")
+    assert client.get('/.well-known/openeo').status_code == 200
+    # Default app is not affected
+    assert app.config["OPENEO_TITLE"] == "OpenEO Test API"
+
+
+def test_preload_and_post_fork():
+    other_app = create_app({"OPENEO_TITLE": "Preload API"})
+    preload(other_app)
+    preloaded = sorted(k[0] for k in openeo_driver.views._capabilities_documents if k[1] == "'Preload API'")
+    assert preloaded == ["0.4.0", "0.4.1", "0.4.2", "1.0.0"]
+    openeo_driver.views._result_executor = mock.Mock()
+    with mock.patch.object(dummy_backend.DummyBatchJobs, "post_fork") as batch_jobs_post_fork:
+        post_fork()
+    assert openeo_driver.views._result_executor is None
+    batch_jobs_post_fork.assert_called_once_with()
+
+
 def test_build_backend_deploy_metadata():
     data = build_backend_deploy_metadata(packages=["openeo", "openeo_driver", "foobarblerghbwop"])
     assert data["date"].startswith(datetime.utcnow().strftime("%Y-%m-%dT%H"))
@@ -793,3 +1314,10 @@ def test_endpoint_registry_multiple_methods():
     paths, methods, metadatas = zip(*sorted(result))
     assert paths == ('/foo', '/foo')
     assert methods == ({"GET"}, {"POST"})
+
+
+def test_get_page_query_arg_like_view_arg():
+    with app.test_request_context("/openeo/1.0.0/jobs/j-123/logs?job_id=other&limit=2", base_url="http://oeo.net"):
+        items, links = _get_page(lambda: [1, 2, 3, 4], limit=2, offset=0)
+    assert items == [1, 2]
+    assert links == [{"rel": "next", "href": "http://oeo.net/openeo/1.0.0/jobs/j-123/logs?limit=2&offset=2"}]
@@ -1,5 +1,7 @@
 import os
+import time
 from typing import Callable, Union
+from unittest import mock
 
 from flask.testing import FlaskClient
 import pytest
@@ -8,8 +10,11 @@ import shapely.geometry
 from openeo.internal.process_graph_visitor import ProcessGraphVisitor
 from openeo_driver.dummy import dummy_backend
 from openeo_driver.errors import ProcessGraphMissingException
+import openeo_driver.metrics
 import openeo_driver.testing
-from openeo_driver.testing import load_json, preprocess_check_and_replace
+from openeo_driver.testing import load_json, preprocess_check_and_replace, TEST_USER
+from openeo_driver.users import HttpAuthHandler
+import openeo_driver.views
 from openeo_driver.views import app
 from .data import get_path, TEST_DATA_ROOT
 
@@ -526,6 +531,143 @@ def test_missing_process_graph(api):
     response.assert_error(status_code=ProcessGraphMissingException.status_code, error_code='ProcessGraphMissing')
 
 
+@pytest.fixture
+def sync_result_timeout():
+    app.config["OPENEO_SYNC_RESULT_TIMEOUT"] = 0.2
+    yield
+    del app.config["OPENEO_SYNC_RESULT_TIMEOUT"]
+
+
+@pytest.fixture
+def slow_evaluate(monkeypatch):
+    """Make process graph evaluation in `views` slow"""
+    evaluate = openeo_driver.views.evaluate
+
+    def slow(*args, **kwargs):
+        time.sleep(0.5)
+        return evaluate(*args, **kwargs)
+
+    monkeypatch.setattr(openeo_driver.views, "evaluate", slow)
+
+
+TEST_USER_AUTH_HEADER = {
+    "Authorization": "Bearer " + HttpAuthHandler().build_basic_access_token(user_id=TEST_USER)
+}
+
+
+def test_result_with_timeout_fast(api, sync_result_timeout):
+    data = api.get_process_graph_dict(api.load_json("basic.json"))
+    response = api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER)
+    response.assert_status_code(200).assert_content()
+    assert api.collections["S2_FAPAR_CLOUDCOVER"].download.call_count == 1
+
+
+def test_result_with_timeout_fallback_to_batch_job(api, sync_result_timeout, slow_evaluate):
+    process_graph = api.load_json("basic.json")
+    response = api.post(path="/result", json=api.get_process_graph_dict(process_graph), headers=TEST_USER_AUTH_HEADER)
+    response.assert_status_code(202)
+    job_id = response.headers["OpenEO-Identifier"]
+    assert response.headers["Location"].endswith("/jobs/{j}".format(j=job_id))
+    job_info = dummy_backend.DummyBatchJobs._job_registry.get(job_id=job_id, user_id=TEST_USER)
+    assert job_info.status == "running"
+    assert job_info.process == {"process_graph": process_graph}
+    assert job_info.api_version == api.api_version
+
+
+@pytest.fixture
+def sync_result_workers():
+    """Fixture to configure number of synchronous evaluation workers (with fresh executor)."""
+
+    def configure(workers: int):
+        app.config["OPENEO_SYNC_RESULT_WORKERS"] = workers
+        openeo_driver.views._result_executor = None
+
+    yield configure
+    app.config.pop("OPENEO_SYNC_RESULT_WORKERS", None)
+    openeo_driver.views._result_executor = None
+
+
+def test_result_with_timeout_orphaned_evaluations(api, sync_result_timeout, slow_evaluate, sync_result_workers):
+    sync_result_workers(1)
+    data = api.get_process_graph_dict(api.load_json("basic.json"))
+    api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER).assert_status_code(202)
+    # Timed out evaluation is still running and occupies the only slot: batch job without (slow) evaluation.
+    start = time.time()
+    api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER).assert_status_code(202)
+    assert time.time() - start < 0.2
+    # Slot is freed when orphaned evaluation finishes.
+    time.sleep(0.5)
+    _, slots = openeo_driver.views._get_result_executor()
+    assert slots.acquire(blocking=False)
+    slots.release()
+
+
+def test_result_with_timeout_resolves_user_once(api, sync_result_timeout, admission_control):
+    admission_control(max_concurrent_per_user=1)
+    auth_handler = openeo_driver.views.auth_handler
+    data = api.get_process_graph_dict(api.load_json("basic.json"))
+    with mock.patch.object(
+            auth_handler, "get_user_from_bearer_token", wraps=auth_handler.get_user_from_bearer_token
+    ) as get_user:
+        api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER).assert_status_code(200)
+    assert get_user.call_count == 1
+
+
+def test_result_with_timeout_anonymous(api, sync_result_timeout, slow_evaluate):
+    # Without authenticated user: no fallback to batch job
+    api.check_result("basic.json")
+
+
+def test_result_with_timeout_error(api, sync_result_timeout):
+    response = api.post(path="/result", json={"foo": "bar"}, headers=TEST_USER_AUTH_HEADER)
+    response.assert_error(status_code=400, error_code="ProcessGraphMissing")
+    data = api.get_process_graph_dict({"foo": {"process_id": "fooBar", "arguments": {}, "result": True}})
+    response = api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER)
+    response.assert_error(status_code=400, error_code="ProcessUnsupported")
+
+
+@pytest.fixture
+def admission_control():
+    """Fixture to configure admission control"""
+
+    def configure(**kwargs):
+        app.config["OPENEO_ADMISSION_CONTROL"] = kwargs
+        app.extensions.pop("openeo_admission", None)
+
+    yield configure
+    app.config.pop("OPENEO_ADMISSION_CONTROL", None)
+    app.extensions.pop("openeo_admission", None)
+
+
+def test_result_admission_rate_limit(api, admission_control):
+    admission_control(rate_per_user=1, burst_per_user=2)
+    data = api.get_process_graph_dict(api.load_json("basic.json"))
+    for _ in range(2):
+        api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER).assert_status_code(200)
+    response = api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER)
+    response.assert_error(status_code=429, error_code="TooManyRequests")
+    assert response.headers["Retry-After"] == "1"
+    # Other endpoints are not affected
+    api.get("/collections").assert_status_code(200)
+    health = api.get("/health").assert_status_code(200).json
+    assert health["admission"]["rejected"] == {"rate": 1}
+    assert health["admission"]["in_flight"] == 0
+
+
+def test_result_admission_concurrency(api, admission_control):
+    admission_control(max_concurrent_per_user=1)
+    with app.app_context():
+        controller = openeo_driver.views._get_admission_controller()
+    controller.admit(TEST_USER)
+    data = api.get_process_graph_dict(api.load_json("basic.json"))
+    response = api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER)
+    response.assert_error(status_code=429, error_code="TooManyRequests")
+    # Anonymous requests are keyed on remote address
+    api.post(path="/result", json=data).assert_status_code(200)
+    controller.release(TEST_USER)
+    api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER).assert_status_code(200)
+
+
 def test_fuzzy_mask(api):
     api.check_result("fuzzy_mask.json")
 
@@ -535,3 +677,46 @@ def test_fuzzy_mask_parent_scope(api100):
         "fuzzy_mask.json",
         preprocess=preprocess_check_and_replace('"from_parameter": "x"', '"from_parameter": "data"')
     )
+
+
+def test_result_with_timeout_and_admission_control(api, sync_result_timeout, admission_control):
+    admission_control(max_concurrent=2, max_concurrent_per_user=1)
+    data = api.get_process_graph_dict(api.load_json("basic.json"))
+    for _ in range(3):
+        api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER).assert_status_code(200)
+    admission = api.get("/health").assert_status_code(200).json["admission"]
+    assert admission["in_flight"] == 0
+
+
+def test_result_with_timeout_in_flight_metric(api, sync_result_timeout):
+    pytest.importorskip("prometheus_client")
+    data = api.get_process_graph_dict(api.load_json("basic.json"))
+    in_flight = openeo_driver.metrics._registry.get_sample_value(
+        "openeo_http_requests_in_flight", {"endpoint": "openeo.result"}
+    )
+    for _ in range(3):
+        api.post(path="/result", json=data, headers=TEST_USER_AUTH_HEADER).assert_status_code(200)
+    assert openeo_driver.metrics._registry.get_sample_value(
+        "openeo_http_requests_in_flight", {"endpoint": "openeo.result"}
+    ) == in_flight
+
+
+def test_execute_file_response_headers(api):
+    pg = api.get_process_graph_dict(api.load_json("basic.json"))
+    resp = api.post(path="/execute", json=pg).assert_status_code(200)
+    with open(dummy_backend.__file__, "rb") as f:
+        assert resp.data == f.read()
+    assert resp.headers["Accept-Ranges"] == "bytes"
+    assert resp.headers["ETag"]
+    assert resp.headers["Last-Modified"]
+
+
+def test_download_file_response_headers(api100):
+    pg = api100.load_json("basic.json")
+    # Range requests only apply to GET: POST gets full content
+    resp = api100.post(path="/download", json=pg, headers={"Range": "bytes=5-14"}).assert_status_code(200)
+    with open(dummy_backend.__file__, "rb") as f:
+        assert resp.data == f.read()
+    assert resp.headers["Accept-Ranges"] == "bytes"
+    assert resp.headers["ETag"]
+    assert resp.headers["Last-Modified"]